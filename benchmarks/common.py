@@ -0,0 +1,96 @@
+"""Общие утилиты бенчмарков для проектов ya_news и ya_note.
+
+Бенчмарки запускаются из корня репозитория как модули, например::
+
+    python -m benchmarks.news_archive --rows 1000000
+
+Каждый бенчмарк работает с собственным файлом SQLite (по умолчанию во
+временном каталоге), поэтому рабочая база проекта не затрагивается.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SETTINGS = {
+    'ya_news': 'yanews.settings',
+    'ya_note': 'yanote.settings',
+}
+
+
+def setup_django(project, db_path=None, database=None, aliases=()):
+    """Подключает проект к отдельной базе SQLite и применяет миграции.
+
+    Возвращает путь к файлу базы: если передать существующий файл, уже
+    засеянные данные можно переиспользовать между запусками. database
+    дополняет настройки базы default (ENGINE, OPTIONS, CONN_MAX_AGE).
+    aliases — дополнительные базы (например, шарды) с настройками default,
+    каждая в своём файле рядом с основным; миграции применяются и к ним.
+    """
+    sys.path.insert(0, str(ROOT_DIR / project))
+    os.environ['DJANGO_SETTINGS_MODULE'] = SETTINGS[project]
+    if db_path is None:
+        db_path = Path(tempfile.mkdtemp(prefix='bench-')) / 'db.sqlite3'
+    import django
+    from django.conf import settings
+    settings.DATABASES['default'].update(database or {})
+    settings.DATABASES['default']['NAME'] = str(db_path)
+    for alias in aliases:
+        settings.DATABASES[alias] = {
+            **settings.DATABASES['default'],
+            'NAME': str(Path(db_path).with_name(f'{alias}.sqlite3')),
+        }
+    settings.ALLOWED_HOSTS = ['*']
+    django.setup()
+    from django.core.management import call_command
+    for alias in ('default', *aliases):
+        call_command('migrate', database=alias, verbosity=0)
+    return db_path
+
+
+def measure(func, repeat=20):
+    """Вызывает func repeat раз и возвращает длительности в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(timings, share):
+    """Перцентиль по отсортированной выборке (share от 0 до 1)."""
+    ordered = sorted(timings)
+    index = min(len(ordered) - 1, round(share * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summary(timings):
+    """Сводка по выборке: медиана, p95 и максимум в миллисекундах."""
+    return {
+        'median': statistics.median(timings),
+        'p95': percentile(timings, 0.95),
+        'max': max(timings),
+    }
+
+
+def print_table(headers, rows):
+    """Печатает результаты выровненной таблицей."""
+    rows = [[
+        f'{cell:.3f}' if isinstance(cell, float) else str(cell)
+        for cell in row
+    ] for row in rows]
+    widths = [
+        max(len(str(header)), *(len(row[index]) for row in rows))
+        for index, header in enumerate(headers)
+    ]
+    print('  '.join(
+        str(header).rjust(width) for header, width in zip(headers, widths)
+    ))
+    for row in rows:
+        print('  '.join(
+            cell.rjust(width) for cell, width in zip(row, widths)
+        ))
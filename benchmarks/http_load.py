@@ -0,0 +1,512 @@
+"""HTTP-нагрузка на проект: пропускная способность и хвосты задержек.
+
+    python -m benchmarks.http_load ya_news --server wsgi asgi --workers 8
+    python -m benchmarks.http_load ya_note --requests 5000 --baseline old.json
+
+Проект поднимается в этом же процессе: запросы уходят прямо в
+wsgi.application (по потоку на воркера) или asgi.application (по корутине
+на воркера), без сети. Данные строят команды seed_news и seed_notes.
+Смесь запросов повторяет реальную нагрузку: для ya_news — чтение главной
+и новостей анонимами и авторизованными, комментарии через
+NewsDetailView.post; для ya_note — CRUD заметок. Число SQL-запросов
+берётся из заголовка Server-Timing (QUERY_STATS_HEADER).
+
+Результаты печатаются таблицей и сохраняются в JSON (по умолчанию в
+benchmarks/results/); с --baseline печатается сравнение с прошлым
+прогоном.
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import accumulate
+from urllib.parse import urlencode
+
+from benchmarks.common import ROOT_DIR, percentile, print_table, setup_django
+
+RESULTS_DIR = ROOT_DIR / 'benchmarks' / 'results'
+# Тот же токен в cookie и заголовке проходит проверку CsrfViewMiddleware.
+CSRF_TOKEN = 'a' * 64
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+COMMENT_WORDS = (
+    'интересно', 'спасибо', 'согласен', 'новость', 'подробнее', 'вопрос',
+)
+# Доли видов запросов в смеси.
+MIXES = {
+    'ya_news': {
+        'home': 40,
+        'detail': 35,
+        'detail (auth)': 15,
+        'comment': 10,
+    },
+    'ya_note': {
+        'list': 30,
+        'detail': 30,
+        'add': 15,
+        'edit': 15,
+        'delete': 10,
+    },
+}
+
+
+class Worker:
+    """Состояние одного клиента: генератор, сессия и свои заметки."""
+
+    def __init__(self, number, seed, session, notes=()):
+        self.number = number
+        self.rng = random.Random(seed * 1000 + number)
+        self.session = session
+        self.notes = list(notes)
+        self.created = 0
+
+    def cookie(self, authenticated):
+        from django.conf import settings
+
+        cookie = f'{settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}'
+        if authenticated:
+            cookie += f'; {settings.SESSION_COOKIE_NAME}={self.session}'
+        return cookie
+
+
+class Scenario:
+    """Выбирает очередной запрос смеси: (имя, метод, путь, данные, cookie)."""
+
+    def __init__(self, project, news_ids=()):
+        self.project = project
+        self.names = list(MIXES[project])
+        self.weights = list(accumulate(MIXES[project].values()))
+        self.news_ids = list(news_ids)
+        # Свежие новости популярнее: веса по Ципфу от новых к старым.
+        self.news_weights = list(accumulate(
+            1 / rank for rank in range(1, len(self.news_ids) + 1)
+        ))
+
+    def next_call(self, worker):
+        name = worker.rng.choices(self.names, cum_weights=self.weights)[0]
+        return getattr(self, self.project)(worker, name)
+
+    def ya_news(self, worker, name):
+        from django.urls import reverse
+
+        news_id = worker.rng.choices(
+            self.news_ids, cum_weights=self.news_weights
+        )[0]
+        detail = reverse('news:detail', args=(news_id,))
+        if name == 'home':
+            return name, 'GET', reverse('news:home'), None, False
+        if name == 'detail':
+            return name, 'GET', detail, None, False
+        if name == 'detail (auth)':
+            return name, 'GET', detail, None, True
+        text = ' '.join(worker.rng.choices(COMMENT_WORDS, k=6))
+        return name, 'POST', detail, {'text': text}, True
+
+    def ya_note(self, worker, name):
+        from django.urls import reverse
+
+        if name == 'list':
+            return name, 'GET', reverse('notes:list'), None, True
+        if name in ('detail', 'edit', 'delete') and not worker.notes:
+            name = 'add'
+        if name == 'add':
+            worker.created += 1
+            slug = f'load-{worker.number}-{worker.created}'
+            return name, 'POST', reverse('notes:add'), {
+                'title': 'Заметка под нагрузкой', 'text': 'Текст',
+                'slug': slug,
+            }, True
+        if name == 'delete':
+            slug = worker.notes[-1]
+            return name, 'POST', reverse('notes:delete', args=(slug,)), {
+                'slug': slug,
+            }, True
+        slug = worker.rng.choice(worker.notes)
+        if name == 'detail':
+            path = reverse('notes:detail', args=(slug,))
+            return name, 'GET', path, None, True
+        return name, 'POST', reverse('notes:edit', args=(slug,)), {
+            'title': 'Изменённая заметка', 'text': 'Новый текст', 'slug': slug,
+        }, True
+
+    @staticmethod
+    def done(worker, name, data, status):
+        """Учитывает ответ: список заметок воркера меняют только успехи."""
+        if name == 'add' and status == 302:
+            worker.notes.append(data['slug'])
+        elif name == 'delete' and status in (302, 404):
+            worker.notes.remove(data['slug'])
+
+
+def encode(data):
+    return urlencode(data).encode() if data else b''
+
+
+def parse_queries(value):
+    match = QUERIES_RE.search(value or '')
+    return int(match.group(1)) if match else None
+
+
+def wsgi_request(application, method, path, body, cookie, client_delay=0):
+    """Один запрос в wsgi.application; возвращает статус и число запросов.
+
+    Медленный клиент передаёт запрос и принимает ответ по client_delay / 2
+    секунд, и всё это время поток сервера занят им.
+    """
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'HTTP_COOKIE': cookie,
+        'HTTP_X_CSRFTOKEN': CSRF_TOKEN,
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    started = {}
+    time.sleep(client_delay / 2)
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split()[0])
+        started['headers'] = dict(headers)
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    time.sleep(client_delay / 2)
+    return started['status'], parse_queries(
+        started['headers'].get('Server-Timing')
+    )
+
+
+async def asgi_request(application, method, path, body, cookie,
+                       client_delay=0):
+    """Один запрос в asgi.application; возвращает статус и число запросов.
+
+    Задержка медленного клиента здесь ждёт в корутине, не занимая потоков.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'localhost'),
+            (b'cookie', cookie.encode()),
+            (b'x-csrftoken', CSRF_TOKEN.encode()),
+            (b'content-type', b'application/x-www-form-urlencoded'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    started = {}
+
+    async def receive():
+        if messages:
+            await asyncio.sleep(client_delay / 2)
+            return messages.pop()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            started['status'] = message['status']
+            started['headers'] = {
+                name.decode().lower(): value.decode()
+                for name, value in message['headers']
+            }
+        elif not message.get('more_body'):
+            await asyncio.sleep(client_delay / 2)
+
+    await application(scope, receive, send)
+    return started['status'], parse_queries(
+        started['headers'].get('server-timing')
+    )
+
+
+class Recorder:
+    """Копит задержки, ошибки и число SQL-запросов по видам запросов."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(Counter)
+        self.queries = defaultdict(list)
+
+    def add(self, name, duration, status, queries):
+        self.timings[name].append(duration)
+        self.statuses[name][status] += 1
+        if status >= 400:
+            self.errors[name] += 1
+        if queries is not None:
+            self.queries[name].append(queries)
+
+    def report(self, elapsed):
+        names = sorted(self.timings)
+        endpoints = {
+            name: self.stats(
+                self.timings[name], self.errors[name], self.queries[name],
+                elapsed
+            )
+            for name in names
+        }
+        for name in names:
+            endpoints[name]['statuses'] = dict(sorted(
+                self.statuses[name].items()
+            ))
+        total = self.stats(
+            [value for name in names for value in self.timings[name]],
+            sum(self.errors.values()),
+            [value for name in names for value in self.queries[name]],
+            elapsed
+        )
+        return {'total': total, 'endpoints': endpoints}
+
+    @staticmethod
+    def stats(timings, errors, queries, elapsed):
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'rps': len(timings) / elapsed,
+            'p50': percentile(timings, 0.50),
+            'p95': percentile(timings, 0.95),
+            'p99': percentile(timings, 0.99),
+            'queries_per_request': (
+                sum(queries) / len(queries) if queries else None
+            ),
+        }
+
+
+def run_wsgi(scenario, workers, requests):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    recorder = Recorder()
+
+    def work(worker, count):
+        for _ in range(count):
+            name, method, path, data, auth = scenario.next_call(worker)
+            start = time.perf_counter()
+            status, queries = wsgi_request(
+                application, method, path, encode(data), worker.cookie(auth)
+            )
+            scenario.done(worker, name, data, status)
+            recorder.add(
+                name, (time.perf_counter() - start) * 1000, status, queries
+            )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(workers)) as executor:
+        futures = [
+            executor.submit(work, worker, count)
+            for worker, count in zip(workers, split(requests, len(workers)))
+        ]
+    for future in futures:
+        future.result()
+    return recorder.report(time.perf_counter() - start)
+
+
+def run_asgi(scenario, workers, requests):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    recorder = Recorder()
+
+    async def work(worker, count):
+        for _ in range(count):
+            name, method, path, data, auth = scenario.next_call(worker)
+            start = time.perf_counter()
+            status, queries = await asgi_request(
+                application, method, path, encode(data), worker.cookie(auth)
+            )
+            scenario.done(worker, name, data, status)
+            recorder.add(
+                name, (time.perf_counter() - start) * 1000, status, queries
+            )
+
+    async def main():
+        await asyncio.gather(*(
+            work(worker, count)
+            for worker, count in zip(workers, split(requests, len(workers)))
+        ))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return recorder.report(time.perf_counter() - start)
+
+
+def split(total, parts):
+    """Делит total запросов между parts воркерами почти поровну."""
+    return [
+        total // parts + (index < total % parts) for index in range(parts)
+    ]
+
+
+def seed(project, args):
+    from django.core.management import call_command
+
+    if project == 'ya_news':
+        call_command(
+            'seed_news', users=args.workers, news=args.news,
+            comments=args.comments, seed=args.seed
+        )
+    else:
+        call_command(
+            'seed_notes', users=args.workers, notes=args.notes,
+            seed=args.seed
+        )
+
+
+def make_workers(project, count, random_seed):
+    """Воркер на каждого засеянного пользователя, с готовой сессией."""
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    workers = []
+    users = get_user_model().objects.order_by('id')[:count]
+    for number, user in enumerate(users):
+        client = Client()
+        client.force_login(user)
+        notes = ()
+        if project == 'ya_note':
+            notes = user.note_set.values_list('slug', flat=True)[:1000]
+        workers.append(Worker(
+            number, random_seed,
+            client.cookies[settings.SESSION_COOKIE_NAME].value, notes
+        ))
+    return workers
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', 'HEAD'), cwd=ROOT_DIR, capture_output=True,
+            text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(result, baseline=None):
+    rows = []
+    for name, stats in (
+        *result['endpoints'].items(), ('TOTAL', result['total'])
+    ):
+        row = [
+            name, stats['requests'], stats['errors'], stats['rps'],
+            stats['p50'], stats['p95'], stats['p99'],
+            stats['queries_per_request'] or '-',
+        ]
+        if baseline is not None:
+            old = (
+                baseline['total'] if name == 'TOTAL'
+                else baseline['endpoints'].get(name)
+            )
+            row.append(
+                f'{stats["p95"] / old["p95"] - 1:+.0%}' if old else '-'
+            )
+        rows.append(row)
+    headers = [
+        'request', 'count', 'errors', 'rps', 'p50 ms', 'p95 ms', 'p99 ms',
+        'queries',
+    ]
+    if baseline is not None:
+        headers.append('p95 vs base')
+    print_table(headers, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('project', choices=sorted(MIXES))
+    parser.add_argument(
+        '--server', nargs='+', choices=('wsgi', 'asgi'),
+        default=['wsgi', 'asgi']
+    )
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--news', type=int, default=1_000)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--notes', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    args = parser.parse_args()
+
+    setup_django(args.project, args.db)
+    import django
+    from django.conf import settings
+
+    settings.QUERY_STATS_HEADER = True
+    seed(args.project, args)
+    news_ids = ()
+    if args.project == 'ya_news':
+        from news.models import News
+        news_ids = News.objects.order_by('-date', '-id').values_list(
+            'id', flat=True
+        )
+    scenario = Scenario(args.project, news_ids)
+    workers = make_workers(args.project, args.workers, args.seed)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {run['server']: run for run in json.load(file)['runs']}
+    runners = {'wsgi': run_wsgi, 'asgi': run_asgi}
+    runs = []
+    for server in args.server:
+        if args.warmup:
+            runners[server](scenario, workers, args.warmup)
+        result = runners[server](scenario, workers, args.requests)
+        result['server'] = server
+        runs.append(result)
+        print(f'{args.project} / {server}, воркеров: {len(workers)}')
+        print_results(result, baseline.get(server) if args.baseline else None)
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+        output = RESULTS_DIR / f'http_load-{args.project}-{stamp}.json'
+    with open(output, 'w') as file:
+        json.dump({
+            'project': args.project,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'options': vars(args),
+            'runs': runs,
+        }, file, ensure_ascii=False, indent=2)
+    print(f'Результаты: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Накладные расходы MetricsMiddleware на запрос.
+
+    python -m benchmarks.metrics_overhead --project ya_news --budget 50
+
+Middleware оборачивает заглушку обработчика, которая отдаёт готовый
+ответ: простой HttpResponse, TemplateResponse с рендером и его же с
+сохранением счётчиков в METRICS_DIR раз в METRICS_FLUSH_INTERVAL.
+Накладные расходы — разница с той же заглушкой без middleware, лучший из
+--repeat прогонов. Если хоть один вариант дороже --budget микросекунд,
+бенчмарк завершается с кодом 1.
+
+Для сравнения печатается и страница целиком (главная проекта через
+wsgi.application с метриками и без) и время ответа /metrics при файлах
+--processes процессов в каталоге.
+"""
+import argparse
+import sys
+import tempfile
+import time
+
+from benchmarks.common import SETTINGS, print_table, setup_django
+from benchmarks.http_load import wsgi_request
+
+
+def stub(metrics, kind):
+    """Заглушка обработчика: ответ нужного вида, как после представления."""
+    from django.http import HttpResponse
+    from django.template import engines
+    from django.template.response import SimpleTemplateResponse
+
+    template = engines['django'].from_string('<p>{{ text }}</p>')
+
+    def get_response(request):
+        if kind == 'http':
+            return HttpResponse(b'<p>text</p>')
+        response = SimpleTemplateResponse(template, {'text': 'text'})
+        if metrics is not None:
+            response = metrics.process_template_response(request, response)
+        return response.render()
+
+    return get_response
+
+
+def per_request(handler, request, requests, repeat):
+    """Лучшее за repeat прогонов время одного запроса, микросекунды."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(requests):
+            handler(request)
+        best = min(best, (time.perf_counter() - start) / requests)
+    return best * 1_000_000
+
+
+def overhead(kind, args):
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    from yacommon import metrics, querybudget
+
+    request = RequestFactory().get('/')
+    request.resolver_match = resolve('/')
+    request.query_stats = querybudget.QueryStats()
+    bare = stub(None, kind)
+    middleware = metrics.MetricsMiddleware(None)
+    middleware.get_response = stub(middleware, kind)
+    without = per_request(bare, request, args.requests, args.repeat)
+    with_metrics = per_request(
+        middleware, request, args.requests, args.repeat
+    )
+    return without, with_metrics
+
+
+def page(args):
+    """Главная через wsgi.application без метрик и с ними, микросекунды."""
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+
+    middleware = list(settings.MIDDLEWARE)
+    settings.MIDDLEWARE = [
+        path for path in middleware
+        if path != 'yacommon.metrics.MetricsMiddleware'
+    ]
+    bare = WSGIHandler()
+    settings.MIDDLEWARE = middleware
+    with_metrics = WSGIHandler()
+    # Прогоны чередуются, чтобы прогрев и шум достались обоим поровну.
+    timings = [float('inf'), float('inf')]
+    for _ in range(args.repeat):
+        for index, application in enumerate((bare, with_metrics)):
+            timings[index] = min(timings[index], per_request(
+                lambda path: wsgi_request(application, 'GET', path, b'', ''),
+                '/', args.requests // 10, 1
+            ))
+    return timings
+
+
+def scrape(args):
+    """Время ответа /metrics при файлах args.processes процессов, мс."""
+    from django.conf import settings
+    from django.test import RequestFactory
+
+    from yacommon import metrics
+
+    directory = tempfile.mkdtemp(prefix='metrics-')
+    # Каждый процесс — копия рядов, накопленных прогонами выше.
+    registry = metrics.Registry()
+    registry.samples = metrics.registry.samples
+    for _ in range(args.processes):
+        registry.reset_file()
+        registry.flush(directory)
+    settings.METRICS_DIR = directory
+    request = RequestFactory().get('/metrics')
+    return per_request(metrics.metrics_view, request, 20, 3) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--project', choices=SETTINGS, default='ya_news')
+    parser.add_argument('--requests', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--processes', type=int, default=16)
+    parser.add_argument(
+        '--budget', type=float, default=50,
+        help='допустимые накладные расходы на запрос, микросекунды'
+    )
+    args = parser.parse_args()
+
+    setup_django(args.project)
+    from django.conf import settings
+
+    rows, over_budget = [], False
+    for kind, directory in (
+        ('http', None), ('template', None),
+        ('template', tempfile.mkdtemp(prefix='metrics-')),
+    ):
+        settings.METRICS_DIR = directory
+        without, with_metrics = overhead(kind, args)
+        cost = with_metrics - without
+        over_budget |= cost > args.budget
+        rows.append([
+            kind, 'yes' if directory else 'no', without, with_metrics, cost,
+        ])
+    settings.METRICS_DIR = None
+    without, with_metrics = page(args)
+    rows.append(
+        ['page /', 'no', without, with_metrics, with_metrics - without]
+    )
+    print_table(
+        ['response', 'METRICS_DIR', 'bare us', 'metrics us', 'overhead us'],
+        rows
+    )
+    print(
+        f'/metrics с {args.processes} процессами: '
+        f'{scrape(args):.2f} мс'
+    )
+    print(f'бюджет: {args.budget:.0f} мкс на запрос')
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
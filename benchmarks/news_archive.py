@@ -0,0 +1,73 @@
+"""Архив новостей: keyset-пагинация против OFFSET.
+
+    python -m benchmarks.news_archive --rows 1000000 --db /tmp/news.sqlite3
+
+Для каждой глубины страницы измеряется выборка одной страницы архива
+через OFFSET и через курсор (date, id), взятый с предыдущей страницы.
+"""
+import argparse
+
+from benchmarks.common import measure, print_table, setup_django, summary
+
+
+def seed(rows):
+    from django.core.management import call_command
+    from news.models import News
+
+    existing = News.objects.count()
+    if existing < rows:
+        # Около трёхсот новостей на день: ключ (date, id) нужен.
+        call_command(
+            'seed_news', users=0, news=rows - existing, comments=0,
+            news_per_day=300, text_words=5
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    setup_django('ya_news', args.db)
+    from news.models import News
+    from yacommon.pagination import NEXT, KeysetPaginator
+
+    seed(args.rows)
+    ordering = ('-date', '-id')
+    queryset = News.objects.all()
+    paginator = KeysetPaginator(queryset, ordering, args.per_page)
+    rows = []
+    page_number = 1
+    while (page_number - 1) * args.per_page < args.rows:
+        offset = (page_number - 1) * args.per_page
+        ordered = queryset.order_by(*ordering)
+        cursor = None
+        if offset:
+            boundary = ordered[offset - 1:offset].get()
+            cursor = paginator.encode_cursor(NEXT, boundary)
+        offset_timings = measure(
+            lambda: list(ordered[offset:offset + args.per_page]),
+            args.repeat
+        )
+        keyset_timings = measure(
+            lambda: paginator.get_page(cursor), args.repeat
+        )
+        rows.append([
+            page_number,
+            summary(offset_timings)['median'],
+            summary(keyset_timings)['median'],
+            summary(offset_timings)['p95'],
+            summary(keyset_timings)['p95'],
+        ])
+        page_number *= 10
+    print(f'Строк в news_news: {args.rows}, на странице: {args.per_page}')
+    print_table(
+        ('page', 'offset ms', 'keyset ms', 'offset p95', 'keyset p95'), rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""WSGI против ASGI для ya_news при множестве медленных клиентов.
+
+    python -m benchmarks.news_async --clients 200 --client-delay 50
+
+Клиенты — корутины, каждый шлёт запросы один за другим: главная и
+новости (по Ципфу), доля --auth-share — от вошедших пользователей, мимо
+кэша страниц. Медленный клиент держит соединение --client-delay мс: под
+WSGI всё это время занят один из --threads потоков сервера, под ASGI
+ждёт только корутина. Сравниваются:
+
+* wsgi — синхронные представления в пуле из --threads потоков;
+* asgi — те же представления под ASGIHandler (общий поток thread_sensitive);
+* asgi-async — AsyncNewsList и AsyncNewsDetailView, пул того же размера.
+"""
+import argparse
+import asyncio
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from itertools import accumulate
+
+from benchmarks.common import setup_django
+from benchmarks.http_load import (
+    Recorder, Worker, asgi_request, make_workers, print_results, split,
+    wsgi_request,
+)
+
+SERVERS = ('wsgi', 'asgi', 'asgi-async')
+
+
+def use_async_views(enabled):
+    """Пересобирает маршруты news.urls с нужными представлениями."""
+    from django.conf import settings
+    from django.urls import clear_url_caches
+    from news import urls as news_urls
+    from yanews import urls as project_urls
+
+    settings.NEWS_ASYNC_VIEWS = enabled
+    importlib.reload(news_urls)
+    importlib.reload(project_urls)
+    clear_url_caches()
+
+
+class Pages:
+    """Выбирает страницу: главную или новость, свежие новости чаще."""
+
+    def __init__(self, news_ids, auth_share):
+        from django.urls import reverse
+
+        self.home = reverse('news:home')
+        self.details = [
+            reverse('news:detail', args=(news_id,)) for news_id in news_ids
+        ]
+        self.weights = list(accumulate(
+            1 / rank for rank in range(1, len(self.details) + 1)
+        ))
+        self.auth_share = auth_share
+
+    def next(self, rng):
+        authenticated = rng.random() < self.auth_share
+        suffix = ' (auth)' if authenticated else ''
+        if rng.random() < 0.5:
+            return 'home' + suffix, self.home, authenticated
+        path = rng.choices(self.details, cum_weights=self.weights)[0]
+        return 'detail' + suffix, path, authenticated
+
+
+async def run(server, clients, pages, args):
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+
+    use_async_views(server == 'asgi-async')
+    loop = asyncio.get_running_loop()
+    # Пул под thread_sensitive=False того же размера, что и у WSGI.
+    executor = ThreadPoolExecutor(args.threads)
+    loop.set_default_executor(executor)
+    delay = args.client_delay / 1000
+    if server == 'wsgi':
+        application = get_wsgi_application()
+
+        async def call(path, cookie):
+            return await loop.run_in_executor(
+                executor, wsgi_request, application, 'GET', path, b'',
+                cookie, delay
+            )
+    else:
+        application = get_asgi_application()
+
+        async def call(path, cookie):
+            return await asgi_request(
+                application, 'GET', path, b'', cookie, delay
+            )
+
+    recorder = Recorder()
+
+    async def client(worker, count):
+        for _ in range(count):
+            name, path, authenticated = pages.next(worker.rng)
+            start = time.perf_counter()
+            status, queries = await call(path, worker.cookie(authenticated))
+            recorder.add(
+                name, (time.perf_counter() - start) * 1000, status, queries
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(worker, count)
+        for worker, count in zip(clients, split(args.requests, len(clients)))
+    ))
+    return recorder.report(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--server', nargs='+', choices=SERVERS, default=list(SERVERS)
+    )
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--client-delay', type=float, default=50)
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--auth-share', type=float, default=0.5)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--news', type=int, default=1_000)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django('ya_news')
+    from django.conf import settings
+    from django.core.management import call_command
+    from news.models import News
+
+    settings.QUERY_STATS_HEADER = True
+    call_command(
+        'seed_news', users=args.users, news=args.news,
+        comments=args.comments, seed=args.seed, stdout=StringIO()
+    )
+    sessions = [
+        worker.session
+        for worker in make_workers('ya_news', args.users, args.seed)
+    ]
+    clients = [
+        Worker(number, args.seed, sessions[number % len(sessions)])
+        for number in range(args.clients)
+    ]
+    pages = Pages(
+        News.objects.order_by('-date', '-id').values_list('id', flat=True),
+        args.auth_share
+    )
+    for server in args.server:
+        result = asyncio.run(run(server, clients, pages, args))
+        print(
+            f'{server}: клиентов {args.clients}, потоков {args.threads}, '
+            f'задержка клиента {args.client_delay:g} мс'
+        )
+        print_results(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Кэш фрагментов шаблонов: время ответа с фрагментами и без.
+
+    python -m benchmarks.news_fragments --comments 50 --repeat 200
+
+Страницы запрашиваются авторизованным пользователем, для которого кэш
+страниц целиком не работает. Данные строит команда seed_news, страница
+новости — самая комментируемая. «Без фрагментов» — это тот же шаблон с
+бэкендом DummyCache для алиаса template_fragments.
+"""
+import argparse
+
+from benchmarks.common import measure, print_table, setup_django, summary
+
+DUMMY_CACHE = {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=10)
+    parser.add_argument('--comments', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django('ya_news')
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.core.management import call_command
+    from django.urls import reverse
+    from news.models import News
+
+    call_command(
+        'seed_news', users=1, news=args.news, comments=args.comments,
+        text_words=600
+    )
+    author = get_user_model().objects.get()
+    news = News.objects.order_by('-comment_count').first()
+    client = Client()
+    client.force_login(author)
+    urls = {
+        'news:home': reverse('news:home'),
+        'news:detail': reverse('news:detail', args=(news.pk,)),
+    }
+    rows = []
+    for name, url in urls.items():
+        with override_settings(CACHES={
+            **settings.CACHES, 'template_fragments': DUMMY_CACHE
+        }):
+            plain = summary(measure(lambda: client.get(url), args.repeat))
+        client.get(url)
+        cached = summary(measure(lambda: client.get(url), args.repeat))
+        rows.append([
+            name, plain['median'], cached['median'],
+            plain['p95'], cached['p95'],
+        ])
+    print_table(
+        ('url', 'plain ms', 'fragments ms', 'plain p95', 'fragments p95'),
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
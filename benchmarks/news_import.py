@@ -0,0 +1,146 @@
+"""Импорт комментариев: import_comments против сохранения по одному.
+
+    python -m benchmarks.news_import --records 10000 100000 1000000
+
+Файл NDJSON с долей --reject-ratio ругательных комментариев строится
+заранее. import_comments читает его потоком и пишет пачками; для
+сравнения первые --per-row-records записей сохраняются по одному через
+CommentForm и Comment.save(), как при отправке формы на сайте. Каждый
+прогон — отдельный процесс с DEBUG = False и без mmap SQLite: его
+пиковая память (ru_maxrss) не должна расти вместе с размером файла.
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from benchmarks.common import ROOT_DIR, print_table, setup_django
+
+
+def write_source(path, records, news_ids, usernames, reject_ratio, seed):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as file:
+        for index in range(records):
+            text = (
+                'Ты редиска' if rng.random() < reject_ratio
+                else f'Комментарий {index} из старой платформы'
+            )
+            file.write(json.dumps({
+                'news': rng.choice(news_ids),
+                'author': rng.choice(usernames),
+                'text': text,
+                'created': '2020-01-01T00:00:00+00:00',
+            }, ensure_ascii=False) + '\n')
+
+
+def run(args):
+    """Один прогон в дочернем процессе; печатает JSON со статистикой."""
+    setup_django('ya_news')
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connections
+    from news.forms import CommentForm
+    from news.models import Comment, News
+
+    # Без журнала запросов DEBUG, как на боевом сервере, и без mmap:
+    # отображённые страницы базы входили бы в RSS и росли вместе с ней.
+    settings.DEBUG = False
+    settings.DATABASES['default']['OPTIONS']['pragmas']['mmap_size'] = 0
+    connections.close_all()
+
+    call_command(
+        'seed_news', users=args.users, news=args.news, comments=0,
+        stdout=StringIO()
+    )
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    users = dict(get_user_model().objects.values_list('username', 'pk'))
+    source = Path(args.directory) / f'{args.mode}-{args.count}.ndjson'
+    write_source(
+        source, args.count, news_ids, list(users), args.reject_ratio,
+        args.seed
+    )
+    start = time.perf_counter()
+    if args.mode == 'import':
+        call_command(
+            'import_comments', str(source), batch_size=args.batch_size,
+            stdout=StringIO()
+        )
+    else:
+        with open(source, encoding='utf-8') as file:
+            for line in file:
+                record = json.loads(line)
+                form = CommentForm(data={'text': record['text']})
+                if form.is_valid():
+                    comment = form.save(commit=False)
+                    comment.news_id = record['news']
+                    comment.author_id = users[record['author']]
+                    comment.save()
+    duration = time.perf_counter() - start
+    return {
+        'seconds': duration,
+        'comments': Comment.objects.count(),
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def spawn(args, mode, count, directory):
+    command = [
+        sys.executable, '-m', 'benchmarks.news_import', '--mode', mode,
+        '--count', str(count), '--directory', directory,
+        '--users', str(args.users), '--news', str(args.news),
+        '--batch-size', str(args.batch_size),
+        '--reject-ratio', str(args.reject_ratio), '--seed', str(args.seed),
+    ]
+    output = subprocess.run(
+        command, cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--records', nargs='+', type=int, default=[10_000, 100_000]
+    )
+    parser.add_argument('--per-row-records', type=int, default=5_000)
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--news', type=int, default=1_000)
+    parser.add_argument('--batch-size', type=int, default=1_000)
+    parser.add_argument('--reject-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1)
+    # Служебные: один прогон в дочернем процессе.
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    parser.add_argument('--count', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        print(json.dumps(run(args)))
+        return
+    directory = tempfile.mkdtemp(prefix='bench-import-')
+    runs = [('per-row', args.per_row_records)] + [
+        ('import', count) for count in args.records
+    ]
+    rows = []
+    for mode, count in runs:
+        stats = spawn(args, mode, count, directory)
+        rows.append([
+            mode, count, stats['comments'], stats['seconds'],
+            count / stats['seconds'], stats['rss_mb'],
+        ])
+    print_table(
+        ['mode', 'records', 'comments', 'seconds', 'records/s',
+         'peak RSS MB'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Проверка комментариев: цикл по словам против автомата Ахо — Корасик.
+
+    python -m benchmarks.news_moderation --words 10000 --length 5000
+
+Сравнивается прежняя проверка (подстрока по каждому слову) и
+news.moderation.WordMatcher на длинных комментариях без запрещённых слов
+(худший случай — текст просматривается целиком).
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import measure, print_table, setup_django, summary
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+
+
+def legacy_is_rejected(text, words):
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return True
+    return False
+
+
+def random_word(rng, low, high):
+    return ''.join(rng.choices(ALPHABET, k=rng.randint(low, high)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=10_000)
+    parser.add_argument('--length', type=int, default=5_000)
+    parser.add_argument('--comments', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django('ya_news')
+    from news.moderation import WordMatcher
+
+    rng = random.Random(args.seed)
+    # Длинные слова из случайных букв почти не встречаются в тексте.
+    words = [random_word(rng, 8, 12) for _ in range(args.words)]
+    comments = []
+    for _ in range(args.comments):
+        comment = []
+        while sum(map(len, comment)) < args.length:
+            comment.append(random_word(rng, 2, 9))
+        comments.append(' '.join(comment))
+
+    start = time.perf_counter()
+    matcher = WordMatcher(words)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    legacy = measure(
+        lambda: [legacy_is_rejected(text, words) for text in comments], 3
+    )
+    automaton = measure(
+        lambda: [matcher.search(text) for text in comments], 3
+    )
+    assert [legacy_is_rejected(text, words) for text in comments] == [
+        matcher.search(text) is not None for text in comments
+    ]
+    per_comment = args.comments
+    print(
+        f'Слов: {args.words}, длина комментария: {args.length}, '
+        f'построение автомата: {build_ms:.1f} мс'
+    )
+    print_table(('method', 'ms/comment', 'p95 ms/comment'), [
+        ['loop', summary(legacy)['median'] / per_comment,
+         summary(legacy)['p95'] / per_comment],
+        ['aho-corasick', summary(automaton)['median'] / per_comment,
+         summary(automaton)['p95'] / per_comment],
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Кэш страниц для анонимных читателей: доля попаданий и задержка.
+
+    python -m benchmarks.news_page_cache --requests 5000 --write-ratio 0.01
+
+Данные строит команда seed_news. Смесь запросов главной и страниц
+новостей (популярность свежих новостей по Ципфу) с редкими новыми
+комментариями прогоняется без кэша и с кэшем. Попаданием считается
+ответ, на который не понадобилось ни одного запроса к базе.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import print_table, setup_django, summary
+
+
+def seed(news_count, comments_per_news, random_seed):
+    """Возвращает автора новых комментариев и id новостей от свежих."""
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from news.models import News
+
+    call_command(
+        'seed_news', users=1, news=news_count,
+        comments=news_count * comments_per_news, text_words=100,
+        seed=random_seed
+    )
+    author = get_user_model().objects.get()
+    return author, list(
+        News.objects.order_by('-date', '-id').values_list('pk', flat=True)
+    )
+
+
+def run(args, author, news_ids, timeout):
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    from news.models import Comment
+
+    settings.NEWS_PAGE_CACHE_TIMEOUT = timeout
+    cache.clear()
+    rng = random.Random(args.seed)
+    weights = [1 / rank for rank in range(1, len(news_ids) + 1)]
+    client = Client()
+    timings, hits = [], 0
+    for _ in range(args.requests):
+        if rng.random() < args.write_ratio:
+            news_id = rng.choices(news_ids, weights)[0]
+            Comment.objects.create(
+                news_id=news_id, author=author, text='Новый комментарий'
+            )
+            continue
+        if rng.random() < args.home_ratio:
+            url = reverse('news:home')
+        else:
+            url = reverse(
+                'news:detail', args=(rng.choices(news_ids, weights)[0],)
+            )
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        hits += not queries.captured_queries
+    return hits / len(timings), summary(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=200)
+    parser.add_argument('--comments', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--write-ratio', type=float, default=0.01)
+    parser.add_argument('--home-ratio', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django('ya_news')
+    author, news_ids = seed(args.news, args.comments, args.seed)
+    rows = []
+    for title, timeout in (('no cache', 0), ('page cache', 300)):
+        hit_rate, stats = run(args, author, news_ids, timeout)
+        rows.append([
+            title, hit_rate, stats['median'], stats['p95'], stats['max']
+        ])
+    print_table(('mode', 'hit rate', 'median ms', 'p95 ms', 'max ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
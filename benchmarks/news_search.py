@@ -0,0 +1,78 @@
+"""Поиск по новостям: индекс FTS5 против icontains.
+
+    python -m benchmarks.news_search --rows 500000 --db /tmp/search.sqlite3
+
+Корпус строит команда seed_news из словаря псевдослов с частотами по
+Ципфу. Для редких, средних и частых слов сравнивается первая страница
+результатов поиска через FTS5 (с ранжированием) и через title/text
+icontains (без него).
+"""
+import argparse
+import random
+
+from benchmarks.common import measure, print_table, setup_django, summary
+
+
+def seed(rows, vocabulary, random_seed):
+    from django.core.management import call_command
+    from news.models import News
+
+    existing = News.objects.count()
+    if existing < rows:
+        call_command(
+            'seed_news', users=0, news=rows - existing, comments=0,
+            vocabulary=vocabulary, seed=random_seed
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--vocabulary', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    setup_django('ya_news', args.db)
+    from django.db.models import Q
+    from news.models import News
+    from news.search import search_news
+    from yacommon.seeding import make_vocabulary
+
+    seed(args.rows, args.vocabulary, args.seed)
+    # Тот же словарь, что построила seed_news: он первым берётся из
+    # генератора с тем же зерном.
+    vocabulary = make_vocabulary(random.Random(args.seed), args.vocabulary)
+    queries = {
+        'частое': vocabulary[0],
+        'среднее': vocabulary[len(vocabulary) // 100],
+        'редкое': vocabulary[-1],
+        'два слова': f'{vocabulary[1]} {vocabulary[50]}',
+    }
+    rows = []
+    for title, query in queries.items():
+        fts = measure(lambda: search_news(query, args.limit), args.repeat)
+        condition = Q()
+        for word in query.split():
+            condition &= Q(title__icontains=word) | Q(text__icontains=word)
+        icontains = measure(
+            lambda: list(News.objects.filter(condition)[:args.limit]),
+            args.repeat
+        )
+        rows.append([
+            title, query,
+            summary(fts)['median'], summary(icontains)['median'],
+            summary(fts)['p95'], summary(icontains)['p95'],
+        ])
+    print(f'Новостей: {News.objects.count()}')
+    print_table(
+        ('query', 'words', 'fts5 ms', 'icontains ms', 'fts5 p95',
+         'icontains p95'),
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
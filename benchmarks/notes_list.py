@@ -0,0 +1,79 @@
+"""Список заметок крупного автора: время и память одной страницы.
+
+    python -m benchmarks.notes_list --notes 100000 --text-words 300
+
+Заметки автора строит команда seed_notes. Сравнивается прежний список
+(все заметки автора со всеми полями в одном шаблоне) и страница по
+курсору (author_id, id) с загрузкой только выводимых полей: первая и
+глубокая страницы. Память — пик по tracemalloc.
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.common import measure, print_table, setup_django, summary
+
+
+def peak_memory(func):
+    """Пик выделенной памяти за вызов func, в мегабайтах."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--text-words', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django('ya_note')
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.template.loader import render_to_string
+    from django.test import Client
+    from django.urls import reverse
+    from notes.models import Note
+    from yacommon.pagination import NEXT, KeysetPaginator
+
+    call_command(
+        'seed_notes', users=1, notes=args.notes, text_words=args.text_words
+    )
+    author = get_user_model().objects.get()
+    client = Client()
+    client.force_login(author)
+    url = reverse('notes:list')
+    middle = Note.objects.filter(author=author).order_by('id')[
+        args.notes // 2
+    ]
+    deep_cursor = KeysetPaginator(
+        Note.objects.all(), ('author_id', 'id'), 1
+    ).encode_cursor(NEXT, middle)
+    cases = {
+        'все заметки, все поля': lambda: render_to_string(
+            'notes/list.html',
+            {'object_list': Note.objects.filter(author=author)}
+        ),
+        'первая страница': lambda: client.get(url),
+        'глубокая страница': lambda: client.get(
+            url, {'cursor': deep_cursor}
+        ),
+    }
+    rows = []
+    for title, func in cases.items():
+        stats = summary(measure(func, args.repeat))
+        rows.append([
+            title, stats['median'], stats['p95'], peak_memory(func)
+        ])
+    print(
+        f'Заметок у автора: {args.notes}, текст {args.text_words} слов, '
+        f'на странице {settings.NOTES_COUNT_ON_LIST_PAGE}'
+    )
+    print_table(('case', 'median ms', 'p95 ms', 'peak MB'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Поиск по заметкам: задержка запросов «по мере набора» у крупного автора.
+
+    python -m benchmarks.notes_search --notes 150000 --users 200
+
+Данные строит команда seed_notes: число заметок у авторов распределено
+по Ципфу, запросы идут от имени автора с наибольшим числом заметок. Для
+запросов разной длины проверяется p95 задержки против целевых значений;
+при превышении бенчмарк завершается с кодом 1.
+"""
+import argparse
+import random
+import sys
+
+from benchmarks.common import measure, print_table, setup_django, summary
+
+# Целевые p95 в миллисекундах для каждого вида запроса. bm25 считается по
+# всем совпадениям автора, а короткий префикс у крупнейшего автора (около
+# 46 000 заметок при параметрах по умолчанию) совпадает почти со всеми его
+# заметками: время растёт с числом совпадений.
+TARGETS = {
+    'слово': 25.0,
+    'префикс 2': 250.0,
+    'префикс 4': 150.0,
+    'слово + префикс': 100.0,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--notes', type=int, default=150_000)
+    parser.add_argument('--zipf', type=float, default=1.3)
+    parser.add_argument('--vocabulary', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django('ya_note')
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db.models import Count
+    from notes.search import search_notes
+    from yacommon.seeding import make_vocabulary
+
+    call_command(
+        'seed_notes', users=args.users, notes=args.notes, zipf=args.zipf,
+        vocabulary=args.vocabulary, seed=args.seed
+    )
+    # Тот же словарь, что построила seed_notes: он первым берётся из
+    # генератора с тем же зерном.
+    vocabulary = make_vocabulary(random.Random(args.seed), args.vocabulary)
+    power_user = get_user_model().objects.annotate(
+        notes_count=Count('note')
+    ).order_by('-notes_count').first()
+    queries = {
+        'слово': vocabulary[100],
+        'префикс 2': vocabulary[100][:2],
+        'префикс 4': vocabulary[100][:4],
+        'слово + префикс': f'{vocabulary[0]} {vocabulary[300][:3]}',
+    }
+    rows, failed = [], False
+    for title, query in queries.items():
+        stats = summary(measure(
+            lambda: search_notes(
+                power_user, query, settings.NOTES_SEARCH_RESULTS
+            ),
+            args.repeat
+        ))
+        passed = stats['p95'] <= TARGETS[title]
+        failed = failed or not passed
+        rows.append([
+            title, query, stats['median'], stats['p95'], TARGETS[title],
+            'ok' if passed else 'FAIL',
+        ])
+    print(
+        f'Заметок у крупнейшего автора: {power_user.notes_count} '
+        f'из {args.notes} у {args.users} авторов'
+    )
+    print_table(
+        ('query', 'text', 'median ms', 'p95 ms', 'target p95', 'status'),
+        rows
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Запись заметок при разном числе шардов SQLite.
+
+    python -m benchmarks.notes_shards --shards 0 1 2 4 --writers 8
+
+Писатели — отдельные процессы (без общего GIL), каждый со своими
+авторами, создают заметки через wsgi.application ya_note. С 0 шардов всё
+пишется в default, как без шардирования; с N — заметки и версии уходят
+в шард автора, а в default остаётся короткая запись в реестр slug. Каждое
+число шардов — отдельный процесс со своими файлами баз.
+
+Шарды ускоряют запись, когда писателям есть что делать параллельно:
+ядра процессора или ожидание диска. --synchronous FULL добавляет fsync
+на каждый коммит, как в базе без WAL-послаблений.
+"""
+import argparse
+import json
+import multiprocessing
+import subprocess
+import sys
+import time
+from io import StringIO
+
+from benchmarks.common import (
+    ROOT_DIR, percentile, print_table, setup_django,
+)
+from benchmarks.http_load import (
+    Scenario, encode, make_workers, split, wsgi_request,
+)
+
+
+def write_notes(workers, count):
+    """Процесс-писатель: count заметок по очереди от своих авторов."""
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    scenario = Scenario('ya_note')
+    timings, errors = [], 0
+    start = time.monotonic()
+    for number in range(count):
+        worker = workers[number % len(workers)]
+        name, method, path, data, auth = scenario.ya_note(worker, 'add')
+        request_start = time.perf_counter()
+        status, _ = wsgi_request(
+            application, method, path, encode(data), worker.cookie(auth)
+        )
+        timings.append((time.perf_counter() - request_start) * 1000)
+        errors += status != 302
+    return start, time.monotonic(), timings, errors
+
+
+def run_shards(args):
+    """Один прогон с args.shard_count шардами (в дочернем процессе)."""
+    aliases = [f'notes_{number}' for number in range(args.shard_count)]
+    setup_django('ya_note', aliases=aliases)
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+
+    settings.NOTES_SHARDS = aliases
+    # OPTIONS у всех баз общие: копии настроек default неглубокие.
+    settings.DATABASES['default']['OPTIONS']['pragmas']['synchronous'] = (
+        args.synchronous
+    )
+    call_command(
+        'seed_notes', users=args.authors, notes=0, seed=args.seed,
+        stdout=StringIO()
+    )
+    workers = make_workers('ya_note', args.authors, args.seed)
+    # Открытые соединения SQLite нельзя наследовать через fork.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(args.writers) as pool:
+        results = pool.starmap(write_notes, [
+            (workers[number::args.writers], count)
+            for number, count in enumerate(
+                split(args.requests, args.writers)
+            )
+        ])
+    elapsed = (
+        max(end for _, end, _, _ in results)
+        - min(start for start, _, _, _ in results)
+    )
+    timings = [value for _, _, values, _ in results for value in values]
+    errors = sum(errors for *_, errors in results)
+    return {
+        'writes': len(timings),
+        'errors': errors,
+        'writes_per_second': (len(timings) - errors) / elapsed,
+        'p50': percentile(timings, 0.50),
+        'p95': percentile(timings, 0.95),
+        'p99': percentile(timings, 0.99),
+    }
+
+
+def spawn(args, shards):
+    command = [
+        sys.executable, '-m', 'benchmarks.notes_shards',
+        '--shard-count', str(shards), '--writers', str(args.writers),
+        '--authors', str(args.authors), '--requests', str(args.requests),
+        '--seed', str(args.seed), '--synchronous', args.synchronous,
+    ]
+    output = subprocess.run(
+        command, cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--shards', nargs='+', type=int, default=[0, 1, 2, 4])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--authors', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument(
+        '--synchronous', choices=('NORMAL', 'FULL'), default='NORMAL'
+    )
+    parser.add_argument('--seed', type=int, default=1)
+    # Служебный: прогон одного числа шардов в дочернем процессе.
+    parser.add_argument('--shard-count', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.shard_count is not None:
+        print(json.dumps(run_shards(args)))
+        return
+    rows = []
+    for shards in args.shards:
+        stats = spawn(args, shards)
+        rows.append([
+            shards, args.writers, stats['writes'], stats['errors'],
+            stats['writes_per_second'], stats['p50'], stats['p95'],
+            stats['p99'],
+        ])
+    print_table(
+        ['shards', 'writers', 'writes', 'errors', 'writes/s', 'p50 ms',
+         'p95 ms', 'p99 ms'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
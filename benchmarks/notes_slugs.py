@@ -0,0 +1,74 @@
+"""Подбор slug заметки: стоимость по мере роста числа совпадений.
+
+    python -m benchmarks.notes_slugs --collisions 0 10 100 1000 10000 100000
+
+Для каждого уровня команда seed_notes доводит число заметок с заголовком
+по умолчанию (и одной основой slug) до указанного. Сравнивается
+allocate_slug (один запрос-диапазон) с перебором base-2, base-3, …
+через exists().
+Перебор меряется только до --naive-limit совпадений: дальше он слишком долог.
+"""
+import argparse
+from io import StringIO
+
+from benchmarks.common import measure, print_table, setup_django, summary
+
+TITLE = 'Название заметки'
+
+
+def naive_slug(queryset, base):
+    """Прежний подход: проверка каждого кандидата отдельным запросом."""
+    slug, number = base, 1
+    while queryset.filter(slug=slug).exists():
+        number += 1
+        slug = f'{base}-{number}'
+    return slug
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--collisions', type=int, nargs='+',
+        default=[0, 10, 100, 1_000, 10_000, 100_000]
+    )
+    parser.add_argument('--naive-limit', type=int, default=1_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django('ya_note')
+    from django.core.management import call_command
+    from notes.models import Note
+    from notes.slugs import allocate_slug
+    from pytils.translit import slugify
+
+    base = slugify(TITLE)
+    max_length = Note._meta.get_field('slug').max_length
+    created, rows = 0, []
+    for level, collisions in enumerate(sorted(args.collisions)):
+        call_command(
+            'seed_notes', users=1, notes=max(collisions - created, 0),
+            collisions=1.0, common_titles=[TITLE], text_words=5,
+            username_prefix=f'level-{level}-', stdout=StringIO()
+        )
+        created = max(created, collisions)
+        allocated = summary(measure(
+            lambda: allocate_slug(Note.objects, TITLE, max_length),
+            args.repeat
+        ))
+        naive = (
+            summary(measure(
+                lambda: naive_slug(Note.objects, base), args.repeat
+            ))['median']
+            if collisions <= args.naive_limit else '-'
+        )
+        rows.append([
+            collisions, allocated['median'], allocated['p95'], naive
+        ])
+    print_table(
+        ('collisions', 'allocate ms', 'allocate p95', 'exists() loop ms'),
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Конкурентная запись в SQLite: настройки по умолчанию против настроенных.
+
+    python -m benchmarks.sqlite_writers ya_news --writers 1 4 8 16
+    python -m benchmarks.sqlite_writers ya_note --requests 2000
+
+Писатели — потоки, каждый со своим пользователем, шлют в wsgi.application
+только записи: комментарии к новостям (ya_news) или новые заметки
+(ya_note). Сравниваются профили базы:
+
+* default — стандартный бэкенд sqlite3: журнал DELETE, отложенный BEGIN,
+  соединение на каждый запрос, без повторов;
+* tuned-no-retry — бэкенд проекта (WAL, PRAGMA, BEGIN IMMEDIATE,
+  CONN_MAX_AGE) без повторов при занятой базе;
+* tuned — то же с retry_on_busy, как в настройках проекта.
+
+Каждый профиль запускается в отдельном процессе на чистой базе: настройки
+базы читаются один раз при старте Django.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from benchmarks.common import ROOT_DIR, print_table, setup_django
+from benchmarks.http_load import (
+    Recorder, Scenario, encode, make_workers, split, wsgi_request,
+)
+
+PROFILES = {
+    'default': {
+        'database': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'OPTIONS': {},
+            'CONN_MAX_AGE': 0,
+        },
+        'retries': 0,
+    },
+    'tuned-no-retry': {'database': {}, 'retries': 0},
+    'tuned': {'database': {}, 'retries': None},
+}
+# Запрос записи в каждом проекте.
+WRITES = {'ya_news': 'comment', 'ya_note': 'add'}
+
+
+def run_profile(args):
+    """Прогон одного профиля с одним числом писателей (в дочернем процессе)."""
+    profile = PROFILES[args.profile]
+    setup_django(args.project, database=profile['database'])
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.core.wsgi import get_wsgi_application
+
+    if profile['retries'] is not None:
+        settings.SQLITE_BUSY_RETRIES = profile['retries']
+    news_ids = ()
+    if args.project == 'ya_news':
+        from news.models import News
+
+        call_command(
+            'seed_news', users=args.writer_count, news=args.news,
+            comments=0, seed=args.seed, stdout=StringIO()
+        )
+        news_ids = News.objects.order_by('-date', '-id').values_list(
+            'id', flat=True
+        )
+    else:
+        call_command(
+            'seed_notes', users=args.writer_count, notes=0, seed=args.seed,
+            stdout=StringIO()
+        )
+    scenario = Scenario(args.project, news_ids)
+    write = getattr(scenario, args.project)
+    workers = make_workers(args.project, args.writer_count, args.seed)
+    application = get_wsgi_application()
+    recorder = Recorder()
+
+    def work(worker, count):
+        for _ in range(count):
+            name, method, path, data, auth = write(
+                worker, WRITES[args.project]
+            )
+            start = time.perf_counter()
+            status, queries = wsgi_request(
+                application, method, path, encode(data), worker.cookie(auth)
+            )
+            scenario.done(worker, name, data, status)
+            recorder.add(
+                name, (time.perf_counter() - start) * 1000, status, queries
+            )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(workers)) as executor:
+        futures = [
+            executor.submit(work, worker, count)
+            for worker, count in zip(
+                workers, split(args.requests, len(workers))
+            )
+        ]
+    for future in futures:
+        future.result()
+    return recorder.report(time.perf_counter() - start)['total']
+
+
+def spawn(args, profile, writers):
+    command = [
+        sys.executable, '-m', 'benchmarks.sqlite_writers', args.project,
+        '--profile', profile, '--writer-count', str(writers),
+        '--requests', str(args.requests), '--news', str(args.news),
+        '--seed', str(args.seed),
+    ]
+    output = subprocess.run(
+        command, cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('project', choices=sorted(WRITES))
+    parser.add_argument(
+        '--profiles', nargs='+', choices=PROFILES, default=list(PROFILES)
+    )
+    parser.add_argument('--writers', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=1_000)
+    parser.add_argument('--news', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    # Служебные: запуск одного профиля в дочернем процессе.
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument('--writer-count', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        print(json.dumps(run_profile(args)))
+        return
+    rows = []
+    for writers in args.writers:
+        for profile in args.profiles:
+            stats = spawn(args, profile, writers)
+            # В пропускную способность идут только удавшиеся записи.
+            succeeded = stats['requests'] - stats['errors']
+            rows.append([
+                profile, writers, stats['requests'], stats['errors'],
+                stats['rps'] * succeeded / stats['requests'], stats['p50'],
+                stats['p95'], stats['p99'],
+            ])
+    print_table(
+        ['profile', 'writers', 'writes', 'errors', 'writes/s', 'p50 ms',
+         'p95 ms', 'p99 ms'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Время тестовых наборов: миграции в каждой сессии против снимка баз.
+
+    python -m benchmarks.suite_timing --workers 4 -- -k "not search"
+
+Каждый набор (ya_news, ya_note) запускается pytest в отдельном процессе
+в четырёх режимах:
+
+* migrate — TEST_DB_TEMPLATE_DIR пуст, базы создаются миграциями, как
+  в Django по умолчанию;
+* cold — снимок строится в пустом временном каталоге;
+* warm — снимок из того же каталога уже готов;
+* default — как в run_tests.py: готовый снимок и pytest-xdist с
+  --workers процессами (по умолчанию столько же, сколько даёт набору
+  run_tests.py).
+
+Время — медиана --repeat запусков, ускорение — относительно migrate.
+Аргументы после -- передаются pytest.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT_DIR, SETTINGS, print_table
+from run_tests import default_workers
+
+MODES = ('migrate', 'cold', 'warm', 'default')
+
+
+def run_suite(project, mode, template_dir, workers, pytest_args):
+    """Один запуск pytest; возвращает время в секундах."""
+    if mode == 'cold':
+        shutil.rmtree(template_dir, ignore_errors=True)
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': SETTINGS[project],
+        'TEST_DB_TEMPLATE_DIR': '' if mode == 'migrate' else template_dir,
+    }
+    command = [
+        sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider',
+        '-p', 'no:warnings',
+        '-n', str(workers if mode == 'default' else 0), *pytest_args,
+    ]
+    start = time.perf_counter()
+    subprocess.run(
+        command, cwd=ROOT_DIR / project, env=env, check=True,
+        stdout=subprocess.DEVNULL
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--projects', nargs='+', choices=SETTINGS, default=list(SETTINGS)
+    )
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--workers', type=int, default=default_workers())
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('pytest_args', nargs='*')
+    args = parser.parse_args()
+
+    rows = []
+    for project in args.projects:
+        template_dir = tempfile.mkdtemp(prefix='bench-testdb-')
+        baseline = None
+        for mode in args.modes:
+            seconds = statistics.median(
+                run_suite(
+                    project, mode, template_dir, args.workers,
+                    args.pytest_args
+                )
+                for _ in range(args.repeat)
+            )
+            if mode == 'migrate':
+                baseline = seconds
+            rows.append([
+                project, mode, seconds,
+                f'{baseline / seconds:.2f}x' if baseline else '-',
+            ])
+        shutil.rmtree(template_dir, ignore_errors=True)
+    print(f'CPU: {os.cpu_count()}, воркеров xdist: {args.workers}')
+    print_table(['project', 'mode', 'seconds', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
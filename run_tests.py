@@ -0,0 +1,209 @@
+"""Проверки проекта: flake8, структура и тесты обоих проектов параллельно.
+
+    python run_tests.py [--jobs N] [--workers N] [--budget ya_news=60]
+                        [-- аргументы pytest]
+
+Этапы независимы и запускаются одновременно, каждый в своём процессе.
+Тесты ya_news и ya_note получают свой DJANGO_SETTINGS_MODULE и свой
+временный каталог (TMPDIR), базы у них и так разные: снимки и тестовые
+базы в памяти у каждого проекта и процесса свои (см. yacommon/testdb.py).
+Каждый набор тестов идёт в --workers процессах pytest-xdist; по
+умолчанию ядра делятся между двумя наборами поровну, на одном ядре
+xdist не запускается (-n 0).
+Вывод этапов идёт в stderr построчно с префиксом [этап].
+
+Сообщения об ошибках те же, что у прежнего run_tests.sh. Код выхода —
+код первого упавшего этапа в прежнем порядке: flake8, структура,
+ya_news, ya_note. Время каждого этапа дописывается строкой JSON в
+--durations; --budget этап=секунды делает превышение ошибкой (код 1).
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+Stage = namedtuple('Stage', ('name', 'command', 'cwd', 'settings', 'error'))
+Result = namedtuple('Result', ('stage', 'returncode', 'seconds'))
+
+FLAKE8_OK = ' flake8 завершил проверку кода, ошибок не обнаружено '
+BUDGET_ERROR = ' Этап {name} шёл {seconds:.1f} с при бюджете {budget:g} с '
+TEST_STAGES = 2
+
+output_lock = threading.Lock()
+
+
+def default_workers():
+    """Воркеров xdist на набор тестов: оба набора идут одновременно."""
+    return (os.cpu_count() or 1) // TEST_STAGES
+
+
+def stages(pytest_args, workers):
+    pytest = [
+        sys.executable, '-m', 'pytest', '--tb=line', '-n', str(workers),
+        *pytest_args,
+    ]
+    return (
+        Stage(
+            'flake8',
+            [sys.executable, '-m', 'flake8', '--config=setup.cfg'],
+            BASE_DIR, None,
+            ' flake8 обнаружил отклонения от стандартов, приведите код в '
+            'соответствие с PEP8 ',
+        ),
+        Stage(
+            'structure', [sys.executable, 'structure_test.py'], BASE_DIR,
+            None,
+            ' Убедитесь, что написанные вами тесты скопированы в указанные '
+            'в ТЗ директории ',
+        ),
+        Stage(
+            'ya_news', pytest, BASE_DIR / 'ya_news', 'yanews.settings',
+            ' При запуске упали ваши тесты для проекта YaNews. Проверьте '
+            'тесты этого проекта ',
+        ),
+        Stage(
+            'ya_note', pytest, BASE_DIR / 'ya_note', 'yanote.settings',
+            ' При запуске упали ваши тесты для проекта YaNote. Проверьте '
+            'тесты этого проекта ',
+        ),
+    )
+
+
+def print_message(message, symbol, error=False):
+    """Строка message по центру терминала, заполненная symbol."""
+    width = shutil.get_terminal_size().columns
+    color = '\033[0;31m' if error else '\033[0;32m'
+    print(f'{color}{message.center(width, symbol)}\033[0m', flush=True)
+
+
+def run_stage(stage):
+    """Запускает этап, пересылая его вывод с префиксом; код и время."""
+    env = {**os.environ, 'PYTHONUNBUFFERED': '1'}
+    env.pop('DJANGO_SETTINGS_MODULE', None)
+    if stage.settings:
+        env['DJANGO_SETTINGS_MODULE'] = stage.settings
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix=f'{stage.name}-') as tmp:
+        env['TMPDIR'] = tmp
+        process = subprocess.Popen(
+            stage.command, cwd=stage.cwd, env=env, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, errors='replace'
+        )
+        for line in process.stdout:
+            with output_lock:
+                sys.stderr.write(f'[{stage.name}] {line}')
+                sys.stderr.flush()
+        returncode = process.wait()
+    return Result(stage, returncode, time.perf_counter() - start)
+
+
+def parse_budget(value):
+    name, _, seconds = value.partition('=')
+    try:
+        return name, float(seconds)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(
+            f'нужно этап=секунды, а не {value}'
+        ) from error
+
+
+def record(path, results, wall, exit_code, workers):
+    """Дописывает время этапов строкой JSON, чтобы следить за ним."""
+    entry = {
+        'started': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'wall_seconds': round(wall, 3),
+        'workers': workers,
+        'exit_code': exit_code,
+        'stages': {
+            result.stage.name: {
+                'seconds': round(result.seconds, 3),
+                'returncode': result.returncode,
+            }
+            for result in results
+        },
+    }
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def report(results, budgets):
+    """Печатает итоги этапов; возвращает код выхода."""
+    exit_code = 0
+    for result in results:
+        if result.stage.name == 'flake8' and not result.returncode:
+            print_message(FLAKE8_OK, '=')
+        elif result.returncode:
+            print_message(result.stage.error, '=', error=True)
+            exit_code = exit_code or result.returncode
+    for result in results:
+        budget = budgets.get(result.stage.name)
+        if budget is not None and result.seconds > budget:
+            print_message(BUDGET_ERROR.format(
+                name=result.stage.name, seconds=result.seconds,
+                budget=budget
+            ), '=', error=True)
+            exit_code = exit_code or 1
+    if exit_code:
+        print('```', file=sys.stderr)
+    return exit_code
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--jobs', type=int, default=4,
+        help='Сколько этапов выполнять одновременно.'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=default_workers(),
+        help='Воркеров pytest-xdist на набор тестов; 0 — без xdist.'
+    )
+    parser.add_argument(
+        '--budget', type=parse_budget, action='append', default=[],
+        help='Бюджет времени этапа: этап=секунды; можно несколько.'
+    )
+    parser.add_argument(
+        '--durations', default=str(BASE_DIR / '.test-durations.jsonl'),
+        help='Файл JSON Lines с временем этапов; пустой — не писать.'
+    )
+    parser.add_argument('pytest_args', nargs='*')
+    args = parser.parse_args()
+    all_stages = stages(args.pytest_args, args.workers)
+    names = [stage.name for stage in all_stages]
+    for name, _ in args.budget:
+        if name not in names:
+            parser.error(f'нет этапа {name}; этапы: {", ".join(names)}')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.jobs) as executor:
+        results = list(executor.map(run_stage, all_stages))
+    wall = time.perf_counter() - start
+    with output_lock:
+        for result in results:
+            print(
+                f'{result.stage.name:>9}: {result.seconds:6.1f} с, '
+                f'код {result.returncode}', file=sys.stderr
+            )
+        print(f'{"всего":>9}: {wall:6.1f} с', file=sys.stderr)
+    exit_code = report(results, dict(args.budget))
+    if args.durations:
+        record(args.durations, results, wall, exit_code, args.workers)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Асинхронные варианты представлений для работы под ASGI."""
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def database_sync_to_async(func):
+    """Выполняет синхронный код с ORM в пуле потоков, не блокируя цикл.
+
+    thread_sensitive=False снимает очередь к единственному потоку: запросы
+    идут параллельно, каждый поток со своим соединением. Сигналы начала и
+    конца запроса закрывают соединения только в потоке обработчика, поэтому
+    устаревшие соединения пула закрываются здесь, до и после вызова.
+    """
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
+class AsyncViewMixin:
+    """Делает из представления-класса асинхронное представление.
+
+    Синхронное представление ASGIHandler выполняет в общем потоке, и
+    запросы стоят к нему в очереди. Здесь представление вместе с
+    рендерингом шаблона (в шаблоне тоже бывают запросы к базе) уходит в
+    database_sync_to_async, а цикл событий остаётся свободен.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        def render_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return response
+
+        run = database_sync_to_async(render_view)
+
+        async def async_view(request, *args, **kwargs):
+            return await run(request, *args, **kwargs)
+
+        update_wrapper(async_view, view)
+        return async_view
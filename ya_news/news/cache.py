@@ -0,0 +1,160 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.functional import cached_property
+from django.utils.http import http_date, quote_etag
+
+from yacommon.replicas import pin_to_primary
+
+from .models import News
+
+LIST_VERSION_KEY = 'news:list:version'
+
+
+def news_version_key(news_id):
+    return f'news:{news_id}:version'
+
+
+def get_versions(keys):
+    """Возвращает текущие версии одним обращением к кэшу.
+
+    Отсутствующая версия заводится заново от текущего времени, чтобы не
+    совпасть с версиями страниц, оставшихся в кэше после вытеснения ключа.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*keys):
+    """Сдвигает версии, делая недоступными страницы под старыми версиями."""
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_news(news_id):
+    """Сбрасывает страницу новости и списки новостей."""
+    bump_versions(news_version_key(news_id), LIST_VERSION_KEY)
+
+
+class AnonymousPageCacheMixin:
+    """Кэширует ответ целиком для анонимных читателей.
+
+    Ключ строится из полного пути запроса и версий, которые возвращает
+    get_cache_version_keys(); сброс страницы — это сдвиг версии.
+    """
+
+    def get_cache_version_keys(self):
+        return [LIST_VERSION_KEY]
+
+    def dispatch(self, request, *args, **kwargs):
+        timeout = settings.NEWS_PAGE_CACHE_TIMEOUT
+        if (
+            not timeout
+            or request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        versions = '.'.join(
+            map(str, get_versions(self.get_cache_version_keys()))
+        )
+        key = f'news:page:{path}:{versions}'
+        response = cache.get(key)
+        if response is not None:
+            return response
+        # Страница ляжет под свежими версиями, а реплика могла ещё не
+        # догнать запись, которая их сдвинула: строим её по основной базе.
+        pin_to_primary()
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            if hasattr(response, 'add_post_render_callback'):
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(key, rendered, timeout)
+                )
+            else:
+                cache.set(key, response, timeout)
+        return response
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на условный GET, не выполняя представление.
+
+    Текущие валидаторы вычисляются (не больше чем одним лёгким запросом)
+    только для условных запросов; обычный ответ получает их из данных,
+    которые представление уже загрузило. ETag зависит от пользователя:
+    шапка страницы у каждого своя.
+    """
+
+    def get_validators(self):
+        """Текущие (etag, last_modified) ресурса."""
+        return None, None
+
+    def get_response_validators(self):
+        """Валидаторы для только что построенного ответа."""
+        return self.get_validators()
+
+    def get_user_etag(self, stamp):
+        user = self.request.user
+        key = user.pk if user.is_authenticated else 'anon'
+        return quote_etag(f'{key}-{stamp}')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        if (
+            'HTTP_IF_NONE_MATCH' in request.META
+            or 'HTTP_IF_MODIFIED_SINCE' in request.META
+        ):
+            etag, last_modified = self.get_validators()
+            response = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=last_modified and int(last_modified.timestamp())
+            )
+            if response is not None:
+                return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.has_header('ETag'):
+            etag, last_modified = self.get_response_validators()
+            if etag:
+                response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(
+                    last_modified.timestamp()
+                )
+        return response
+
+
+class ListConditionalGetMixin(ConditionalGetMixin):
+    """ETag списков новостей — из базы одним агрегирующим запросом.
+
+    Версия списков в LocMemCache у каждого процесса своя: запись,
+    обработанная другим воркером, её не сдвигает. Последнее изменение
+    новостей и их число видны всем процессам; число ловит удаление,
+    которое не сдвигает максимум modified.
+    """
+
+    def get_validators(self):
+        return self.list_validators
+
+    @cached_property
+    def list_validators(self):
+        """Промах условного запроса не повторяет запрос при отрисовке."""
+        stamp = News.objects.aggregate(
+            modified=Max('modified'), count=Count('pk')
+        )
+        modified = stamp['modified']
+        return self.get_user_etag(
+            f'{stamp["count"]}-{modified and modified.timestamp()}'
+        ), None
@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def fragment_cache(request):
+    """Срок хранения фрагментов шаблонов для тега {% cache %}."""
+    return {'fragment_cache_timeout': settings.NEWS_FRAGMENT_CACHE_TIMEOUT}
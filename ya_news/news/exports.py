@@ -0,0 +1,27 @@
+"""Наборы данных для выгрузки: values()-выборки и их колонки."""
+from .models import Comment, News
+
+NEWS_COLUMNS = {
+    'id': 'id', 'title': 'title', 'text': 'text', 'date': 'date',
+    'comment_count': 'comment_count',
+}
+# Колонки news, author, text и created понимает import_comments.
+COMMENT_COLUMNS = {
+    'id': 'id', 'news': 'news_id', 'author': 'author__username',
+    'text': 'text', 'created': 'created',
+}
+
+
+def news_rows():
+    return News.objects.values(*NEWS_COLUMNS.values())
+
+
+def comment_rows():
+    return Comment.objects.values(*COMMENT_COLUMNS.values())
+
+
+# Имя набора: (функция выборки, колонки файла и поля выборки).
+DATASETS = {
+    'news': (news_rows, NEWS_COLUMNS),
+    'comments': (comment_rows, COMMENT_COLUMNS),
+}
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.exports import DATASETS
+from yacommon.export import CHUNK_SIZE, FORMATS, export_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает новости или комментарии в NDJSON или CSV, '
+        'при желании со сжатием gzip. Память не растёт с числом строк.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', default='-', help='Файл; - — стандартный вывод.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        rows, columns = DATASETS[options['dataset']]
+        chunks = export_chunks(
+            rows(), columns, options['format'], options['gzip'],
+            options['chunk_size']
+        )
+        output = options['output']
+        try:
+            file = (
+                sys.stdout.buffer if output == '-' else open(output, 'wb')
+            )
+        except OSError as error:
+            raise CommandError(f'Не открыть {output}: {error}') from error
+        written = 0
+        try:
+            for chunk in chunks:
+                file.write(chunk)
+                written += len(chunk)
+        finally:
+            if output != '-':
+                file.close()
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f'{options["dataset"]}: {written} байт в {output}.'
+            ))
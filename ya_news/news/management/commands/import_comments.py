@@ -0,0 +1,308 @@
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import nullcontext
+from itertools import groupby, islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from news.cache import LIST_VERSION_KEY, bump_versions, news_version_key
+from news.forms import CommentForm
+from news.models import Comment, CommentImport, News
+from yacommon.seeding import batched
+from yacommon.sqlite3 import retry_on_busy
+
+FIELDS = ('news', 'author', 'text')
+# Столько id в одном IN: SQLite до 3.32 не берёт больше 999 параметров.
+LOOKUP_CHUNK = 500
+
+
+def read_ndjson(file):
+    """Записи NDJSON по строке; пустая строка — тоже позиция источника."""
+    for line in file:
+        if not line.strip():
+            yield None, None
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError:
+            yield None, 'некорректный JSON'
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row, None
+
+
+READERS = {'ndjson': read_ndjson, 'csv': read_csv}
+
+
+def parse_record(record):
+    """Поля записи: (id новости, имя автора, текст, время) или ошибка."""
+    if not isinstance(record, dict) or any(
+        not record.get(field) for field in FIELDS
+    ):
+        return None, f'нет полей {", ".join(FIELDS)}'
+    try:
+        news_id = int(record['news'])
+    except (TypeError, ValueError):
+        return None, 'некорректный id новости'
+    created = record.get('created')
+    if created:
+        try:
+            created = parse_datetime(created)
+        except (TypeError, ValueError):
+            created = None
+        if created is None:
+            return None, 'некорректное время'
+        if timezone.is_naive(created):
+            created = timezone.make_aware(created)
+    return (news_id, str(record['author']), str(record['text']), created), None
+
+
+class BoundedCache(dict):
+    """Словарь, который очищается целиком, дойдя до предела размера.
+
+    Ключи одной пачки должны помещаться в кэш вместе, поэтому предел не
+    меньше размера пачки.
+    """
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def missing(self, keys):
+        """Ключи пачки, которые нужно найти в базе.
+
+        Если недостающие ключи не поместятся, кэш очищается заранее и
+        искать нужно все: иначе очистка при добавлении выбросила бы и
+        ключи пачки, найденные раньше.
+        """
+        missing = keys - self.keys()
+        if len(self) + len(missing) > self.size:
+            self.clear()
+            return set(keys)
+        return missing
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует комментарии из NDJSON или CSV с полями '
+        'news (id), author (имя пользователя), text и необязательным '
+        'created (ISO 8601). Тексты проходят модерацию CommentForm, '
+        'пачки пишутся bulk_create. Прерванный импорт продолжается с '
+        'места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл; - — стандартный ввод.')
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='По умолчанию — по расширению файла (.csv или NDJSON).'
+        )
+        parser.add_argument(
+            '--source',
+            help='Имя импорта для продолжения; по умолчанию — путь файла.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1_000)
+        parser.add_argument(
+            '--cache-size', type=int, default=100_000,
+            help='Сколько id новостей и авторов держать в памяти.'
+        )
+        parser.add_argument(
+            '--rejects', help='Файл NDJSON для отклонённых записей.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать источник сначала, забыв прежний ход импорта.'
+        )
+        parser.add_argument(
+            '--progress', type=int, default=100_000,
+            help='Сообщать о ходе импорта каждые столько записей.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['cache_size'] < options['batch_size']:
+            raise CommandError('--cache-size меньше --batch-size.')
+        if path == '-' and not options['source']:
+            raise CommandError('Для стандартного ввода нужен --source.')
+        source = options['source'] or str(Path(path).resolve())
+        reader = READERS[
+            options['format']
+            or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        ]
+        self.news_ids = BoundedCache(options['cache_size'])
+        self.author_ids = BoundedCache(options['cache_size'])
+        self.reasons = Counter()
+        checkpoint, _ = CommentImport.objects.get_or_create(source=source)
+        if options['restart']:
+            checkpoint.position = checkpoint.imported = 0
+            checkpoint.rejected = 0
+            checkpoint.save()
+        skipped = checkpoint.position
+        if skipped:
+            self.stdout.write(f'Продолжение {source} с записи {skipped}.')
+        start, processed = time.perf_counter(), 0
+        reported = 0
+        with self.open(path) as file, self.open_rejects(
+            options['rejects'], append=bool(skipped)
+        ) as rejects:
+            records = islice(enumerate(reader(file)), skipped, None)
+            for batch in batched(records, options['batch_size']):
+                self.import_batch(checkpoint, batch, rejects)
+                # С DEBUG журнал запросов рос бы с каждой пачкой.
+                reset_queries()
+                processed += len(batch)
+                if processed - reported >= options['progress']:
+                    reported = processed
+                    self.report(checkpoint, processed, start)
+        self.report(checkpoint, processed, start, final=True)
+
+    @staticmethod
+    def open(path):
+        if path == '-':
+            return nullcontext(sys.stdin)
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(f'Не открыть {path}: {error}') from error
+
+    @staticmethod
+    def open_rejects(path, append):
+        if path is None:
+            return nullcontext()
+        return open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def import_batch(self, checkpoint, batch, rejects):
+        """Проверяет пачку записей и пишет её вместе с позицией источника."""
+        parsed, rejected = self.parse_batch(batch)
+        self.resolve(parsed)
+        comments = []
+        for number, record, (news_id, username, text, created) in parsed:
+            if self.news_ids.get(news_id) is None:
+                error = 'нет новости'
+            elif self.author_ids.get(username) is None:
+                error = 'нет автора'
+            else:
+                form = CommentForm(data={'text': text})
+                if form.is_valid():
+                    comment = form.save(commit=False)
+                    comment.news_id = news_id
+                    comment.author_id = self.author_ids[username]
+                    comment.created = created or timezone.now()
+                    comments.append(comment)
+                    continue
+                error = '; '.join(form.errors['text'])
+            rejected.append((number, record, error))
+        self.save_batch(checkpoint, comments, len(batch), len(rejected))
+        # Отклонённые пишутся после коммита: при повторе пачки после
+        # прерывания они не задвоятся.
+        self.write_rejects(rejected, rejects)
+
+    @staticmethod
+    def parse_batch(batch):
+        """Разбирает записи пачки: (разобранные, отклонённые)."""
+        parsed, rejected = [], []
+        for number, (record, error) in batch:
+            if record is None and error is None:
+                continue
+            fields = None
+            if error is None:
+                fields, error = parse_record(record)
+            if error is None:
+                parsed.append((number, record, fields))
+            else:
+                rejected.append((number, record, error))
+        return parsed, rejected
+
+    def write_rejects(self, rejected, rejects):
+        for number, record, error in rejected:
+            self.reasons[error] += 1
+            if rejects is not None:
+                rejects.write(json.dumps({
+                    'record': number + 1, 'error': error, 'data': record,
+                }, ensure_ascii=False) + '\n')
+
+    def resolve(self, parsed):
+        """Находит id новостей и авторов, которых ещё нет в кэшах."""
+        news_ids = self.news_ids.missing(
+            {fields[0] for _, _, fields in parsed}
+        )
+        found = set()
+        for chunk in batched(sorted(news_ids), LOOKUP_CHUNK):
+            found.update(
+                News.objects.filter(pk__in=chunk)
+                .values_list('pk', flat=True)
+            )
+        # Отсутствующие тоже кэшируются: None — «нет такой записи».
+        self.news_ids.update(
+            {news_id: news_id in found or None for news_id in news_ids}
+        )
+        usernames = self.author_ids.missing(
+            {fields[1] for _, _, fields in parsed}
+        )
+        User = get_user_model()
+        found = {}
+        for chunk in batched(sorted(usernames), LOOKUP_CHUNK):
+            found.update(
+                User.objects.filter(username__in=chunk)
+                .values_list('username', 'pk')
+            )
+        self.author_ids.update(
+            {username: found.get(username) for username in usernames}
+        )
+
+    @retry_on_busy
+    def save_batch(self, checkpoint, comments, processed, rejected):
+        """Комментарии, счётчики новостей и позиция — одной транзакцией.
+
+        bulk_create обходит сигналы Comment, поэтому счётчики, время
+        изменения новостей и версии кэша страниц обновляются здесь.
+        Новые комментарии в поток страницы не публикуются: это архив.
+        """
+        Comment.objects.bulk_create(comments)
+        added = Counter(comment.news_id for comment in comments)
+        now = timezone.now()
+        for count, group in groupby(
+            sorted(added, key=added.get), key=added.get
+        ):
+            for chunk in batched(group, LOOKUP_CHUNK):
+                News.objects.filter(pk__in=chunk).update(
+                    comment_count=F('comment_count') + count, modified=now
+                )
+        CommentImport.objects.filter(pk=checkpoint.pk).update(
+            position=F('position') + processed,
+            imported=F('imported') + len(comments),
+            rejected=F('rejected') + rejected,
+        )
+        checkpoint.refresh_from_db()
+        keys = [news_version_key(news_id) for news_id in added]
+        if keys:
+            transaction.on_commit(
+                lambda: bump_versions(*keys, LIST_VERSION_KEY)
+            )
+
+    def report(self, checkpoint, processed, start, final=False):
+        duration = time.perf_counter() - start
+        rate = processed / max(duration, 1e-9)
+        message = (
+            f'{checkpoint.source}: позиция {checkpoint.position}, '
+            f'добавлено {checkpoint.imported}, отклонено '
+            f'{checkpoint.rejected}; за этот запуск {processed} записей '
+            f'за {duration:.1f} с ({rate:.0f} записей/с)'
+        )
+        if not final:
+            self.stdout.write(message)
+            return
+        self.stdout.write(self.style.SUCCESS(message))
+        for reason, count in self.reasons.most_common():
+            self.stdout.write(f'  {reason}: {count}')
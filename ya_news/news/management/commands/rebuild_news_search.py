@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from news import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздаёт полнотекстовый индекс news_search и его триггеры '
+        'и заново заполняет индекс из таблицы новостей.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Индекс FTS5 поддерживается только в SQLite.')
+        with connection.cursor() as cursor:
+            search.install(cursor)
+            cursor.execute('SELECT count(*) FROM news_search')
+            indexed = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс поиска перестроен, новостей в индексе: {indexed}.'
+        ))
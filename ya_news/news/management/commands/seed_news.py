@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+from django.core.management.base import CommandError
+
+from news.models import Comment, News
+from yacommon.seeding import SeedCommand, zipf_cum_weights
+
+
+class Command(SeedCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, новостями и '
+        'комментариями. Одинаковый --seed на пустой базе даёт одинаковые '
+        'данные.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--news', type=int, default=1_000)
+        parser.add_argument('--comments', type=int, default=10_000)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель Ципфа: чем больше, тем горячее свежие новости.'
+        )
+        parser.add_argument('--news-per-day', type=int, default=300)
+        parser.add_argument('--title-words', type=int, default=4)
+        parser.add_argument('--text-words', type=int, default=60)
+        parser.add_argument('--comment-words', type=int, default=12)
+
+    def seed(self, options, user_ids):
+        self.seed_news(options)
+        if options['comments']:
+            if not user_ids:
+                raise CommandError('Комментариям нужны авторы: --users > 0.')
+            self.seed_comments(options, user_ids)
+            News.objects.recount_comments()
+
+    def seed_news(self, options):
+        """Новости идут по news_per_day в день, от сегодняшней назад."""
+        today = date.today()
+        self.create(News, (
+            News(
+                title=self.words(options['title_words'])[:50],
+                text=self.words(options['text_words']),
+                date=today - timedelta(days=index // options['news_per_day']),
+            )
+            for index in range(options['news'])
+        ))
+
+    def seed_comments(self, options, user_ids):
+        """Комментарии достаются новостям по Ципфу: свежие — горячие."""
+        news_ids = list(
+            News.objects.order_by('-date', '-id')
+            .values_list('id', flat=True)
+        )
+        news_weights = zipf_cum_weights(len(news_ids), options['zipf'])
+
+        def comments():
+            for _ in range(options['comments']):
+                yield Comment(
+                    news_id=self.rng.choices(
+                        news_ids, cum_weights=news_weights
+                    )[0],
+                    author_id=self.rng.choice(user_ids),
+                    text=self.words(options['comment_words']),
+                )
+
+        self.create(Comment, comments())
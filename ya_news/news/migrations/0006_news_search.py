@@ -0,0 +1,61 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:30
+
+from django.db import migrations
+
+# DDL заморожен на момент миграции: правка news/search.py не меняет
+# историю схемы, новая схема индекса — новая миграция.
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS news_search USING fts5("
+    "title, text, content='news_news', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+CREATE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS news_search_insert "
+    "AFTER INSERT ON news_news BEGIN "
+    "INSERT INTO news_search(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_search_delete "
+    "AFTER DELETE ON news_news BEGIN "
+    "INSERT INTO news_search(news_search, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_search_update "
+    "AFTER UPDATE OF title, text ON news_news BEGIN "
+    "INSERT INTO news_search(news_search, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO news_search(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+)
+REBUILD = "INSERT INTO news_search(news_search) VALUES ('rebuild')"
+DROP = (
+    'DROP TRIGGER IF EXISTS news_search_insert',
+    'DROP TRIGGER IF EXISTS news_search_delete',
+    'DROP TRIGGER IF EXISTS news_search_update',
+    'DROP TABLE IF EXISTS news_search',
+)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in (CREATE_TABLE, *CREATE_TRIGGERS, REBUILD):
+            cursor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_news_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
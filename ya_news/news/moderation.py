@@ -0,0 +1,134 @@
+import logging
+import os
+from collections import deque
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Латинские буквы, которые пишут вместо похожих кириллических.
+LOOKALIKES = {
+    'a': 'а', 'b': 'в', 'c': 'с', 'e': 'е', 'h': 'н', 'k': 'к', 'm': 'м',
+    'o': 'о', 'p': 'р', 't': 'т', 'x': 'х', 'y': 'у', 'ё': 'е',
+}
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text):
+    """Посимвольно нормализует текст за один проход.
+
+    Регистр сворачивается, «ё» заменяется на «е», латинские двойники — на
+    кириллические буквы, а повторы одной буквы схлопываются в одну.
+    """
+    previous = None
+    for char in text:
+        for folded in char.casefold():
+            folded = LOOKALIKES.get(folded, folded)
+            if folded != previous:
+                previous = folded
+                yield folded
+
+
+class WordMatcher:
+    """Автомат Ахо — Корасик для поиска любого из запрещённых слов.
+
+    Строится один раз для всего списка; проверка текста занимает время,
+    пропорциональное длине текста, а не числу слов в списке.
+    """
+
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]
+        for word in words:
+            self._add(word)
+        self._link()
+
+    def _add(self, word):
+        state = 0
+        for char in normalize(word.strip()):
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        if state:
+            self.output[state] = word.strip()
+
+    def _link(self):
+        """Проставляет суффиксные ссылки обходом бора в ширину."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+
+    def search(self, text):
+        """Возвращает первое найденное в тексте слово или None."""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in normalize(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+def read_words(path):
+    """Читает список слов из файла: по слову в строке, # — комментарий."""
+    with open(path, encoding='utf-8') as file:
+        return [
+            line.strip() for line in file
+            if line.strip() and not line.lstrip().startswith('#')
+        ]
+
+
+_matcher = None
+_matcher_key = None
+
+
+def get_matcher(default_words=()):
+    """Возвращает автомат для текущего списка запрещённых слов.
+
+    Список берётся из файла settings.BAD_WORDS_FILE, из settings.BAD_WORDS
+    или из default_words. Файл перечитывается, когда меняется его mtime;
+    при изменении настроек кэш сбрасывается обработчиком setting_changed.
+    Если файл не прочитать (например, его подменяют при выкладке),
+    остаётся прежний автомат, а без него — список из настроек.
+    """
+    global _matcher, _matcher_key
+    path = getattr(settings, 'BAD_WORDS_FILE', None)
+    try:
+        if path:
+            stat = os.stat(path)
+            key = (os.fspath(path), stat.st_mtime_ns, stat.st_size)
+            if _matcher is None or key != _matcher_key:
+                _matcher, _matcher_key = WordMatcher(read_words(path)), key
+            return _matcher
+    except OSError as error:
+        logger.warning('Список запрещённых слов %s не прочитан: %s',
+                       path, error)
+        if _matcher is not None:
+            return _matcher
+    key = id(default_words)
+    if _matcher is None or key != _matcher_key:
+        words = getattr(settings, 'BAD_WORDS', default_words)
+        _matcher, _matcher_key = WordMatcher(words), key
+    return _matcher
+
+
+@receiver(setting_changed)
+def reset_matcher(setting, **kwargs):
+    global _matcher
+    if setting in ('BAD_WORDS', 'BAD_WORDS_FILE'):
+        _matcher = None
@@ -1,17 +1,74 @@
+import os
 from datetime import datetime, timedelta
+
 import pytest
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test.client import Client
 from django.utils import timezone
 from datetime import timedelta
 from news.models import Comment, News
-from django.urls import reverse
+from yacommon.querybudget import is_transaction_control
+from yacommon.testdb import setup_test_databases
+from django.urls import resolve, reverse
 
 
 User = get_user_model()
 
 
+def pytest_collection_modifyitems(config, items):
+    """Тесты с меткой slow идут только с переменной окружения SLOW_TESTS."""
+    if os.environ.get('SLOW_TESTS'):
+        return
+    skip = pytest.mark.skip(reason='долгий тест: запустите с SLOW_TESTS=1')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_test_environment, django_db_blocker):
+    """Тестовые базы — копии снимка после миграций (yacommon/testdb.py)."""
+    with django_db_blocker.unblock():
+        teardown = setup_test_databases()
+    yield
+    with django_db_blocker.unblock():
+        teardown()
+
+
+def bulk_factory(model, **defaults):
+    """Фабрика, которая создаёт count записей model одним INSERT.
+
+    Значение поля — константа или функция от номера записи; поля,
+    переданные фабрике, заменяют defaults. bulk_create обходит сигналы
+    и save(), а на SQLite не возвращает id созданных записей.
+    """
+    def create(count, **fields):
+        fields = {**defaults, **fields}
+        return model.objects.bulk_create(
+            model(**{
+                name: value(index) if callable(value) else value
+                for name, value in fields.items()
+            })
+            for index in range(count)
+        )
+    return create
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш страниц не должен переживать тест: id записей повторяются."""
+    for cache in caches.all():
+        cache.clear()
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
 @pytest.fixture
 # Используем встроенную фикстуру для модели пользователей django_user_model.
 def author(django_user_model):
@@ -63,31 +120,38 @@ def comment(news, author):
 
 
 @pytest.fixture
-def list_news():
-    all_news = []
-    for index in range(11):
-        news = News(
-            title=f'Новость {index}',
-            text='Просто текст.',
-            date=datetime.today() - timedelta(days=index))
-        all_news.append(news)
-    News.objects.bulk_create(all_news)
+def news_factory():
+    return bulk_factory(
+        News, title=lambda index: f'Новость {index}', text='Просто текст.'
+    )
 
 
 @pytest.fixture
-def create_comments(client, news, author):
-    """Сортировка комментариев от старых к новым."""
+def comment_factory(news, author):
+    """Комментарии к news одним INSERT, со счётчиком новостей."""
+    create = bulk_factory(
+        Comment, news=news, author=author,
+        text=lambda index: f'Текст {index}'
+    )
+
+    def create_comments(count, **fields):
+        comments = create(count, **fields)
+        News.objects.recount_comments()
+        return comments
+    return create_comments
+
+
+@pytest.fixture
+def list_news(news_factory):
+    today = datetime.today()
+    news_factory(11, date=lambda index: today - timedelta(days=index))
+
+
+@pytest.fixture
+def create_comments(comment_factory):
+    """Комментарии, созданные в обратном порядке их времени."""
     now = timezone.now()
-    for index in range(10):
-        comment = Comment.objects.create(
-            news=News.objects.create
-            (title='Тестовая новость', text='Просто текст.'),
-            author=author,
-            text=f'Tекст{index}')
-        # Сразу после создания меняем время создания комментария.
-        comment.created = now + timedelta(days=index)
-        #  И сохраняем эти изменения.
-        comment.save()
+    comment_factory(10, created=lambda index: now - timedelta(days=index))
 
 
 @pytest.fixture
@@ -123,3 +187,44 @@ def url_logout():
 @pytest.fixture
 def url_signup():
     return reverse('users:signup')
+
+
+@pytest.fixture
+def url_archive():
+    return reverse('news:archive')
+
+
+@pytest.fixture
+def url_comments(news):
+    return reverse('news:comments', args=(news.id,))
+
+
+@pytest.fixture
+def url_search():
+    return reverse('news:search')
+
+
+@pytest.fixture
+def assert_query_budget():
+    """Проверяет, что запрос к URL укладывается в бюджет из settings.
+
+    Возвращает число выполненных запросов, чтобы сравнивать его на
+    данных разного объёма.
+    """
+    def check(client, url, method='get', data=None):
+        for cache in caches.all():
+            cache.clear()
+        view_name = resolve(url).view_name
+        budget = settings.QUERY_BUDGETS[view_name]
+        with CaptureQueriesContext(connection) as context:
+            getattr(client, method)(url, data)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not is_transaction_control(query['sql'])
+        ]
+        assert len(queries) <= budget, (
+            f'{method.upper()} {url} ({view_name}): {len(queries)} '
+            f'запросов при бюджете {budget}:\n' + '\n'.join(queries)
+        )
+        return len(queries)
+    return check
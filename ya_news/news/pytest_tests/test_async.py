@@ -0,0 +1,99 @@
+import asyncio
+import importlib
+import re
+import threading
+from unittest import mock
+from urllib.parse import urlencode
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from django.test import AsyncClient
+from django.urls import clear_url_caches, resolve
+
+from news import urls as news_urls
+from news.views import NewsList
+from yanews import urls as project_urls
+
+# Под ASGI страницы выполняются в потоках пула со своими соединениями:
+# им нужны закоммиченные данные, а не транзакция теста.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def async_views(settings):
+    """Маршруты news.urls с асинхронными представлениями."""
+    enabled = settings.NEWS_ASYNC_VIEWS
+
+    def reload_urls(value):
+        settings.NEWS_ASYNC_VIEWS = value
+        importlib.reload(news_urls)
+        importlib.reload(project_urls)
+        clear_url_caches()
+
+    reload_urls(True)
+    yield
+    reload_urls(enabled)
+
+
+@pytest.fixture
+def async_author_client(author):
+    client = AsyncClient()
+    client.force_login(author)
+    return client
+
+
+@pytest.mark.parametrize(
+    'url',
+    (pytest.lazy_fixture('url_home'), pytest.lazy_fixture('url_detail'))
+)
+def test_async_views_serve_pages(async_views, async_author_client, news, url):
+    """Главная и новость отдаются асинхронными представлениями."""
+    assert asyncio.iscoroutinefunction(resolve(url).func)
+    response = async_to_sync(async_author_client.get)(url)
+    assert response.status_code == 200
+    assert news.title in response.content.decode()
+
+
+def test_async_comment_is_saved(async_views, async_author_client, url_detail,
+                                news):
+    """Комментарий отправляется через асинхронный вариант страницы."""
+    # AsyncClient в Django 3.2 не дочитывает multipart: шлём форму как есть.
+    response = async_to_sync(async_author_client.post)(
+        url_detail, urlencode({'text': 'Асинхронный комментарий'}),
+        content_type='application/x-www-form-urlencoded'
+    )
+    assert response.status_code == 302
+    assert news.comment_set.get().text == 'Асинхронный комментарий'
+
+
+def test_async_views_run_concurrently(async_views, news, url_home):
+    """Запросы к базе двух страниц идут одновременно, а не по очереди."""
+    barrier = threading.Barrier(2, timeout=5)
+    get_queryset = NewsList.get_queryset
+
+    def wait_for_other(view):
+        barrier.wait()
+        return get_queryset(view)
+
+    async def fetch_both():
+        return await asyncio.gather(
+            AsyncClient().get(url_home), AsyncClient().get(url_home)
+        )
+
+    with mock.patch.object(
+        NewsList, 'get_queryset', autospec=True, side_effect=wait_for_other
+    ):
+        responses = async_to_sync(fetch_both)()
+    assert [response.status_code for response in responses] == [200, 200]
+
+
+def test_async_queries_are_counted(async_views, async_author_client,
+                                   url_detail, settings):
+    """Запросы из потоков пула попадают в статистику middleware."""
+    settings.QUERY_STATS_HEADER = True
+    response = async_to_sync(async_author_client.get)(url_detail)
+    queries = int(re.search(
+        r'desc="(\d+) queries"', response['Server-Timing']
+    ).group(1))
+    assert 0 < queries <= settings.QUERY_BUDGETS['news:detail']
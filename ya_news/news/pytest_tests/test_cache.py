@@ -0,0 +1,190 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from news.cache import LIST_VERSION_KEY, get_versions
+from news.models import Comment, News
+
+NEW_TEXT = 'Свежий комментарий'
+
+pytestmark = pytest.mark.django_db
+
+
+def test_anonymous_pages_are_cached(
+    client, news, url_home, url_detail, django_assert_num_queries
+):
+    """Повторный анонимный запрос обходится без обращений к базе."""
+    for url in (url_home, url_detail):
+        first = client.get(url)
+        with django_assert_num_queries(0):
+            second = client.get(url)
+        assert second.content == first.content
+
+
+def test_authenticated_pages_are_not_cached(
+    author_client, news, url_detail
+):
+    """Страницы для авторизованных пользователей не кэшируются."""
+    author_client.get(url_detail)
+    response = author_client.get(url_detail)
+    assert 'form' in response.context
+
+
+def test_comment_create_invalidates_pages(
+    client, author_client, news, url_home, url_detail
+):
+    """Новый комментарий сбрасывает страницу новости и главную."""
+    client.get(url_home)
+    client.get(url_detail)
+    author_client.post(url_detail, data={'text': NEW_TEXT})
+    assert NEW_TEXT in client.get(url_detail).content.decode()
+    assert 'Комментариев: 1' in client.get(url_home).content.decode()
+
+
+def test_comment_edit_and_delete_invalidate_page(
+    client, author_client, comment, url_detail, url_edit, url_delete
+):
+    """Правка и удаление комментария сбрасывают страницу новости."""
+    client.get(url_detail)
+    author_client.post(url_edit, data={'text': NEW_TEXT})
+    assert NEW_TEXT in client.get(url_detail).content.decode()
+    author_client.post(url_delete)
+    assert NEW_TEXT not in client.get(url_detail).content.decode()
+
+
+def test_news_change_invalidates_pages(client, news, url_home, url_detail):
+    """Изменение новости сбрасывает её страницу и главную."""
+    client.get(url_home)
+    client.get(url_detail)
+    news.title = 'Новый заголовок'
+    news.save()
+    assert news.title in client.get(url_detail).content.decode()
+    assert news.title in client.get(url_home).content.decode()
+
+
+def test_other_news_stays_cached(
+    client, news, author, url_detail, django_assert_num_queries
+):
+    """Комментарий к другой новости не сбрасывает страницу этой новости."""
+    client.get(url_detail)
+    other = type(news).objects.create(title='Другая', text='Текст')
+    Comment.objects.create(news=other, author=author, text=NEW_TEXT)
+    with django_assert_num_queries(0):
+        client.get(url_detail)
+
+
+def test_file_based_cache(client, comment, url_detail, settings, tmp_path):
+    """Кэш страниц работает и с файловым бэкендом."""
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path),
+    }}
+    client.get(url_detail)
+    assert any(tmp_path.iterdir())
+    comment.text = NEW_TEXT
+    comment.save()
+    assert NEW_TEXT in client.get(url_detail).content.decode()
+    cache.clear()
+
+
+def test_fragments_are_reused_until_news_changes(
+    author_client, news, comment, url_detail
+):
+    """Фрагменты берутся из кэша, пока не изменится отметка News.modified."""
+    author_client.get(url_detail)
+    # update() не отправляет сигналов и не трогает modified.
+    type(news).objects.filter(pk=news.pk).update(text='Тихая правка')
+    type(comment).objects.filter(pk=comment.pk).update(text='Тихий текст')
+    content = author_client.get(url_detail).content.decode()
+    assert 'Тихая правка' not in content
+    assert 'Тихий текст' not in content
+    comment.refresh_from_db()
+    comment.save()
+    content = author_client.get(url_detail).content.decode()
+    assert 'Тихая правка' in content
+    assert 'Тихий текст' in content
+
+
+def test_controls_are_rendered_per_user(
+    author_client, not_author_client, comment, url_detail, url_edit
+):
+    """Ссылки правки видит только автор, даже когда фрагменты в кэше."""
+    assert url_edit not in not_author_client.get(url_detail).content.decode()
+    assert url_edit in author_client.get(url_detail).content.decode()
+    assert url_edit not in not_author_client.get(url_detail).content.decode()
+
+
+def test_detail_conditional_get(
+    client, news, author, url_detail, django_assert_max_num_queries
+):
+    """Совпавший ETag или Last-Modified дают 304 не больше чем за запрос."""
+    response = client.get(url_detail)
+    etag, last_modified = response['ETag'], response['Last-Modified']
+    for headers in (
+        {'HTTP_IF_NONE_MATCH': etag},
+        {'HTTP_IF_MODIFIED_SINCE': last_modified},
+    ):
+        with django_assert_max_num_queries(1):
+            response = client.get(url_detail, **headers)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert not response.templates
+    Comment.objects.create(news=news, author=author, text=NEW_TEXT)
+    response = client.get(url_detail, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+def test_home_conditional_get(
+    client, news, url_home, django_assert_num_queries
+):
+    """Для главной ETag проверяется одним агрегирующим запросом."""
+    etag = client.get(url_home)['ETag']
+    with django_assert_num_queries(1):
+        response = client.get(url_home, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    news.save()
+    response = client.get(url_home, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize('change', ('update', 'create', 'delete'))
+def test_list_etag_sees_writes_of_other_processes(
+    client, news, url_home, url_archive, change
+):
+    """Запись другого воркера меняет ETag списков и в этом процессе.
+
+    update(), bulk_create() и удаление SQL не шлют сигналов: как и запись
+    в другом процессе, они не сдвигают версию списков в здешнем кэше.
+    """
+    etags = {url: client.get(url)['ETag'] for url in (url_home, url_archive)}
+    version = get_versions([LIST_VERSION_KEY])
+    if change == 'update':
+        News.objects.filter(pk=news.pk).update(
+            title='Новый заголовок', modified=timezone.now()
+        )
+    elif change == 'create':
+        News.objects.bulk_create([News(title='Другая', text='Текст')])
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {News._meta.db_table} WHERE id = %s',
+                [news.pk]
+            )
+    assert get_versions([LIST_VERSION_KEY]) == version
+    for url, etag in etags.items():
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+
+
+def test_etag_depends_on_user(client, author_client, news, url_detail):
+    """Страница авторизованного пользователя не совпадает с анонимной."""
+    anonymous_etag = client.get(url_detail)['ETag']
+    response = author_client.get(
+        url_detail, HTTP_IF_NONE_MATCH=anonymous_etag
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != anonymous_etag
+    assert not response.has_header('Last-Modified')
@@ -1,6 +1,8 @@
+import pytest
 from django.conf import settings
 
 from news.forms import CommentForm
+from news.models import Comment, News
 
 
 def test_pages_contains_form(author_client, comment, url_detail):
@@ -38,13 +40,14 @@ def test_news_order(author_client, list_news, url_home):
     assert all_dates == sorted_dates
 
 
-def test_comments_order(author_client, news, author, url_detail):
+def test_comments_order(author_client, create_comments, url_detail):
     """Сортировка комментариев от старых к новым."""
     response = author_client.get(url_detail)
     assert 'news' in response.context
     news = response.context['news']
     all_comments = news.comment_set.all()
     all_timestamps = [comment.created for comment in all_comments]
+    assert len(all_timestamps) == 10
     sorted_timestamps = sorted(all_timestamps)
     # Проверяем, что временные метки отсортированы правильно.
     assert all_timestamps == sorted_timestamps
@@ -57,3 +60,107 @@ def test_authorized_client_has_form(author_client, client, news, url_detail):
         assert 'form' not in response.context
     response = author_client.get(url_detail)
     assert 'form' in response.context
+
+
+@pytest.mark.parametrize('comments_per_news', (1, 25))
+def test_home_queries_do_not_grow_with_comments(
+    client, author, list_news, url_home, comments_per_news,
+    django_assert_num_queries
+):
+    """Число запросов главной страницы не зависит от числа комментариев."""
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text='Текст')
+        for news in News.objects.all()
+        for _ in range(comments_per_news)
+    )
+    News.objects.recount_comments()
+    # Список и валидатор ETag.
+    with django_assert_num_queries(2):
+        response = client.get(url_home)
+    for news in response.context['object_list']:
+        assert news.comment_count == comments_per_news
+
+
+def walk_archive(client, url, cursor_key):
+    """Проходит архив по курсорам, собирая id новостей постранично."""
+    pages = []
+    response = client.get(url)
+    while True:
+        pages.append([news.id for news in response.context['object_list']])
+        cursor = getattr(response.context['page'], cursor_key)
+        if cursor is None:
+            return pages, response
+        response = client.get(url, {'cursor': cursor})
+
+
+@pytest.mark.django_db
+def test_archive_walks_all_news_in_order(
+    client, list_news, news_factory, url_archive, settings
+):
+    """Архив по курсорам выдаёт все новости по одному разу и по порядку."""
+    settings.NEWS_COUNT_ON_HOME_PAGE = 3
+    # Новости с одинаковой датой различаются только по id.
+    news_factory(4, title=lambda index: f'Дубль {index}')
+    expected = list(
+        News.objects.order_by('-date', '-id').values_list('id', flat=True)
+    )
+    pages, last_response = walk_archive(client, url_archive, 'next_cursor')
+    assert [news_id for page in pages for news_id in page] == expected
+    assert all(len(page) == 3 for page in pages[:-1])
+    # Обратный проход с последней страницы возвращает те же страницы.
+    back_cursor = last_response.context['page'].previous_cursor
+    back_pages, _ = walk_archive(
+        client, f'{url_archive}?cursor={back_cursor}', 'previous_cursor'
+    )
+    assert back_pages == pages[-2::-1]
+
+
+@pytest.mark.django_db
+def test_archive_page_cost_does_not_depend_on_depth(
+    client, list_news, url_archive, settings, django_assert_num_queries
+):
+    """Глубокая страница архива стоит столько же запросов, сколько первая."""
+    settings.NEWS_COUNT_ON_HOME_PAGE = 2
+    response = client.get(url_archive)
+    for _ in range(4):
+        cursor = response.context['page'].next_cursor
+        # Страница и валидатор ETag.
+        with django_assert_num_queries(2):
+            response = client.get(url_archive, {'cursor': cursor})
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('thread_size', (3, 60))
+def test_detail_loads_only_first_comments_page(
+    client, comment_factory, url_detail, settings, thread_size,
+    django_assert_num_queries
+):
+    """Страница новости читает не больше одной страницы комментариев."""
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 5
+    comment_factory(thread_size)
+    with django_assert_num_queries(2):
+        response = client.get(url_detail)
+    assert len(response.context['comments']) == min(thread_size, 5)
+
+
+@pytest.mark.django_db
+def test_comment_fragments_cover_thread(
+    client, news, comment_factory, url_comments, settings,
+    django_assert_num_queries
+):
+    """Фрагменты по курсору выдают весь тред по порядку и без повторов."""
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 4
+    comment_factory(10)
+    expected = list(
+        news.comment_set.order_by('created', 'id').values_list('id', flat=True)
+    )
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        with django_assert_num_queries(2):
+            response = client.get(url_comments, {'cursor': cursor})
+        page = response.context['comments']
+        assert len(page) <= 4
+        seen.extend(comment.id for comment in page)
+        cursor = page.next_cursor
+    assert seen == expected
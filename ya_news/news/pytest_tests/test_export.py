@@ -0,0 +1,192 @@
+import asyncio
+import csv
+import gzip
+import json
+import os
+import threading
+from io import StringIO
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.client import Client
+from django.urls import reverse
+
+from news.models import Comment
+from yacommon import export
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def staff_client(django_user_model):
+    client = Client()
+    client.force_login(
+        django_user_model.objects.create(username='Сотрудник', is_staff=True)
+    )
+    return client
+
+
+def download(client, dataset, **params):
+    response = client.get(reverse('news:export', args=(dataset,)), params)
+    assert response.status_code == 200
+    return response, b''.join(response.streaming_content)
+
+
+def test_export_news_ndjson(staff_client, news, comment):
+    response, content = download(staff_client, 'news')
+    assert response['Content-Disposition'] == (
+        'attachment; filename="news.ndjson"'
+    )
+    rows = [json.loads(line) for line in content.decode().splitlines()]
+    news.refresh_from_db()
+    assert rows == [{
+        'id': news.pk, 'title': news.title, 'text': news.text,
+        'date': news.date.isoformat(), 'comment_count': 1,
+    }]
+
+
+def test_export_comments_csv_gzip(staff_client, comment, author):
+    response, content = download(
+        staff_client, 'comments', format='csv', gzip='1'
+    )
+    assert response['Content-Type'] == 'application/gzip'
+    rows = list(csv.reader(StringIO(gzip.decompress(content).decode())))
+    assert rows == [
+        ['id', 'news', 'author', 'text', 'created'],
+        [str(comment.pk), str(comment.news_id), author.username,
+         comment.text, str(comment.created)],
+    ]
+
+
+@pytest.mark.parametrize(
+    'user_client, status',
+    (
+        (pytest.lazy_fixture('client'), 302),
+        (pytest.lazy_fixture('author_client'), 403),
+    )
+)
+def test_export_is_for_staff(user_client, status):
+    response = user_client.get(reverse('news:export', args=('comments',)))
+    assert response.status_code == status
+
+
+async def asgi_get(application, path, query, cookie):
+    """GET к ASGI-приложению; возвращает статус и тело ответа."""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application({
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'root_path': '',
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+    }, receive, send)
+    return messages[0]['status'], b''.join(
+        message.get('body', b'') for message in messages[1:]
+    )
+
+
+# Под ASGI выгрузка читает базу из потоков пула: данным теста нужен коммит.
+@pytest.mark.django_db(transaction=True)
+def test_export_under_asgi_leaves_event_loop_free(staff_client, news, author,
+                                                  monkeypatch):
+    """Под ASGI порции выгрузки читаются вне цикла событий.
+
+    После чтения каждой порции цикл должен успеть выполнить обратный
+    вызов: если порция читается в его потоке, этого не случится.
+    """
+    with mock.patch.dict(os.environ):
+        from yanews.asgi import application
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(5)
+    )
+    loop = None
+    keyset_chunks = export.keyset_chunks
+
+    def probed_chunks(queryset, chunk_size):
+        for rows in keyset_chunks(queryset, 2):
+            served = threading.Event()
+            loop.call_soon_threadsafe(served.set)
+            assert served.wait(1), 'цикл событий занят выгрузкой'
+            yield rows
+
+    monkeypatch.setattr(export, 'keyset_chunks', probed_chunks)
+
+    async def download_comments():
+        nonlocal loop
+        loop = asyncio.get_running_loop()
+        return await asgi_get(
+            application, reverse('news:export', args=('comments',)),
+            'format=ndjson',
+            f'{settings.SESSION_COOKIE_NAME}='
+            f'{staff_client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        )
+
+    status, content = async_to_sync(download_comments)()
+    assert status == 200
+    assert [
+        json.loads(line)['text'] for line in content.decode().splitlines()
+    ] == [f'Комментарий {index}' for index in range(5)]
+
+
+def test_export_command(tmp_path, news):
+    output = tmp_path / 'news.ndjson.gz'
+    call_command(
+        'export_news', 'news', gzip=True, output=str(output),
+        stdout=StringIO()
+    )
+    assert json.loads(gzip.decompress(output.read_bytes()))['id'] == news.pk
+
+
+def resident_memory():
+    """Текущий RSS процесса в байтах (Linux)."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+@pytest.mark.skipif(
+    not os.path.exists('/proc/self/statm'), reason='нужен /proc'
+)
+@pytest.mark.parametrize('rows, growth_mb', (
+    (100_000, 8),
+    pytest.param(1_000_000, 32, marks=pytest.mark.slow),
+))
+def test_export_rows_in_flat_memory(staff_client, news, author, rows,
+                                    growth_mb):
+    """Выгрузка комментариев не копит их в памяти.
+
+    Строки как словари заняли бы в несколько раз больше, чем весь
+    результат, а прирост памяти ограничен долей от его размера.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO news_comment (news_id, author_id, text, created) '
+            'WITH RECURSIVE seq(n) AS ('
+            'SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s) '
+            "SELECT %s, %s, 'Комментарий ' || n, '2020-01-01 00:00:00' "
+            'FROM seq',
+            [rows, news.pk, author.pk]
+        )
+    response = staff_client.get(reverse('news:export', args=('comments',)))
+    baseline = peak = resident_memory()
+    lines = size = 0
+    for chunk in response.streaming_content:
+        lines += chunk.count(b'\n')
+        size += len(chunk)
+        peak = max(peak, resident_memory())
+    assert lines == rows
+    assert size > rows * 80
+    assert peak - baseline < growth_mb * 2 ** 20
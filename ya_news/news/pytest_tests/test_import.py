@@ -0,0 +1,111 @@
+import json
+from io import StringIO
+from unittest import mock
+
+import pytest
+
+from django.core.management import call_command
+from django.db.models import QuerySet
+
+from news.forms import WARNING
+from news.models import Comment, CommentImport, News
+
+pytestmark = pytest.mark.django_db
+
+
+def write_ndjson(path, records):
+    path.write_text(''.join(
+        (record if isinstance(record, str) else json.dumps(record)) + '\n'
+        for record in records
+    ))
+    return path
+
+
+def import_comments(path, **options):
+    out = StringIO()
+    call_command('import_comments', str(path), stdout=out, **options)
+    return out.getvalue()
+
+
+def test_import_ndjson(tmp_path, news, author):
+    source = write_ndjson(tmp_path / 'comments.ndjson', [
+        {'news': news.pk, 'author': author.username, 'text': 'Первый',
+         'created': '2020-01-02T03:04:05+00:00'},
+        {'news': news.pk, 'author': author.username, 'text': 'Второй'},
+        '',
+        {'news': news.pk, 'author': author.username, 'text': 'Ты редиска'},
+        {'news': news.pk + 1, 'author': author.username, 'text': 'Текст'},
+        {'news': news.pk, 'author': 'Незнакомец', 'text': 'Текст'},
+        '{"news": ',
+    ])
+    rejects = tmp_path / 'rejects.ndjson'
+    report = import_comments(source, batch_size=2, rejects=rejects)
+    assert list(
+        Comment.objects.order_by('created').values_list('text', flat=True)
+    ) == ['Первый', 'Второй']
+    assert Comment.objects.get(text='Первый').created.year == 2020
+    news.refresh_from_db()
+    assert news.comment_count == 2
+    assert 'добавлено 2, отклонено 4' in report
+    errors = [
+        json.loads(line)['error']
+        for line in rejects.read_text().splitlines()
+    ]
+    assert errors == [
+        WARNING, 'нет новости', 'нет автора', 'некорректный JSON'
+    ]
+
+
+def test_import_with_cache_as_small_as_batch(tmp_path, author):
+    """Переполнение кэша id не отклоняет записи текущей пачки."""
+    news_ids = [
+        News.objects.create(title=f'Новость {index}', text='Текст').pk
+        for index in range(3)
+    ]
+    source = write_ndjson(tmp_path / 'comments.ndjson', [
+        {'news': news_id, 'author': author.username, 'text': 'Текст'}
+        for news_id in (*news_ids, news_ids[0], news_ids[2], news_ids[1])
+    ])
+    report = import_comments(source, batch_size=2, cache_size=2)
+    assert 'добавлено 6, отклонено 0' in report
+    assert Comment.objects.count() == 6
+
+
+def test_import_csv(tmp_path, news, author):
+    source = tmp_path / 'comments.csv'
+    source.write_text(
+        'news,author,text\n'
+        f'{news.pk},{author.username},"Текст, с запятой"\n'
+    )
+    import_comments(source)
+    assert Comment.objects.get().text == 'Текст, с запятой'
+
+
+def test_import_resumes_after_interruption(tmp_path, news, author):
+    source = write_ndjson(tmp_path / 'comments.ndjson', [
+        {'news': news.pk, 'author': author.username, 'text': f'Текст {index}'}
+        for index in range(5)
+    ])
+    bulk_create = QuerySet.bulk_create
+    calls = []
+
+    def fail_on_second_batch(queryset, objects, *args, **kwargs):
+        calls.append(len(objects))
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return bulk_create(queryset, objects, *args, **kwargs)
+
+    with mock.patch.object(QuerySet, 'bulk_create', fail_on_second_batch):
+        with pytest.raises(KeyboardInterrupt):
+            import_comments(source, batch_size=2)
+    assert CommentImport.objects.get().position == 2
+    report = import_comments(source, batch_size=2)
+    assert 'с записи 2' in report
+    assert sorted(Comment.objects.values_list('text', flat=True)) == [
+        f'Текст {index}' for index in range(5)
+    ]
+    news.refresh_from_db()
+    assert news.comment_count == 5
+    # Повторный запуск ничего не добавляет.
+    import_comments(source, batch_size=2)
+    assert Comment.objects.count() == 5
@@ -1,10 +1,12 @@
 import pytest
 from http import HTTPStatus
+from io import StringIO
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 
 from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.models import Comment, News
 
 User = get_user_model()
 
@@ -76,3 +78,45 @@ def test_edit_comment(not_author_client, author_client, comment, url_edit):
     comment.refresh_from_db()
     # Проверяем, что текст изменился
     assert comment.text == NEW_COMMENT
+
+
+def test_comment_count_follows_comments(author_client, news, url_detail):
+    """Счётчик комментариев новости меняется при создании и удалении."""
+    author_client.post(url_detail, data=FORM_DATA)
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    Comment.objects.get().delete()
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_recount_comments_command(comment, news):
+    """Команда recount_comments восстанавливает счётчики."""
+    News.objects.update(comment_count=100)
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+
+def seed_news(prefix):
+    call_command(
+        'seed_news', users=5, news=30, comments=300, username_prefix=prefix,
+        batch_size=7, stdout=StringIO()
+    )
+    return list(
+        News.objects.order_by('id').values_list('title', 'comment_count')
+    )
+
+
+@pytest.mark.django_db
+def test_seed_news_command():
+    """seed_news детерминирован, свежим новостям — больше комментариев."""
+    seeded = seed_news('first-')
+    assert len(seeded) == 30
+    assert Comment.objects.count() == 300
+    assert sum(count for _, count in seeded) == 300
+    hottest = News.objects.order_by('-date', '-id').first()
+    assert hottest.comment_count == max(count for _, count in seeded)
+    News.objects.all().delete()
+    assert seed_news('second-') == seeded
@@ -0,0 +1,80 @@
+import pytest
+
+from django.urls import reverse
+
+from yacommon.metrics import REQUEST_DURATION, Registry, registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    """Счётчики процесса общие для всех тестов."""
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def scrape(client):
+    response = client.get(reverse('metrics'))
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    return dict(
+        line.rsplit(' ', 1)
+        for line in response.content.decode().splitlines()
+        if not line.startswith('#')
+    )
+
+
+@pytest.mark.django_db
+def test_metrics_per_view(client, news, url_home, url_detail):
+    client.get(url_home)
+    client.get(url_home)
+    client.get(url_detail)
+    samples = scrape(client)
+    home = 'view="news:home"'
+    assert samples[
+        f'django_http_request_duration_seconds_count{{{home},method="GET"}}'
+    ] == '2'
+    assert samples[
+        f'django_http_responses_total{{{home},method="GET",status="200"}}'
+    ] == '2'
+    assert samples[
+        'django_http_request_duration_seconds_bucket'
+        '{view="news:detail",method="GET",le="+Inf"}'
+    ] == '1'
+    assert samples[f'django_db_queries_count{{{home}}}'] == '2'
+    assert float(samples[f'django_db_queries_sum{{{home}}}']) > 0
+    assert samples[f'django_template_render_seconds_count{{{home}}}'] == '2'
+    assert float(samples[f'django_http_response_size_bytes_sum{{{home}}}']) > 0
+
+
+@pytest.mark.django_db
+def test_unknown_labels_are_bounded(client):
+    """Выдуманные методы и адреса не заводят новых рядов."""
+    client.generic('BREW', '/no-such-page/')
+    samples = scrape(client)
+    assert samples[
+        'django_http_responses_total'
+        '{view="<unresolved>",method="other",status="404"}'
+    ] == '1'
+
+
+@pytest.mark.django_db
+def test_metrics_of_other_processes_are_merged(
+        client, settings, tmp_path, url_home
+):
+    settings.METRICS_DIR = str(tmp_path)
+    settings.METRICS_FLUSH_INTERVAL = 0
+    other = Registry()
+    other.observe([(REQUEST_DURATION, ('news:home', 'GET'), 0.2)] * 3)
+    other.flush(tmp_path)
+    client.get(url_home)
+    # Свой процесс тоже сохранил файл, но считается один раз.
+    assert len(list(tmp_path.glob('*.json'))) == 2
+    samples = scrape(client)
+    series = 'view="news:home",method="GET"'
+    assert samples[
+        f'django_http_request_duration_seconds_count{{{series}}}'
+    ] == '4'
+    assert samples[
+        f'django_http_request_duration_seconds_bucket{{{series},le="0.25"}}'
+    ] == '4'
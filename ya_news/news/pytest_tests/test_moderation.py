@@ -0,0 +1,95 @@
+import os
+import random
+
+import pytest
+
+from news.forms import BAD_WORDS, CommentForm, WARNING
+from news.moderation import WordMatcher, get_matcher
+
+PLAIN_WORDS = (
+    'новость', 'текст', 'комментарий', 'редис', 'годный', 'негодование',
+    'писать', 'читать', 'сегодня', 'вечер', 'хороший', 'день', 'ребята',
+)
+
+
+def legacy_is_rejected(text, words):
+    """Прежняя проверка: поиск подстроки по каждому слову."""
+    lowered_text = text.lower()
+    return any(word in lowered_text for word in words)
+
+
+def test_matcher_agrees_with_legacy_loop():
+    """Автомат принимает и отклоняет те же тексты, что и прежний цикл."""
+    rng = random.Random(404)
+    vocabulary = PLAIN_WORDS + BAD_WORDS
+    matcher = WordMatcher(BAD_WORDS)
+    for _ in range(2000):
+        words = rng.choices(vocabulary, k=rng.randint(1, 12))
+        if rng.random() < 0.5:
+            words = [word for word in words if word not in BAD_WORDS]
+        text = ' '.join(
+            word.upper() if rng.random() < 0.2 else word for word in words
+        )
+        assert (matcher.search(text) is not None) == legacy_is_rejected(
+            text, BAD_WORDS
+        ), text
+
+
+@pytest.mark.parametrize('text', (
+    'Ну ты и РЕДИСКА',
+    'ну ты и рeдиcкa',
+    'ну ты и реддииска',
+    'какой негoдяяяй',
+    'слитнонегодяйслитно',
+))
+def test_matcher_normalizes_text(text):
+    """Регистр, латинские двойники и повторы букв не обходят фильтр."""
+    assert WordMatcher(BAD_WORDS).search(text) is not None
+
+
+def test_matcher_folds_yo():
+    """Буквы «ё» и «е» считаются одинаковыми."""
+    matcher = WordMatcher(('ёжик',))
+    assert matcher.search('какой ежик') == 'ёжик'
+    assert matcher.search('какой ёжик') == 'ёжик'
+
+
+def test_matcher_finds_overlapping_words():
+    """Слово находится и тогда, когда оно суффикс другого префикса."""
+    matcher = WordMatcher(('абвгд', 'вгде'))
+    assert matcher.search('абвгде') is not None
+    assert matcher.search('абвгж') is None
+
+
+def test_words_file_is_reloaded(tmp_path, settings):
+    """Список из файла перечитывается при изменении файла."""
+    path = tmp_path / 'bad_words.txt'
+    path.write_text('# Список\nпомидор\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = str(path)
+    assert CommentForm({'text': 'редиска'}).is_valid()
+    form = CommentForm({'text': 'спелый помидор'})
+    assert form.errors['text'] == [WARNING]
+    path.write_text('огурец\n', encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert CommentForm({'text': 'спелый помидор'}).is_valid()
+    assert get_matcher().search('солёный огурец') == 'огурец'
+
+
+def test_bad_words_setting_overrides_default(settings):
+    """Список из настройки BAD_WORDS заменяет список по умолчанию."""
+    settings.BAD_WORDS = ('капуста',)
+    assert CommentForm({'text': 'редиска'}).is_valid()
+    assert not CommentForm({'text': 'кислая капуста'}).is_valid()
+
+
+def test_missing_words_file_keeps_last_list(tmp_path, settings, caplog):
+    """Пропавший файл списка не ломает отправку комментариев."""
+    path = tmp_path / 'bad_words.txt'
+    settings.BAD_WORDS_FILE = str(path)
+    assert not CommentForm({'text': 'редиска'}).is_valid()
+    path.write_text('помидор\n', encoding='utf-8')
+    assert not CommentForm({'text': 'спелый помидор'}).is_valid()
+    path.unlink()
+    assert not CommentForm({'text': 'спелый помидор'}).is_valid()
+    assert str(path) in caplog.text
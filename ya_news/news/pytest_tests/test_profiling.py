@@ -0,0 +1,79 @@
+import json
+import pstats
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.test.client import Client
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def profile_dir(settings, tmp_path):
+    settings.PROFILE_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def staff_client(django_user_model):
+    client = Client()
+    client.force_login(
+        django_user_model.objects.create(username='Сотрудник', is_staff=True)
+    )
+    return client
+
+
+def captures(directory):
+    return [
+        json.loads(path.read_text())
+        for path in sorted(directory.glob('*.json'))
+    ]
+
+
+def test_staff_profiles_request(profile_dir, staff_client, url_detail,
+                                comment):
+    response = staff_client.get(url_detail, {'profile': 1})
+    name = response['X-Profile']
+    capture = json.loads((profile_dir / f'{name}.json').read_text())
+    assert capture['view'] == 'news:detail'
+    assert capture['reason'] == 'staff'
+    assert pstats.Stats(str(profile_dir / capture['profile'])).total_calls
+    # Запрос комментариев приписан представлению или шаблону.
+    sources = {
+        frame for query in capture['queries'] for frame in query['stack']
+    }
+    assert any(frame.startswith('news/') for frame in sources)
+
+
+def test_profile_needs_staff(profile_dir, author_client, url_detail):
+    response = author_client.get(url_detail, {'profile': 1})
+    assert 'X-Profile' not in response
+    assert not list(profile_dir.iterdir())
+
+
+def test_slow_requests_keep_sql_trace_only(profile_dir, settings, client,
+                                           url_home, url_detail):
+    settings.PROFILE_SLOW_SECONDS = 0
+    settings.PROFILE_KEEP = 2
+    for url in (url_home, url_detail, url_detail):
+        client.get(url)
+    saved = captures(profile_dir)
+    assert [capture['view'] for capture in saved] == ['news:detail'] * 2
+    assert all(capture['reason'] == 'slow' for capture in saved)
+    assert all(capture['profile'] is None for capture in saved)
+    assert not list(profile_dir.glob('*.prof'))
+
+
+def test_profile_report(profile_dir, settings, staff_client, url_home,
+                        url_detail):
+    settings.PROFILE_SAMPLE_RATE = 1
+    staff_client.get(url_home)
+    staff_client.get(url_detail)
+    out = StringIO()
+    call_command('profile_report', limit=3, stdout=out)
+    report = out.getvalue()
+    assert 'news:home: снимков 1 (sample 1)' in report
+    assert 'news:detail' in report
+    assert 'SELECT' in report
@@ -0,0 +1,65 @@
+import pytest
+
+from news.models import Comment, News
+
+# Объём данных растёт, а число запросов к каждому URL должно оставаться
+# прежним.
+DATASET_SIZES = (1, 10, 100)
+
+
+def grow_dataset(news, author, size):
+    """Добавляет size новостей и size комментариев к проверяемой новости."""
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст') for index in range(size)
+    )
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Комментарий {index}')
+        for index in range(size)
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'url, method, data',
+    (
+        (pytest.lazy_fixture('url_home'), 'get', None),
+        (pytest.lazy_fixture('url_archive'), 'get', None),
+        (pytest.lazy_fixture('url_search'), 'get', {'q': 'Новость'}),
+        (pytest.lazy_fixture('url_detail'), 'get', None),
+        (pytest.lazy_fixture('url_detail'), 'post', {'text': 'Ещё один'}),
+        (pytest.lazy_fixture('url_comments'), 'get', None),
+        (pytest.lazy_fixture('url_edit'), 'get', None),
+        (pytest.lazy_fixture('url_edit'), 'post', {'text': 'Новый текст'}),
+        (pytest.lazy_fixture('url_delete'), 'get', None),
+    )
+)
+@pytest.mark.parametrize(
+    'user_client',
+    (pytest.lazy_fixture('client'), pytest.lazy_fixture('author_client'))
+)
+def test_query_count_does_not_grow(
+        assert_query_budget, user_client, author, news, comment,
+        url, method, data
+):
+    """Число запросов укладывается в бюджет и не растёт с объёмом данных."""
+    counts = []
+    for size in DATASET_SIZES:
+        grow_dataset(news, author, size)
+        counts.append(assert_query_budget(user_client, url, method, data))
+    assert len(set(counts)) == 1, counts
+
+
+@pytest.mark.django_db
+def test_delete_within_budget(assert_query_budget, author_client, url_delete):
+    """Удаление комментария укладывается в бюджет."""
+    assert_query_budget(author_client, url_delete, 'post')
+    assert not Comment.objects.exists()
+
+
+@pytest.mark.django_db
+def test_middleware_logs_exceeded_budget(client, url_home, settings, caplog):
+    """Превышение бюджета попадает в лог предупреждением."""
+    settings.QUERY_BUDGETS = {'news:home': 0}
+    with caplog.at_level('WARNING', logger='yacommon.querybudget'):
+        client.get(url_home)
+    assert 'news:home: 2 SQL-запросов при бюджете 0' in caplog.text
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from django.db import connections, transaction
+
+from news.models import News
+from yacommon.replicas import current_pin, pin_to_primary
+
+# Реплика — отдельная тестовая база; копирование в неё и есть репликация.
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', 'replica']
+)
+
+TEXT = 'Свежий комментарий'
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+    # Записи фикстур закрепили чтение в контексте теста.
+    token = current_pin.set(None)
+    yield
+    current_pin.reset(token)
+
+
+def replicate():
+    """Реплика догоняет основную базу: копия всех данных целиком."""
+    for alias in ('default', 'replica'):
+        connections[alias].ensure_connection()
+    connections['default'].connection.backup(connections['replica'].connection)
+
+
+def page(client, url):
+    return client.get(url).content.decode()
+
+
+@pytest.mark.parametrize('action', ('create', 'edit'))
+def test_author_reads_own_write_while_replica_lags(
+        replica, author_client, not_author_client, url_detail, url_edit,
+        action
+):
+    """Автор сразу видит свою запись, остальные — когда реплика догонит."""
+    replicate()
+    url = url_detail if action == 'create' else url_edit
+    response = author_client.post(url, {'text': TEXT})
+    assert response.status_code == 302
+    assert TEXT in page(author_client, url_detail)
+    assert TEXT not in page(not_author_client, url_detail)
+    replicate()
+    assert TEXT in page(not_author_client, url_detail)
+
+
+def test_pin_expires(replica, settings, author_client, url_detail):
+    """По истечении окна автор снова читает с отстающей реплики."""
+    replicate()
+    author_client.post(url_detail, {'text': TEXT})
+    author_client.cookies[settings.DATABASE_PIN_COOKIE] = str(time.time() - 1)
+    assert TEXT not in page(author_client, url_detail)
+
+
+def test_no_pin_cookie_without_replicas(author_client, url_detail, settings):
+    response = author_client.post(url_detail, {'text': TEXT})
+    assert settings.DATABASE_PIN_COOKIE not in response.cookies
+
+
+def test_router_reads_replica_unless_pinned(replica):
+    assert News.objects.all().db == 'replica'
+    with transaction.atomic():
+        assert News.objects.all().db == 'default'
+    assert News.objects.all().db == 'replica'
+    pin_to_primary()
+    assert News.objects.all().db == 'default'
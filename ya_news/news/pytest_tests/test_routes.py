@@ -6,6 +6,8 @@ from django.urls import reverse_lazy
 
 
 HOME_URL = pytest.lazy_fixture('url_home')
+ARCHIVE_URL = pytest.lazy_fixture('url_archive')
+SEARCH_URL = pytest.lazy_fixture('url_search')
 LOGIN_URL = pytest.lazy_fixture('url_login')
 LOGOUT_URL = pytest.lazy_fixture('url_logout')
 SIGNUP_URL = pytest.lazy_fixture('url_signup')
@@ -13,6 +15,7 @@ AUTHOR_CLIENT = pytest.lazy_fixture('author_client')
 DELETE_URL = pytest.lazy_fixture('url_delete')
 EDIT_URL = pytest.lazy_fixture('url_edit')
 DETAIL_URL = pytest.lazy_fixture('url_detail')
+COMMENTS_URL = pytest.lazy_fixture('url_comments')
 NOT_AUTHOR_CLIENT = pytest.lazy_fixture('not_author_client')
 CLIENT = pytest.lazy_fixture('client')
 HTTP_OK = HTTPStatus.OK
@@ -34,7 +37,10 @@ EDIT_URL_REDIRECT = URL + f'?next={reverse_lazy("news:edit", args=(1, ))}'
         (DELETE_URL, CLIENT, HTTP_FOUND),
         (EDIT_URL, CLIENT, HTTP_FOUND),
         (DETAIL_URL, CLIENT, HTTP_OK),
+        (COMMENTS_URL, CLIENT, HTTP_OK),
         (HOME_URL, CLIENT, HTTP_OK),
+        (ARCHIVE_URL, CLIENT, HTTP_OK),
+        (SEARCH_URL, CLIENT, HTTP_OK),
         (LOGIN_URL, CLIENT, HTTP_OK),
         (LOGOUT_URL, CLIENT, HTTP_OK),
         (SIGNUP_URL, CLIENT, HTTP_OK)
@@ -57,3 +63,11 @@ def test_status_codes(
 def test_anonymous_redirects(client, url, expected_url):
     response = client.get(url)
     assertRedirects(response, expected_url)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('cursor', ('мусор', 'WyJ4IiwgW11d', 'e30'))
+def test_archive_bad_cursor(client, url_archive, cursor):
+    """Испорченный курсор архива приводит к 404."""
+    response = client.get(url_archive, {'cursor': cursor})
+    assert response.status_code == HTTP_NOT_FOUND
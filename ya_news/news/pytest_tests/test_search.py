@@ -0,0 +1,86 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from news import search
+from news.models import News
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def search_news():
+    return News.objects.bulk_create((
+        News(title='Погода в Москве', text='Завтра ожидается ясная погода.'),
+        News(title='Новости спорта', text='Погода помешала матчу.'),
+        News(title='Культура', text='Открылась выставка <script> и картин.'),
+    ))
+
+
+def found_titles(client, url, query):
+    response = client.get(url, {'q': query})
+    return [news.title for news in response.context['object_list']]
+
+
+def test_search_ranks_title_matches_first(client, search_news, url_search):
+    """Совпадение в заголовке ранжируется выше совпадения в тексте."""
+    assert found_titles(client, url_search, 'погода') == [
+        'Погода в Москве', 'Новости спорта'
+    ]
+
+
+def test_search_highlights_and_escapes(client, search_news, url_search):
+    """Совпадения подсвечиваются, а HTML из текста экранируется."""
+    content = client.get(url_search, {'q': 'выставка'}).content.decode()
+    assert '<mark>выставка</mark>' in content
+    assert '&lt;script&gt;' in content
+
+
+@pytest.mark.parametrize('query', ('', 'AND', '"(*', 'NEAR(погода'))
+def test_search_survives_fts_syntax(client, search_news, url_search, query):
+    """Синтаксис FTS5 во вводе не приводит к ошибке."""
+    assert client.get(url_search, {'q': query}).status_code == 200
+
+
+def test_index_follows_changes(client, search_news, url_search):
+    """Индекс обновляется триггерами при правке, удалении и bulk_create."""
+    News.objects.filter(title='Культура').update(text='Театральная премьера')
+    assert found_titles(client, url_search, 'выставка') == []
+    assert found_titles(client, url_search, 'премьера') == ['Культура']
+    News.objects.filter(title='Культура').delete()
+    assert found_titles(client, url_search, 'премьера') == []
+    News.objects.bulk_create([News(title='Премьера', text='Текст')])
+    assert found_titles(client, url_search, 'премьера') == ['Премьера']
+
+
+def test_rebuild_command_restores_index(client, search_news, url_search):
+    """Команда rebuild_news_search восстанавливает потерянные триггеры."""
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TRIGGER news_search_insert')
+    News.objects.create(title='Без индекса', text='Потерянная новость')
+    assert found_titles(client, url_search, 'потерянная') == []
+    call_command('rebuild_news_search', stdout=StringIO())
+    assert found_titles(client, url_search, 'потерянная') == ['Без индекса']
+    News.objects.create(title='После', text='Потерянная снова')
+    assert len(found_titles(client, url_search, 'потерянная')) == 2
+
+
+def test_migrations_leave_search_index_and_triggers():
+    """После migrate индекс и триггеры на месте и совпадают с news/search.py.
+
+    Перестройка news_news миграцией удаляет триггеры, а DDL миграции 0006
+    — замороженная копия: расхождение с search.py ловится здесь.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT sql FROM sqlite_master "
+            "WHERE type = 'trigger' AND tbl_name = 'news_news' "
+            "OR name = 'news_search'"
+        )
+        schema = {sql for sql, in cursor.fetchall()}
+    assert schema == {
+        statement.replace(' IF NOT EXISTS', '')
+        for statement in (search.CREATE_TABLE, *search.CREATE_TRIGGERS)
+    }
@@ -0,0 +1,69 @@
+from unittest import mock
+
+import pytest
+
+from django.db import OperationalError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from news.models import Comment
+from yacommon.sqlite3 import retry_on_busy
+
+
+@pytest.mark.django_db
+def test_connection_pragmas_applied():
+    """Новое соединение получает PRAGMA из OPTIONS."""
+    with connection.cursor() as cursor:
+        values = {
+            name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+            for name in ('synchronous', 'cache_size', 'temp_store')
+        }
+    assert values == {'synchronous': 1, 'cache_size': -20_000, 'temp_store': 2}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_atomic_takes_write_lock_immediately():
+    """atomic() начинается с BEGIN IMMEDIATE и ждёт блокировку записи."""
+    with CaptureQueriesContext(connection) as context:
+        with transaction.atomic():
+            Comment.objects.exists()
+    assert context.captured_queries[0]['sql'] == 'BEGIN IMMEDIATE'
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('message, calls', (
+    ('database is locked', 4),
+    ('no such table: news_comment', 1),
+))
+def test_retry_on_busy_repeats_only_busy_errors(settings, message, calls):
+    """Повторяются только ошибки занятой базы и не больше настроенного."""
+    settings.SQLITE_BUSY_RETRIES = 3
+    settings.SQLITE_BUSY_BACKOFF = 0
+    write = mock.Mock(side_effect=OperationalError(message))
+    with pytest.raises(OperationalError):
+        retry_on_busy(write)()
+    assert write.call_count == calls
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_saved_once_after_busy_retry(
+        author_client, url_detail, news, settings
+):
+    """Комментарий, упёршийся в занятую базу, сохраняется повтором."""
+    settings.SQLITE_BUSY_BACKOFF = 0
+    save = Comment.save
+
+    def busy_once(comment, *args, **kwargs):
+        save(comment, *args, **kwargs)
+        if busy_once.calls == 0:
+            busy_once.calls += 1
+            raise OperationalError('database is locked')
+
+    busy_once.calls = 0
+    with mock.patch.object(
+        Comment, 'save', autospec=True, side_effect=busy_once
+    ):
+        response = author_client.post(url_detail, {'text': 'Комментарий'})
+    assert response.status_code == 302
+    assert news.comment_set.count() == 1
+    news.refresh_from_db()
+    assert news.comment_count == 1
@@ -0,0 +1,215 @@
+import asyncio
+import gc
+import json
+import tracemalloc
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from news.asynchronous import database_sync_to_async
+from news.models import Comment
+from news.stream import CommentStreamApp, get_hub, news_channel
+
+# Поток читает базу из потоков пула: данным теста нужен коммит.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+IDLE_SUBSCRIBERS = 2_000
+WARMUP_SUBSCRIBERS = 100
+# Память на одно простаивающее соединение: задачи, подписка и объекты
+# самого тестового клиента.
+MAX_BYTES_PER_SUBSCRIBER = 10 * 1024
+
+
+class StreamClient:
+    """Клиент ASGI: копит ответ приложения и ждёт команды отключиться."""
+
+    def __init__(self, news_id, last_event_id=None, method='GET'):
+        headers = []
+        if last_event_id is not None:
+            headers.append((b'last-event-id', str(last_event_id).encode()))
+        self.scope = {
+            'type': 'http',
+            'method': method,
+            'path': f'/news/{news_id}/stream/',
+            'headers': headers,
+        }
+        self.messages = []
+        self.disconnected = asyncio.Event()
+        self.unblocked = None
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+        if self.unblocked is not None and self.events():
+            await self.unblocked.wait()
+
+    @property
+    def status(self):
+        return self.messages[0]['status']
+
+    @property
+    def body(self):
+        return b''.join(message.get('body', b'') for message in self.messages)
+
+    def events(self):
+        return [
+            json.loads(line[len(b'data: '):])
+            for line in self.body.splitlines() if line.startswith(b'data: ')
+        ]
+
+    def connect(self):
+        return asyncio.ensure_future(
+            CommentStreamApp(None)(self.scope, self.receive, self.send)
+        )
+
+
+async def wait_until(predicate, timeout=5):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, 'условие не выполнилось'
+        await asyncio.sleep(0.005)
+
+
+def subscribers(news):
+    return get_hub().subscriber_count(news_channel(news.pk))
+
+
+def test_new_comment_is_pushed(news, author):
+    """Комментарий после коммита приходит подписчику потока."""
+    async def scenario():
+        client = StreamClient(news.pk)
+        connection = client.connect()
+        await wait_until(lambda: subscribers(news) == 1)
+        comment = await database_sync_to_async(Comment.objects.create)(
+            news=news, author=author, text='Новый комментарий'
+        )
+        await wait_until(client.events)
+        client.disconnected.set()
+        await connection
+        return client, comment
+
+    client, comment = async_to_sync(scenario)()
+    assert client.status == 200
+    assert f'id: {comment.pk}\nevent: comment\n'.encode() in client.body
+    assert client.events() == [{
+        'id': comment.pk,
+        'author': author.username,
+        'text': 'Новый комментарий',
+        'created': comment.created.isoformat(),
+    }]
+    assert subscribers(news) == 0
+
+
+def test_missed_comments_replayed_after_last_event_id(news, author,
+                                                      settings):
+    """С Last-Event-ID сначала приходят пропущенные комментарии."""
+    settings.NEWS_STREAM_QUEUE_SIZE = 2
+    comments = [
+        Comment.objects.create(news=news, author=author, text=f'Текст {i}')
+        for i in range(5)
+    ]
+
+    async def scenario():
+        client = StreamClient(news.pk, last_event_id=comments[0].pk)
+        connection = client.connect()
+        await wait_until(lambda: len(client.events()) == 4)
+        client.disconnected.set()
+        await connection
+        return client
+
+    client = async_to_sync(scenario)()
+    assert [event['id'] for event in client.events()] == [
+        comment.pk for comment in comments[1:]
+    ]
+
+
+def test_heartbeat_keeps_idle_stream_alive(news, settings):
+    """В паузах между событиями поток шлёт пульс."""
+    settings.NEWS_STREAM_HEARTBEAT = 0.01
+
+    async def scenario():
+        client = StreamClient(news.pk)
+        connection = client.connect()
+        await wait_until(lambda: client.body.count(b': ping\n\n') >= 2)
+        client.disconnected.set()
+        await connection
+
+    async_to_sync(scenario)()
+
+
+@pytest.mark.parametrize('missing, method, status', (
+    (True, 'GET', 404),
+    (False, 'POST', 405),
+))
+def test_stream_rejects_bad_requests(news, missing, method, status):
+    async def scenario():
+        client = StreamClient(news.pk + missing, method=method)
+        await client.connect()
+        return client
+
+    assert async_to_sync(scenario)().status == status
+
+
+def test_slow_subscriber_is_dropped(news, settings):
+    """Отстающий клиент отключается, а его очередь не растёт."""
+    settings.NEWS_STREAM_QUEUE_SIZE = 4
+
+    async def scenario():
+        client = StreamClient(news.pk)
+        client.unblocked = asyncio.Event()
+        connection = client.connect()
+        await wait_until(lambda: subscribers(news) == 1)
+        get_hub().publish(news_channel(news.pk), {'id': 1})
+        # Запись первого события зависла, а события всё идут.
+        await wait_until(client.events)
+        for number in range(2, 10):
+            get_hub().publish(news_channel(news.pk), {'id': number})
+        await asyncio.wait_for(connection, 5)
+        return client
+
+    client = async_to_sync(scenario)()
+    assert [event['id'] for event in client.events()] == [1]
+    assert subscribers(news) == 0
+
+
+def test_idle_subscribers_use_bounded_memory(news, settings):
+    """Тысячи простаивающих подписчиков держат ограниченную память."""
+    settings.NEWS_STREAM_HEARTBEAT = 60
+
+    async def scenario():
+        # Первая партия прогревает пул потоков и их соединения с базой:
+        # меряется только прирост на каждого следующего подписчика.
+        warmup = [StreamClient(news.pk) for _ in range(WARMUP_SUBSCRIBERS)]
+        clients = [StreamClient(news.pk) for _ in range(IDLE_SUBSCRIBERS)]
+        connections = [client.connect() for client in warmup]
+        await wait_until(lambda: subscribers(news) == WARMUP_SUBSCRIBERS)
+        tracemalloc.start()
+        try:
+            gc.collect()
+            before = tracemalloc.take_snapshot()
+            connections += [client.connect() for client in clients]
+            await wait_until(
+                lambda: subscribers(news) == len(connections), timeout=30
+            )
+            gc.collect()
+            used = sum(
+                stat.size_diff for stat in
+                tracemalloc.take_snapshot().compare_to(before, 'filename')
+            )
+        finally:
+            tracemalloc.stop()
+        clients += warmup
+        get_hub().publish(news_channel(news.pk), {'id': 1})
+        await wait_until(lambda: all(client.events() for client in clients))
+        for client in clients:
+            client.disconnected.set()
+        await asyncio.gather(*connections)
+        return used / IDLE_SUBSCRIBERS
+
+    per_subscriber = async_to_sync(scenario)()
+    assert per_subscriber < MAX_BYTES_PER_SUBSCRIBER, per_subscriber
+    assert subscribers(news) == 0
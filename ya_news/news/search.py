@@ -0,0 +1,99 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import News
+
+# Полнотекстовый индекс FTS5 по заголовку и тексту новостей. Таблица
+# хранит только индекс (external content), сами тексты лежат в news_news.
+# Миграция 0006 создаёт их по своей замороженной копии этого DDL; правка
+# здесь требует новой миграции (test_search проверяет, что копии совпадают).
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS news_search USING fts5("
+    "title, text, content='news_news', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+# Триггеры поддерживают индекс и при bulk_create/update(), минуя сигналы.
+# Перестройка news_news миграциями SQLite удаляет триггеры: такая миграция
+# должна создать их заново, иначе упадёт test_search.
+CREATE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS news_search_insert "
+    "AFTER INSERT ON news_news BEGIN "
+    "INSERT INTO news_search(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_search_delete "
+    "AFTER DELETE ON news_news BEGIN "
+    "INSERT INTO news_search(news_search, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS news_search_update "
+    "AFTER UPDATE OF title, text ON news_news BEGIN "
+    "INSERT INTO news_search(news_search, rowid, title, text) "
+    "VALUES ('delete', old.id, old.title, old.text); "
+    "INSERT INTO news_search(rowid, title, text) "
+    "VALUES (new.id, new.title, new.text); END",
+)
+REBUILD = "INSERT INTO news_search(news_search) VALUES ('rebuild')"
+DROP = (
+    'DROP TRIGGER IF EXISTS news_search_insert',
+    'DROP TRIGGER IF EXISTS news_search_delete',
+    'DROP TRIGGER IF EXISTS news_search_update',
+    'DROP TABLE IF EXISTS news_search',
+)
+
+# Совпадение в заголовке весит больше, чем в тексте.
+SEARCH = (
+    'SELECT news_news.id, news_news.title, news_news.date, '
+    'news_news.comment_count, '
+    "highlight(news_search, 0, char(2), char(3)) AS title_highlight, "
+    "snippet(news_search, 1, char(2), char(3), '…', 16) AS snippet "
+    'FROM news_search JOIN news_news ON news_news.id = news_search.rowid '
+    'WHERE news_search MATCH %s '
+    'ORDER BY bm25(news_search, 10.0, 1.0) LIMIT %s'
+)
+
+
+def install(cursor):
+    """Создаёт индекс и триггеры, затем заполняет индекс из news_news."""
+    cursor.execute(CREATE_TABLE)
+    for statement in CREATE_TRIGGERS:
+        cursor.execute(statement)
+    cursor.execute(REBUILD)
+
+
+def build_match(query):
+    """Превращает пользовательский ввод в запрос FTS5.
+
+    Каждое слово берётся в кавычки, поэтому операторы и скобки FTS5 во
+    вводе не ломают запрос; слова объединяются по И.
+    """
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+
+
+def highlight(text):
+    """Экранирует фрагмент и заменяет маркеры совпадений на <mark>."""
+    return mark_safe(
+        escape(text).replace('\x02', '<mark>').replace('\x03', '</mark>')
+    )
+
+
+def search_news(query, limit):
+    """Новости по запросу, от самых релевантных, с подсветкой совпадений."""
+    match = build_match(query)
+    if not match:
+        return []
+    if connection.vendor != 'sqlite':
+        found = News.objects.filter(title__icontains=query) | (
+            News.objects.filter(text__icontains=query)
+        )
+        results = list(found[:limit])
+        for news in results:
+            news.title_highlight = escape(news.title)
+            news.snippet = escape(news.text[:200])
+        return results
+    results = list(News.objects.raw(SEARCH, [match, limit]))
+    for news in results:
+        news.title_highlight = highlight(news.title_highlight)
+        news.snippet = highlight(news.snippet)
+    return results
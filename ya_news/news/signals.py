@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate_news
+from .models import Comment, News
+from .stream import publish_comment
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Отмечаем изменение новости; для нового комментария — и счётчик."""
+    changes = {'modified': timezone.now()}
+    if created:
+        changes['comment_count'] = F('comment_count') + 1
+    News.objects.filter(pk=instance.news_id).update(**changes)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Уменьшаем счётчик комментариев новости и отмечаем её изменение."""
+    News.objects.filter(pk=instance.news_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        modified=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_news_pages(sender, instance, **kwargs):
+    """Сбрасываем закэшированные страницы, которые показывают запись.
+
+    Версии сдвигаются сразу и ещё раз после коммита: иначе страница,
+    отрисованная параллельным запросом до коммита, осталась бы в кэше.
+    """
+    news_id = instance.pk if sender is News else instance.news_id
+    invalidate_news(news_id)
+    transaction.on_commit(lambda: invalidate_news(news_id))
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    """Новый комментарий уходит подписчикам потока после коммита."""
+    if created:
+        transaction.on_commit(lambda: publish_comment(instance))
@@ -0,0 +1,301 @@
+"""Поток новых комментариев к новости (server-sent events) под ASGI.
+
+Комментарии публикуются в хаб после коммита (см. signals.py), а
+CommentStreamApp раздаёт их подписчикам по адресу /news/<pk>/stream/.
+Хаб выбирается настройкой NEWS_STREAM_BACKEND: LocalHub работает в
+пределах процесса; хаб, общий для нескольких воркеров, реализует тот же
+интерфейс поверх внешней шины.
+"""
+import asyncio
+import json
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .asynchronous import database_sync_to_async
+from .models import Comment, News
+
+STREAM_PATH = re.compile(r'^/news/(?P<pk>\d+)/stream/$')
+
+
+def news_channel(news_id):
+    return f'news:{news_id}:comments'
+
+
+def comment_event(comment):
+    """Событие о комментарии: id совпадает с первичным ключом."""
+    return {
+        'id': comment.pk,
+        'author': comment.author.get_username(),
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+class Subscription:
+    """Подписка одного соединения: ограниченная очередь в его цикле событий.
+
+    Очередь не длиннее maxsize. Если клиент не успевает забирать события,
+    подписка сбрасывается (dropped) и соединение закрывается, даже когда
+    запись в сокет зависла: переподключившись с Last-Event-ID, клиент
+    дочитает пропущенное из базы.
+
+    Вместо asyncio.Queue — список и одно ожидание: у тысяч простаивающих
+    соединений очередь пуста, и каждый байт на подписку на счету.
+    """
+
+    __slots__ = (
+        'hub', 'channel', 'loop', 'maxsize', 'pending', 'waiter', 'dropped'
+    )
+
+    def __init__(self, hub, channel, maxsize):
+        self.hub = hub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.maxsize = maxsize
+        self.pending = []
+        self.waiter = None
+        self.dropped = self.loop.create_future()
+
+    def deliver(self, event):
+        """Передаёт событие в цикл подписчика; вызывается из любого потока."""
+        try:
+            self.loop.call_soon_threadsafe(self.put, event)
+        except RuntimeError:
+            # Цикл уже закрыт: подписка умерла вместе с ним.
+            self.close()
+
+    def put(self, event):
+        if self.dropped.done():
+            return
+        if len(self.pending) >= self.maxsize:
+            return self.drop()
+        self.pending.append(event)
+        self.wake()
+
+    def wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def drop(self):
+        """Отключает отстающего подписчика и освобождает его очередь."""
+        self.close()
+        self.pending.clear()
+        if not self.dropped.done():
+            self.dropped.set_result(None)
+
+    async def get(self, timeout):
+        """Следующее событие или None, если за timeout секунд его не было."""
+        if not self.pending:
+            self.waiter = self.loop.create_future()
+            timer = self.loop.call_later(timeout, self.wake)
+            try:
+                await self.waiter
+            finally:
+                timer.cancel()
+                self.waiter = None
+        return self.pending.pop(0) if self.pending else None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class LocalHub:
+    """Хаб в памяти процесса: события получают подписчики этого воркера."""
+
+    def __init__(self):
+        self.channels = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel, maxsize):
+        """Подписывает текущий цикл событий на канал."""
+        subscription = Subscription(self, channel, maxsize)
+        with self.lock:
+            self.channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[subscription.channel]
+
+    def publish(self, channel, event):
+        """Рассылает событие подписчикам; вызывается из любого потока."""
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscriber_count(self, channel):
+        with self.lock:
+            return len(self.channels.get(channel, ()))
+
+
+_hub = None
+
+
+def get_hub():
+    """Хаб из settings.NEWS_STREAM_BACKEND, один на процесс."""
+    global _hub
+    if _hub is None:
+        _hub = import_string(settings.NEWS_STREAM_BACKEND)()
+    return _hub
+
+
+@receiver(setting_changed)
+def reset_hub(setting, **kwargs):
+    global _hub
+    if setting == 'NEWS_STREAM_BACKEND':
+        _hub = None
+
+
+def publish_comment(comment):
+    get_hub().publish(news_channel(comment.news_id), comment_event(comment))
+
+
+def encode_event(event):
+    data = json.dumps(event, ensure_ascii=False)
+    return f'id: {event["id"]}\nevent: comment\ndata: {data}\n\n'.encode()
+
+
+@database_sync_to_async
+def news_exists(news_id):
+    return News.objects.filter(pk=news_id).exists()
+
+
+@database_sync_to_async
+def missed_comments(news_id, last_id, limit):
+    """Следующие после last_id комментарии новости, не больше limit."""
+    return [
+        comment_event(comment)
+        for comment in Comment.objects.filter(
+            news_id=news_id, pk__gt=last_id
+        ).select_related('author').order_by('pk')[:limit]
+    ]
+
+
+async def isolated(coroutine):
+    """Выполняет корутину в отдельной задаче со своей копией контекста.
+
+    sync_to_async возвращает в контекст вызывающего значения всех
+    asgiref.Local; в контексте долгоживущего соединения они висели бы,
+    пока оно открыто.
+    """
+    return await asyncio.ensure_future(coroutine)
+
+
+def last_event_id(scope):
+    for name, value in scope['headers']:
+        if name == b'last-event-id':
+            return int(value) if value.isdigit() else None
+    return None
+
+
+async def send_response(send, status, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream_comments(news_id, scope, receive, send):
+    """Отдаёт новые комментарии новости, пока клиент не отключится.
+
+    Ответ не завершается: возврат без последнего сообщения сервер считает
+    обрывом и закрывает соединение, что и нужно для сброшенной подписки.
+    """
+    if scope['method'] != 'GET':
+        return await send_response(send, 405, b'Method Not Allowed')
+    if not await isolated(news_exists(news_id)):
+        return await send_response(send, 404, b'Not Found')
+    # Подписка раньше чтения пропущенного: иначе комментарий, созданный
+    # между ними, потерялся бы.
+    subscription = get_hub().subscribe(
+        news_channel(news_id), settings.NEWS_STREAM_QUEUE_SIZE
+    )
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    events = asyncio.ensure_future(
+        send_events(news_id, subscription, last_event_id(scope), send)
+    )
+    try:
+        await asyncio.wait(
+            (disconnect, events, subscription.dropped),
+            return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        subscription.close()
+        disconnect.cancel()
+        events.cancel()
+    if events.done() and not events.cancelled():
+        events.result()
+
+
+async def send_events(news_id, subscription, last_id, send):
+    """Пишет в ответ события, а в паузах — пульс."""
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': f'retry: {settings.NEWS_STREAM_RETRY}\n\n'.encode(),
+        'more_body': True,
+    })
+    limit = settings.NEWS_STREAM_QUEUE_SIZE
+    while last_id is not None:
+        missed = await isolated(missed_comments(news_id, last_id, limit))
+        for event in missed:
+            await send({
+                'type': 'http.response.body',
+                'body': encode_event(event),
+                'more_body': True,
+            })
+            last_id = event['id']
+        if len(missed) < limit:
+            break
+    last_id = last_id or 0
+    while True:
+        event = await subscription.get(settings.NEWS_STREAM_HEARTBEAT)
+        if event is None:
+            # Комментарий SSE держит соединение живым через прокси.
+            body = b': ping\n\n'
+        elif event['id'] <= last_id:
+            continue
+        else:
+            last_id, body = event['id'], encode_event(event)
+        await send({
+            'type': 'http.response.body', 'body': body, 'more_body': True
+        })
+
+
+class CommentStreamApp:
+    """ASGI-приложение: поток комментариев, остальное — в Django."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        match = scope['type'] == 'http' and STREAM_PATH.match(scope['path'])
+        if not match:
+            return await self.application(scope, receive, send)
+        await stream_comments(int(match['pk']), scope, receive, send)
@@ -1,16 +1,33 @@
+from django.conf import settings
 from django.urls import path
 
 from news import views
 
 app_name = 'news'
 
+# Самые читаемые страницы под ASGI обслуживаются асинхронными вариантами.
+if settings.NEWS_ASYNC_VIEWS:
+    home_view, detail_view = views.AsyncNewsList, views.AsyncNewsDetailView
+else:
+    home_view, detail_view = views.NewsList, views.NewsDetailView
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', home_view.as_view(), name='home'),
+    path('archive/', views.NewsArchive.as_view(), name='archive'),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('news/<int:pk>/', detail_view.as_view(), name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsComments.as_view(),
+        name='comments'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
+    path(
+        'export/<slug:dataset>/', views.NewsExport.as_view(), name='export'
+    ),
 ]
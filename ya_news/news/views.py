@@ -1,14 +1,30 @@
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.views import generic
-
+from yacommon.export import FORMATS, export_response
+from yacommon.pagination import KeysetPaginator
+from yacommon.sqlite3 import retry_on_busy
+
+from .asynchronous import AsyncViewMixin
+from .cache import (
+    AnonymousPageCacheMixin,
+    ConditionalGetMixin,
+    ListConditionalGetMixin,
+    news_version_key,
+)
+from .exports import DATASETS
 from .forms import CommentForm
 from .models import Comment, News
+from .search import search_news
 
 
-class NewsList(generic.ListView):
+class NewsList(
+        ListConditionalGetMixin, AnonymousPageCacheMixin, generic.ListView
+):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
@@ -17,31 +33,112 @@ class NewsList(generic.ListView):
         """
         Выводим только несколько последних новостей.
 
-        Их количество определяется в настройках проекта.
+        Их количество определяется в настройках проекта. Количество
+        комментариев берём из денормализованного поля comment_count.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+
+
+class NewsArchive(
+        ListConditionalGetMixin, AnonymousPageCacheMixin, generic.ListView
+):
+    """Архив новостей с постраничной навигацией по курсору."""
+    model = News
+    template_name = 'news/archive.html'
+    ordering = ('-date', '-id')
+
+    def get_queryset(self):
+        """Отдаём одну страницу, отобранную по ключу (date, id)."""
+        paginator = KeysetPaginator(
+            self.model.objects.all(),
+            self.get_ordering(),
+            settings.NEWS_COUNT_ON_HOME_PAGE
+        )
+        self.page = paginator.get_page(self.request.GET.get('cursor'))
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page'] = self.page
+        return context
 
 
-class NewsDetail(generic.DetailView):
+class NewsSearch(generic.ListView):
+    """Поиск по новостям с ранжированием и подсветкой совпадений."""
+    template_name = 'news/search.html'
+
+    def get_queryset(self):
+        return search_news(
+            self.request.GET.get('q', ''), settings.NEWS_SEARCH_RESULTS
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+def get_comments_paginator(news):
+    """Комментарии новости постранично, от старых к новым."""
+    return KeysetPaginator(
+        news.comment_set.select_related('author'),
+        ('created', 'id'),
+        settings.COMMENTS_COUNT_ON_NEWS_PAGE
+    )
+
+
+class NewsDetail(
+        ConditionalGetMixin, AnonymousPageCacheMixin, generic.DetailView
+):
     model = News
     template_name = 'news/detail.html'
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
+    def get_cache_version_keys(self):
+        return [news_version_key(self.kwargs['pk'])]
+
+    def get_validators(self):
+        """Отметка изменения новости — один запрос по первичному ключу."""
+        modified = self.model.objects.filter(
             pk=self.kwargs['pk']
-        )
-        return obj
+        ).values_list('modified', flat=True).first()
+        return self.validators_for(modified)
+
+    def get_response_validators(self):
+        return self.validators_for(self.object.modified)
+
+    def validators_for(self, modified):
+        """Last-Modified отдаём только анонимным: он не различает людей."""
+        if modified is None:
+            return None, None
+        if self.request.user.is_authenticated:
+            return self.get_user_etag(modified.timestamp()), None
+        return self.get_user_etag(modified.timestamp()), modified
 
     def get_context_data(self, **kwargs):
+        """Выводим только первую страницу комментариев."""
         context = super().get_context_data(**kwargs)
+        context['comments'] = get_comments_paginator(self.object).get_page()
+        # Поток комментариев отдаёт только ASGI-приложение (news.stream).
+        context['comment_stream'] = isinstance(self.request, ASGIRequest)
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
         return context
 
 
+class NewsComments(generic.TemplateView):
+    """Фрагмент со следующей (или предыдущей) страницей комментариев."""
+    template_name = 'includes/comments.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        news = get_object_or_404(News, pk=self.kwargs['pk'])
+        context['news'] = news
+        context['comments'] = get_comments_paginator(news).get_page(
+            self.request.GET.get('cursor')
+        )
+        return context
+
+
 class NewsComment(
         LoginRequiredMixin,
         generic.detail.SingleObjectMixin,
@@ -55,6 +152,7 @@ class NewsComment(
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
+    @retry_on_busy
     def form_valid(self, form):
         comment = form.save(commit=False)
         comment.news = self.object
@@ -63,8 +161,9 @@ class NewsComment(
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
@@ -78,19 +177,29 @@ class NewsDetailView(generic.View):
         return view(request, *args, **kwargs)
 
 
+class AsyncNewsList(AsyncViewMixin, NewsList):
+    """Главная под ASGI: запросы к базе и шаблон — в пуле потоков."""
+
+
+class AsyncNewsDetailView(AsyncViewMixin, NewsDetailView):
+    """Новость и отправка комментария под ASGI."""
+
+
 class CommentBase(LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Новость берём из уже загруженного комментария."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
         """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -102,3 +211,26 @@ class CommentUpdate(CommentBase, generic.UpdateView):
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+
+class NewsExport(LoginRequiredMixin, UserPassesTestMixin, generic.View):
+    """Потоковая выгрузка новостей или комментариев для сотрудников.
+
+    Формат — ?format=ndjson (по умолчанию) или csv, ?gzip=1 сжимает файл.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            raise Http404
+        fmt = request.GET.get('format', 'ndjson')
+        if fmt not in FORMATS:
+            return HttpResponseBadRequest(
+                f'Формат — один из: {", ".join(FORMATS)}.'
+            )
+        rows, columns = DATASETS[dataset]
+        return export_response(
+            rows(), columns, dataset, fmt, request.GET.get('gzip') == '1'
+        )
@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from yacommon.export import StreamingASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+# Под ASGI главная и страница новости работают асинхронно (news.urls).
+os.environ.setdefault('NEWS_ASYNC_VIEWS', '1')
+
+# Как get_asgi_application(), но тело потоковых ответов (выгрузок)
+# собирается в пуле потоков, а не в цикле событий.
+django.setup(set_prefix=False)
+django_application = StreamingASGIHandler()
+
+# Импорт моделей возможен только после настройки Django.
+from news.stream import CommentStreamApp  # noqa: E402
 
-application = get_asgi_application()
+application = CommentStreamApp(django_application)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -18,14 +19,19 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'news.apps.NewsConfig',
+    'yacommon.apps.YacommonConfig',
 ]
 
 MIDDLEWARE = [
+    'yacommon.metrics.MetricsMiddleware',
+    'yacommon.querybudget.QueryBudgetMiddleware',
+    'yacommon.replicas.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'yacommon.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -43,6 +49,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'news.context_processors.fragment_cache',
             ],
         },
     },
@@ -53,11 +60,68 @@ WSGI_APPLICATION = 'yanews.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yacommon.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переживает запрос, а не открывается заново на каждый.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            # Сколько секунд ждать чужую запись до «database is locked».
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                # Читатели не ждут писателя, писатель — читателей.
+                'journal_mode': 'WAL',
+                # В WAL достаточно для целостности; теряются лишь последние
+                # транзакции при отключении питания.
+                'synchronous': 'NORMAL',
+                'cache_size': -20_000,  # КиБ, то есть около 20 МБ.
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
     }
 }
 
+# Реплика для чтения: локально — копия файла основной базы, см.
+# yacommon/replicas.py. Чтение уходит на реплики, только если их алиасы
+# перечислены в DATABASE_REPLICAS (переменная окружения, через запятую).
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': BASE_DIR / 'db.replica.sqlite3',
+}
+
+DATABASE_ROUTERS = ['yacommon.replicas.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [
+    alias for alias in os.environ.get('DATABASE_REPLICAS', '').split(',')
+    if alias
+]
+# Сколько секунд после записи клиент читает из основной базы, и cookie,
+# в которой это хранится.
+DATABASE_PIN_SECONDS = 10
+DATABASE_PIN_COOKIE = 'pin_primary'
+
+# Повторы записи при занятой базе (retry_on_busy): сколько раз и с какой
+# первой паузой в секундах; пауза удваивается.
+SQLITE_BUSY_RETRIES = 3
+SQLITE_BUSY_BACKOFF = 0.05
+
+# Каталог снимков тестовых баз после миграций (yacommon/testdb.py). Пустая
+# переменная окружения — миграции в каждой сессии pytest, как в Django.
+TEST_DB_TEMPLATE_DIR = os.environ.get(
+    'TEST_DB_TEMPLATE_DIR', str(BASE_DIR / '.testdb')
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yanews',
+    },
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yanews-fragments',
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +144,65 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+COMMENTS_COUNT_ON_NEWS_PAGE = 50
+
+NEWS_SEARCH_RESULTS = 20
+
+# Файл со списком запрещённых в комментариях слов, по слову в строке.
+# Если не задан, используется news.forms.BAD_WORDS.
+BAD_WORDS_FILE = None
+
+# Сколько секунд хранить страницы для анонимных читателей; 0 — не кэшировать.
+NEWS_PAGE_CACHE_TIMEOUT = 300
+
+# Фрагменты шаблонов ключуются по News.modified, поэтому живут долго.
+NEWS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Наибольшее число SQL-запросов на запрос к URL, вместе с загрузкой сессии
+# и пользователя, а у списков — и с запросом валидатора ETag. Превышение
+# пишет в лог yacommon.querybudget, а тесты news/pytest_tests/test_queries.py
+# проверяют бюджеты на данных разного объёма.
+QUERY_BUDGETS = {
+    'news:home': 4,
+    'news:archive': 4,
+    'news:search': 3,
+    'news:detail': 5,
+    'news:comments': 4,
+    'news:edit': 5,
+    'news:delete': 5,
+}
+
+# Отдавать ли число и время SQL-запросов в заголовке Server-Timing.
+QUERY_STATS_HEADER = DEBUG
+
+# Метрики Prometheus на /metrics (yacommon/metrics.py). Процессы
+# preforked-сервера сохраняют свои счётчики в общий каталог METRICS_DIR
+# не чаще раза в METRICS_FLUSH_INTERVAL секунд, и /metrics складывает их;
+# без каталога /metrics показывает только свой процесс.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Снимки профиля и SQL (yacommon/profiling.py): параметр профиля по
+# требованию сотрудника, доля профилируемых запросов, порог медленного
+# запроса в секундах (None — не ловить) и каталог, где хранятся
+# PROFILE_KEEP последних снимков. Сводка — manage.py profile_report.
+PROFILE_PARAM = 'profile'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SLOW_SECONDS = (
+    float(os.environ['PROFILE_SLOW_SECONDS'])
+    if os.environ.get('PROFILE_SLOW_SECONDS') else None
+)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles')
+PROFILE_KEEP = 200
+
+# Асинхронные варианты главной и страницы новости; asgi.py включает их.
+NEWS_ASYNC_VIEWS = os.environ.get('NEWS_ASYNC_VIEWS') == '1'
+
+# Поток новых комментариев под ASGI (news/stream.py): хаб подписок, длина
+# очереди подписчика, период пульса в секундах и пауза переподключения
+# клиента в миллисекундах.
+NEWS_STREAM_BACKEND = 'news.stream.LocalHub'
+NEWS_STREAM_QUEUE_SIZE = 64
+NEWS_STREAM_HEARTBEAT = 15
+NEWS_STREAM_RETRY = 3000
@@ -0,0 +1,34 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .models import NotesVersion
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на условный GET, не выполняя представление.
+
+    ETag строится из версии заметок пользователя: её даёт один запрос по
+    первичному ключу, а меняет любое создание, правка или удаление заметки.
+    Версия читается из базы заметок пользователя — notes_database из
+    NoteBase.
+    """
+
+    def get_etag(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return None
+        version = NotesVersion.get_version(user.pk, self.notes_database)
+        return quote_etag(f'{user.pk}-{version}')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        etag = self.get_etag()
+        if etag and 'HTTP_IF_NONE_MATCH' in request.META:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+        response = super().dispatch(request, *args, **kwargs)
+        if etag and response.status_code == 200:
+            response['ETag'] = etag
+        return response
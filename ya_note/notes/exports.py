@@ -0,0 +1,10 @@
+"""Выгрузка заметок автора: values()-выборка и её колонки."""
+from .shards import author_notes
+
+# Колонка файла -> поле выборки.
+NOTE_COLUMNS = {'id': 'id', 'title': 'title', 'text': 'text', 'slug': 'slug'}
+
+
+def note_rows(author_id):
+    """Заметки автора в его шарде."""
+    return author_notes(author_id).values(*NOTE_COLUMNS.values())
@@ -1,5 +1,3 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
 
@@ -16,14 +14,13 @@ class NoteForm(forms.ModelForm):
         fields = ('title', 'text', 'slug')
 
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
+        """Обрабатывает случай, если slug не уникален.
+
+        Пустой slug подберёт модель при сохранении: свободный вариант
+        по заголовку, с числовым суффиксом при совпадении. Занятость
+        проверяется среди всех заметок, при шардировании — по реестру.
+        """
+        slug = self.cleaned_data.get('slug')
+        if slug and self.instance.taken_slugs().filter(slug=slug).exists():
             raise ValidationError(slug + WARNING)
         return slug
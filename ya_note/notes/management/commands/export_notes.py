@@ -0,0 +1,55 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.exports import NOTE_COLUMNS, note_rows
+from yacommon.export import CHUNK_SIZE, FORMATS, export_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает заметки автора в NDJSON или CSV, при желании '
+        'со сжатием gzip. Память не растёт с числом заметок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('author', help='Имя пользователя автора.')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', default='-', help='Файл; - — стандартный вывод.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            author = User.objects.get_by_natural_key(options['author'])
+        except User.DoesNotExist as error:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден.'
+            ) from error
+        chunks = export_chunks(
+            note_rows(author.pk), NOTE_COLUMNS, options['format'],
+            options['gzip'], options['chunk_size']
+        )
+        output = options['output']
+        try:
+            file = (
+                sys.stdout.buffer if output == '-' else open(output, 'wb')
+            )
+        except OSError as error:
+            raise CommandError(f'Не открыть {output}: {error}') from error
+        written = 0
+        try:
+            for chunk in chunks:
+                file.write(chunk)
+                written += len(chunk)
+        finally:
+            if output != '-':
+                file.close()
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f'{author}: {written} байт в {output}.'
+            ))
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.shards import move_author, notes_db
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит все заметки автора в другой шард и закрепляет автора за '
+        'ним. Запускать, пока автор не пишет заметки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('author', help='Имя пользователя автора.')
+        parser.add_argument('shard', help='Алиас шарда из NOTES_SHARDS.')
+        parser.add_argument('--batch-size', type=int, default=1_000)
+
+    def handle(self, *args, **options):
+        shard = options['shard']
+        if shard not in settings.NOTES_SHARDS:
+            raise CommandError(
+                f'{shard} нет среди шардов: {settings.NOTES_SHARDS}.'
+            )
+        User = get_user_model()
+        try:
+            author = User.objects.get_by_natural_key(options['author'])
+        except User.DoesNotExist as error:
+            raise CommandError(
+                f'Пользователь {options["author"]} не найден.'
+            ) from error
+        source = notes_db(author.pk)
+        moved = move_author(author.pk, shard, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{author}: {source} -> {shard}, перенесено заметок: {moved}.'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from notes import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздаёт полнотекстовый индекс notes_search и его триггеры '
+        'и заново заполняет индекс из таблицы заметок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База с заметками: default или шард из NOTES_SHARDS.'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Индекс FTS5 поддерживается только в SQLite.')
+        with connection.cursor() as cursor:
+            search.install(cursor)
+            cursor.execute('SELECT count(*) FROM notes_search')
+            indexed = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс поиска перестроен, заметок в индексе: {indexed}.'
+        ))
@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+from pytils.translit import slugify
+
+from notes.models import Note, NotesVersion
+from notes.slugs import FALLBACK_SLUG
+from yacommon.seeding import SeedCommand, batched, zipf_cum_weights
+
+# Заголовки, которые у многих пользователей совпадают: среди них и
+# заголовок по умолчанию.
+COMMON_TITLES = (
+    'Название заметки', 'Список покупок', 'Идеи', 'Дела на завтра',
+    'Рецепт', 'Пароль от wi-fi',
+)
+# Запас длины slug под суффикс -N.
+SUFFIX_RESERVE = 8
+# Столько основ slug проверяется одним запросом: больше — и цепочка OR
+# упрётся в предел глубины выражения SQLite.
+LOOKUP_CHUNK = 200
+
+
+class SlugSequence:
+    """Выдаёт slug base, base-2, … так же, как Note.save.
+
+    bulk_create минует Note.save, поэтому номера внутри пачки ведутся в
+    памяти. Занятые варианты основ пачки читаются запросами по
+    LOOKUP_CHUNK основ сразу. Прежние пачки к этому времени уже записаны,
+    и их номера видны в базе: память ограничена размером пачки, сколько
+    бы разных заголовков ни было.
+    """
+
+    def __init__(self, model):
+        # Цепочка OR из сотен диапазонов в ORM строится за квадратичное
+        # время, поэтому запрос занятых slug собирается вручную.
+        self.table = connection.ops.quote_name(model._meta.db_table)
+        max_length = model._meta.get_field('slug').max_length
+        self.max_length = max_length - SUFFIX_RESERVE
+        # Основа -> наибольший выданный номер; 1 — занята сама основа.
+        self.last = {}
+        self.free = set()
+
+    def base(self, title):
+        return slugify(title)[:self.max_length].strip('-') or FALLBACK_SLUG
+
+    def load(self, bases):
+        """Заменяет номера прежней пачки занятыми вариантами основ новой."""
+        self.last, self.free = {}, set()
+        bases = sorted(set(bases))
+        for start in range(0, len(bases), LOOKUP_CHUNK):
+            chunk = set(bases[start:start + LOOKUP_CHUNK])
+            self.last.update(dict.fromkeys(chunk, 1))
+            self.free.update(chunk)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT slug FROM {self.table} WHERE '
+                    + ' OR '.join(['(slug >= %s AND slug < %s)'] * len(chunk)),
+                    [value for base in chunk for value in (base, f'{base}.')]
+                )
+                for slug, in cursor.fetchall():
+                    self.free.discard(slug)
+                    prefix, _, suffix = slug.rpartition('-')
+                    if prefix in chunk and suffix.isdigit():
+                        self.last[prefix] = max(
+                            self.last[prefix], int(suffix)
+                        )
+
+    def next(self, base):
+        if base in self.free:
+            self.free.remove(base)
+            return base
+        self.last[base] += 1
+        return f'{base}-{self.last[base]}'
+
+
+class Command(SeedCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями и заметками с '
+        'совпадающими заголовками. Одинаковый --seed на пустой базе даёт '
+        'одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--notes', type=int, default=10_000)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель Ципфа для числа заметок у авторов.'
+        )
+        parser.add_argument(
+            '--collisions', type=float, default=0.3,
+            help='Доля заметок с частым заголовком и совпадающим slug.'
+        )
+        parser.add_argument(
+            '--common-titles', nargs='+', default=COMMON_TITLES,
+            help='Частые заголовки, из которых выбираются совпадающие.'
+        )
+        parser.add_argument('--title-words', type=int, default=3)
+        parser.add_argument('--text-words', type=int, default=40)
+
+    def seed(self, options, user_ids):
+        if options['notes']:
+            if not user_ids:
+                raise CommandError('Заметкам нужны авторы: --users > 0.')
+            if settings.NOTES_SHARDS:
+                raise CommandError(
+                    'Заметки засеваются в default без шардирования; '
+                    'разложить их по шардам поможет shard_notes.'
+                )
+            self.seed_notes(options, user_ids)
+
+    def seed_notes(self, options, user_ids):
+        """Число заметок у авторов распределено по Ципфу."""
+        user_weights = zipf_cum_weights(len(user_ids), options['zipf'])
+        slugs = SlugSequence(Note)
+
+        def notes():
+            for _ in range(options['notes']):
+                if self.rng.random() < options['collisions']:
+                    title = self.rng.choice(options['common_titles'])
+                else:
+                    title = self.words(options['title_words'])[:100]
+                yield Note(
+                    title=title,
+                    text=self.words(options['text_words']),
+                    author_id=self.rng.choices(
+                        user_ids, cum_weights=user_weights
+                    )[0],
+                )
+
+        def with_slugs():
+            # Пачки те же, что у create: к чтению slug следующей пачки
+            # предыдущая уже записана.
+            for batch in batched(notes(), self.batch_size):
+                bases = [slugs.base(note.title) for note in batch]
+                slugs.load(bases)
+                for note, base in zip(batch, bases):
+                    note.slug = slugs.next(base)
+                yield from batch
+
+        self.create(Note, with_slugs())
+        # У живых авторов строка версии появляется с первой заметкой; без
+        # неё первая правка под нагрузкой делала бы лишние запросы.
+        self.create(NotesVersion, (
+            NotesVersion(author_id=author_id) for author_id in user_ids
+        ))
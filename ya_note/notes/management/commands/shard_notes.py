@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from notes.models import Note
+from notes.shards import move_author, notes_db
+
+
+class Command(BaseCommand):
+    help = (
+        'Переход на шардирование: переносит заметки всех авторов из '
+        'default в их шарды из settings.NOTES_SHARDS и заполняет реестр '
+        'slug. Перед запуском схему шардов создаёт migrate --database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1_000)
+
+    def handle(self, *args, **options):
+        if not settings.NOTES_SHARDS:
+            raise CommandError('Шарды не заданы: пуст settings.NOTES_SHARDS.')
+        author_ids = Note.objects.using(DEFAULT_DB_ALIAS).order_by(
+            'author_id'
+        ).values_list('author_id', flat=True).distinct()
+        authors = notes = 0
+        for author_id in list(author_ids):
+            notes += move_author(
+                author_id, notes_db(author_id), options['batch_size']
+            )
+            authors += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено заметок: {notes}, авторов: {authors}.'
+        ))
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.15 on 2026-10-18 21:05
+
+from django.db import migrations
+
+# DDL заморожен на момент миграции: правка notes/search.py не меняет
+# историю схемы, новая схема индекса — новая миграция.
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS notes_search USING fts5("
+    "author_id, title, text, content='notes_note', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+)
+CREATE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS notes_search_insert "
+    "AFTER INSERT ON notes_note BEGIN "
+    "INSERT INTO notes_search(rowid, author_id, title, text) "
+    "VALUES (new.id, new.author_id, new.title, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS notes_search_delete "
+    "AFTER DELETE ON notes_note BEGIN "
+    "INSERT INTO notes_search(notes_search, rowid, author_id, title, text) "
+    "VALUES ('delete', old.id, old.author_id, old.title, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS notes_search_update "
+    "AFTER UPDATE OF author_id, title, text ON notes_note BEGIN "
+    "INSERT INTO notes_search(notes_search, rowid, author_id, title, text) "
+    "VALUES ('delete', old.id, old.author_id, old.title, old.text); "
+    "INSERT INTO notes_search(rowid, author_id, title, text) "
+    "VALUES (new.id, new.author_id, new.title, new.text); END",
+)
+REBUILD = "INSERT INTO notes_search(notes_search) VALUES ('rebuild')"
+DROP = (
+    'DROP TRIGGER IF EXISTS notes_search_insert',
+    'DROP TRIGGER IF EXISTS notes_search_delete',
+    'DROP TRIGGER IF EXISTS notes_search_update',
+    'DROP TABLE IF EXISTS notes_search',
+)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in (CREATE_TABLE, *CREATE_TRIGGERS, REBUILD):
+            cursor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_notesversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# DDL заморожен на момент миграции, как и в 0003: правка notes/search.py
+# не меняет историю схемы.
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS notes_search USING fts5("
+    "author_id, title, text, content='notes_note', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+)
+CREATE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS notes_search_insert "
+    "AFTER INSERT ON notes_note BEGIN "
+    "INSERT INTO notes_search(rowid, author_id, title, text) "
+    "VALUES (new.id, new.author_id, new.title, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS notes_search_delete "
+    "AFTER DELETE ON notes_note BEGIN "
+    "INSERT INTO notes_search(notes_search, rowid, author_id, title, text) "
+    "VALUES ('delete', old.id, old.author_id, old.title, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS notes_search_update "
+    "AFTER UPDATE OF author_id, title, text ON notes_note BEGIN "
+    "INSERT INTO notes_search(notes_search, rowid, author_id, title, text) "
+    "VALUES ('delete', old.id, old.author_id, old.title, old.text); "
+    "INSERT INTO notes_search(rowid, author_id, title, text) "
+    "VALUES (new.id, new.author_id, new.title, new.text); END",
+)
+REBUILD = "INSERT INTO notes_search(notes_search) VALUES ('rebuild')"
+
+
+def install_search_index(apps, schema_editor):
+    # SQLite пересобирает notes_note при смене внешнего ключа и удаляет
+    # триггеры индекса поиска: их нужно вернуть.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in (CREATE_TABLE, *CREATE_TRIGGERS, REBUILD):
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0004_note_author_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteShard',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_shard', serialize=False, to='auth.user')),
+                ('database', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.RunPython(migrations.RunPython.noop, install_search_index),
+        migrations.AlterField(
+            model_name='note',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='notesversion',
+            name='author',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notes_version', serialize=False, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='NoteSlug',
+            fields=[
+                ('slug', models.SlugField(max_length=100, primary_key=True, serialize=False)),
+                ('note_id', models.BigIntegerField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='noteslug',
+            index=models.Index(fields=['author', 'note_id'], name='noteslug_author_note_idx'),
+        ),
+    ]
@@ -1,7 +1,13 @@
 from django.conf import settings
-from django.db import models
+from django.db import (
+    DEFAULT_DB_ALIAS, IntegrityError, models, router, transaction,
+)
 
-from pytils.translit import slugify
+from .slugs import allocate_slug
+
+# Сколько раз подбирать slug заново, если параллельный запрос успел занять
+# выбранный вариант раньше.
+SLUG_ATTEMPTS = 5
 
 
 class Note(models.Model):
@@ -23,16 +29,131 @@ class Note(models.Model):
         help_text=('Укажите адрес для страницы заметки. Используйте только '
                    'латиницу, цифры, дефисы и знаки подчёркивания')
     )
+    # При шардировании заметки лежат не в базе пользователей, поэтому
+    # внешнего ключа в схеме нет; удаление заметок автора из шарда — в
+    # signals.py.
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,
     )
 
+    class Meta:
+        indexes = (
+            # Список заметок автора листается по ключу (author_id, id).
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+        )
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """Без slug подбирает свободный по заголовку."""
+        database = kwargs.get('using') or router.db_for_write(
+            Note, instance=self
+        )
+        if self.slug:
+            return self.save_claimed(database, *args, **kwargs)
+        max_slug_length = self._meta.get_field('slug').max_length
+        for attempt in range(1, SLUG_ATTEMPTS + 1):
+            self.slug = allocate_slug(
+                self.taken_slugs(), self.title, max_slug_length
+            )
+            try:
+                with transaction.atomic(using=database):
+                    return self.save_claimed(database, *args, **kwargs)
+            except IntegrityError:
+                if attempt == SLUG_ATTEMPTS:
+                    raise
+
+    def taken_slugs(self):
+        """Slug других заметок: при шардировании — из общего реестра."""
+        if settings.NOTES_SHARDS:
+            return NoteSlug.objects.using(DEFAULT_DB_ALIAS).exclude(
+                author_id=self.author_id, note_id=self.pk
+            )
+        return Note.objects.exclude(pk=self.pk)
+
+    def save_claimed(self, database, *args, **kwargs):
+        """Сохраняет заметку, при шардировании заняв её slug в реестре.
+
+        Реестр фиксируется раньше шарда: сбой между ними оставит занятый
+        slug без заметки, но не две заметки с одним slug.
+        """
+        if not settings.NOTES_SHARDS:
+            return super().save(*args, **kwargs)
+        adding = self._state.adding
+        with transaction.atomic(using=database):
+            super().save(*args, **kwargs)
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                if adding or not NoteSlug.objects.filter(
+                    author_id=self.author_id, note_id=self.pk
+                ).update(slug=self.slug):
+                    NoteSlug.objects.create(
+                        slug=self.slug, author_id=self.author_id,
+                        note_id=self.pk
+                    )
+
+
+class NotesVersion(models.Model):
+    """Счётчик изменений заметок автора — валидатор для условных GET.
+
+    Живёт в одной базе с заметками автора; using — её алиас (см.
+    notes/shards.py), None — выбор маршрутизатора.
+    """
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notes_version',
+        db_constraint=False,
+    )
+    version = models.PositiveIntegerField(default=1)
+
+    @classmethod
+    def bump(cls, author_id, using=None):
+        """Увеличивает версию заметок автора."""
+        versions = cls.objects.using(using)
+        if not versions.filter(author_id=author_id).update(
+            version=models.F('version') + 1
+        ):
+            versions.get_or_create(author_id=author_id)
+
+    @classmethod
+    def get_version(cls, author_id, using=None):
+        """Текущая версия заметок автора одним запросом по ключу."""
+        return cls.objects.using(using).filter(
+            author_id=author_id
+        ).values_list('version', flat=True).first() or 0
+
+
+class NoteSlug(models.Model):
+    """Реестр slug всех заметок при шардировании (settings.NOTES_SHARDS).
+
+    Лежит в default: уникальный индекс notes_note действует только внутри
+    шарда, а slug должен быть уникален среди всех. note_id — id заметки в
+    её шарде.
+    """
+    slug = models.SlugField(max_length=100, primary_key=True)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    note_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'note_id'), name='noteslug_author_note_idx'
+            ),
+        )
+
+
+class NoteShard(models.Model):
+    """Шард автора, назначенный вместо шарда по хэшу (rebalance_notes)."""
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='note_shard',
+    )
+    database = models.CharField(max_length=100)
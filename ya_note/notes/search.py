@@ -0,0 +1,102 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import Note
+from .shards import author_notes
+
+# Полнотекстовый индекс FTS5 по заметкам. Колонка author_id индексируется
+# как обычный токен: запрос пересекает список заметок автора со списками
+# слов прямо в индексе и не читает строк других пользователей. Миграции
+# 0003 и 0005 создают индекс по своим замороженным копиям этого DDL; правка
+# здесь требует новой миграции (TestSearchSchema проверяет, что копии
+# совпадают).
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS notes_search USING fts5("
+    "author_id, title, text, content='notes_note', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+)
+# Триггеры поддерживают индекс и при bulk_create/update(), минуя сигналы.
+# Перестройка notes_note миграциями SQLite удаляет триггеры: такая миграция
+# должна создать их заново, иначе упадёт TestSearchSchema. В уже
+# существующей базе их возвращает команда rebuild_notes_search.
+CREATE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS notes_search_insert "
+    "AFTER INSERT ON notes_note BEGIN "
+    "INSERT INTO notes_search(rowid, author_id, title, text) "
+    "VALUES (new.id, new.author_id, new.title, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS notes_search_delete "
+    "AFTER DELETE ON notes_note BEGIN "
+    "INSERT INTO notes_search(notes_search, rowid, author_id, title, text) "
+    "VALUES ('delete', old.id, old.author_id, old.title, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS notes_search_update "
+    "AFTER UPDATE OF author_id, title, text ON notes_note BEGIN "
+    "INSERT INTO notes_search(notes_search, rowid, author_id, title, text) "
+    "VALUES ('delete', old.id, old.author_id, old.title, old.text); "
+    "INSERT INTO notes_search(rowid, author_id, title, text) "
+    "VALUES (new.id, new.author_id, new.title, new.text); END",
+)
+REBUILD = "INSERT INTO notes_search(notes_search) VALUES ('rebuild')"
+DROP = (
+    'DROP TRIGGER IF EXISTS notes_search_insert',
+    'DROP TRIGGER IF EXISTS notes_search_delete',
+    'DROP TRIGGER IF EXISTS notes_search_update',
+    'DROP TABLE IF EXISTS notes_search',
+)
+
+# Ранжируются все совпадения автора: токен author_id в запросе сужает
+# поиск до его заметок прямо в индексе, так что bm25 считается только по
+# ним. Совпадение в заголовке весит больше, чем в тексте. Условие на
+# author_id в notes_note — страховка поверх токена в индексе.
+SEARCH = (
+    'SELECT notes_note.id, notes_note.title, notes_note.slug '
+    'FROM ('
+    'SELECT rowid, bm25(notes_search, 0.0, 10.0, 1.0) AS score '
+    'FROM notes_search WHERE notes_search MATCH %s '
+    'ORDER BY score, rowid DESC LIMIT %s'
+    ') AS best '
+    'JOIN notes_note ON notes_note.id = best.rowid '
+    'WHERE notes_note.author_id = %s '
+    'ORDER BY best.score, notes_note.id DESC'
+)
+
+
+def install(cursor):
+    """Создаёт индекс и триггеры, затем заполняет индекс из notes_note."""
+    cursor.execute(CREATE_TABLE)
+    for statement in CREATE_TRIGGERS:
+        cursor.execute(statement)
+    cursor.execute(REBUILD)
+
+
+def build_match(query, author_id):
+    """Превращает ввод пользователя в запрос FTS5 по его заметкам.
+
+    Слова берутся в кавычки, поэтому синтаксис FTS5 во вводе не ломает
+    запрос. Последнее слово ищется по префиксу: так работает поиск по мере
+    набора текста.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = ' '.join(f'"{word}"' for word in words)
+    return f'author_id : "{int(author_id)}" AND {{title text}} : ({terms}*)'
+
+
+def search_notes(author, query, limit, using=None):
+    """Заметки автора по запросу, от самых релевантных.
+
+    using — алиас базы с заметками автора, если он известен.
+    """
+    match = build_match(query, author.pk)
+    if match is None:
+        return []
+    notes = author_notes(author.pk, using)
+    if connections[notes.db].vendor != 'sqlite':
+        return list(notes.filter(
+            Q(title__icontains=query) | Q(text__icontains=query),
+        ).only('id', 'title', 'slug')[:limit])
+    return list(Note.objects.using(notes.db).raw(
+        SEARCH, [match, limit, author.pk]
+    ))
@@ -0,0 +1,136 @@
+"""Шардирование заметок по авторам.
+
+С settings.NOTES_SHARDS — списком алиасов баз — заметки автора и версия
+его заметок живут в одном шарде: по умолчанию crc32(id автора) % N, а для
+авторов, перенесённых командой rebalance_notes, — в шарде из таблицы
+NoteShard. Пользователи, назначения и реестр slug (NoteSlug) остаются в
+default. Без NOTES_SHARDS всё лежит в default, как раньше.
+
+Маршрутизатор выбирает шард по экземпляру: заметке, её автору или
+пользователю связанного менеджера (user.note_set). Запросы без экземпляра
+строит author_notes() — сразу в базе автора.
+"""
+from zlib import crc32
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Note, NoteShard, NoteSlug, NotesVersion
+
+SHARDED_MODELS = (Note, NotesVersion)
+
+
+def hashed_shard(author_id):
+    """Шард автора по умолчанию: устойчивый хэш его id."""
+    shards = settings.NOTES_SHARDS
+    return shards[crc32(str(author_id).encode()) % len(shards)]
+
+
+def notes_db(author_id):
+    """Алиас базы с заметками автора; None — без шардирования.
+
+    Назначение читается из default, а не с реплики: после переноса автора
+    отстающая реплика указала бы на прежний шард.
+    """
+    if not settings.NOTES_SHARDS:
+        return None
+    assigned = NoteShard.objects.using(DEFAULT_DB_ALIAS).filter(
+        author_id=author_id
+    ).values_list('database', flat=True).first()
+    return assigned or hashed_shard(author_id)
+
+
+def author_notes(author_id, using=None):
+    """Заметки автора в его базе; using — уже известный алиас этой базы."""
+    return Note.objects.using(using or notes_db(author_id)).filter(
+        author_id=author_id
+    )
+
+
+class NoteShardRouter:
+    """Заметки и их версии — в шард автора, прочее — следующим роутерам."""
+
+    def db_for_read(self, model, **hints):
+        return self.shard(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self.shard(model, hints.get('instance'))
+
+    @staticmethod
+    def shard(model, instance):
+        if (
+            not settings.NOTES_SHARDS
+            or model not in SHARDED_MODELS
+            or instance is None
+        ):
+            return None
+        if isinstance(instance, SHARDED_MODELS):
+            return instance._state.db or notes_db(instance.author_id)
+        # Связанный менеджер пользователя или присваивание автора.
+        return notes_db(instance.pk)
+
+
+def assign_shard(author_id, database):
+    """Закрепляет автора за шардом; шард по хэшу в таблице не хранится."""
+    if database == hashed_shard(author_id):
+        NoteShard.objects.filter(author_id=author_id).delete()
+    else:
+        NoteShard.objects.update_or_create(
+            author_id=author_id, defaults={'database': database}
+        )
+
+
+def move_author(author_id, target, batch_size=1_000):
+    """Переносит заметки автора в шард target из default и других шардов.
+
+    Источник на время переноса закрыт для записи (BEGIN IMMEDIATE).
+    Заметки сначала копируются в target, затем переключаются назначение
+    и реестр slug, и только потом копии удаляются из источника: читатель
+    всё время видит заметки целиком в одной из баз. Id в target новые —
+    адреса заметок держатся на slug. Запускать, пока автор не пишет:
+    правка, начатая до переключения, закончится в прежней базе.
+    Возвращает число перенесённых заметок.
+    """
+    moved = 0
+    for source in (DEFAULT_DB_ALIAS, *settings.NOTES_SHARDS):
+        if source != target:
+            moved += move_notes(author_id, source, target, batch_size)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        assign_shard(author_id, target)
+    # Id заметок сменились: прежние ETag и курсоры недействительны.
+    NotesVersion.bump(author_id, using=target)
+    return moved
+
+
+def move_notes(author_id, source, target, batch_size):
+    with transaction.atomic(using=source):
+        notes = list(Note.objects.using(source).filter(
+            author_id=author_id
+        ).order_by('id'))
+        if not notes:
+            return 0
+        with transaction.atomic(using=target):
+            for note in notes:
+                note.pk = None
+            Note.objects.using(target).bulk_create(notes, batch_size)
+        # bulk_create в SQLite не возвращает id: их находят по slug.
+        moved = {note.slug for note in notes}
+        new_ids = {
+            slug: note_id
+            for slug, note_id in Note.objects.using(target).filter(
+                author_id=author_id
+            ).values_list('slug', 'id')
+            if slug in moved
+        }
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            assign_shard(author_id, target)
+            # post_delete освобождает в реестре slug под прежними id.
+            Note.objects.using(source).filter(author_id=author_id).delete()
+            NoteSlug.objects.bulk_create((
+                NoteSlug(slug=slug, author_id=author_id, note_id=note_id)
+                for slug, note_id in new_ids.items()
+            ), batch_size)
+        NotesVersion.objects.using(source).filter(
+            author_id=author_id
+        ).delete()
+    return len(notes)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Note, NoteSlug, NotesVersion
+from .shards import author_notes
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def bump_notes_version(sender, instance, **kwargs):
+    """Любое изменение заметки меняет версию заметок её автора."""
+    NotesVersion.bump(instance.author_id, using=instance._state.db)
+
+
+@receiver(post_delete, sender=Note)
+def release_slug(sender, instance, **kwargs):
+    """При шардировании освобождает slug удалённой заметки в реестре."""
+    if settings.NOTES_SHARDS:
+        NoteSlug.objects.filter(
+            slug=instance.slug, author_id=instance.author_id,
+            note_id=instance.pk
+        ).delete()
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_sharded_notes(sender, instance, **kwargs):
+    """Каскад из default не дотянется до шарда: заметки удаляются здесь."""
+    if settings.NOTES_SHARDS:
+        notes = author_notes(instance.pk)
+        notes.delete()
+        NotesVersion.objects.using(notes.db).filter(
+            author_id=instance.pk
+        ).delete()
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.db.models import Case, IntegerField, Max, Value, When
+from django.db.models.functions import Cast, Substr
+from pytils.translit import slugify
+
+FALLBACK_SLUG = 'note'
+
+
+def find_taken(queryset, base):
+    """Занят ли сам base и наибольший числовой суффикс среди base-N.
+
+    Оба значения считаются одним запросом-диапазоном [base, base.) по
+    уникальному индексу slug: из символов slug меньше точки только дефис.
+    В SQLite агрегат считается в базе: CAST('12x' AS INTEGER) даёт 12,
+    поэтому за максимумом гарантированно нет занятых base-N.
+    """
+    candidates = queryset.filter(slug__gte=base, slug__lt=f'{base}.')
+    if connection.vendor == 'sqlite':
+        found = candidates.aggregate(
+            base_taken=Max(Case(
+                When(slug=base, then=Value(1)), output_field=IntegerField()
+            )),
+            suffix=Max(Cast(Substr('slug', len(base) + 2), IntegerField())),
+        )
+        return bool(found['base_taken']), found['suffix'] or 0
+    prefix = f'{base}-'
+    base_taken, suffix = False, 0
+    for slug in candidates.values_list('slug', flat=True).iterator():
+        if slug == base:
+            base_taken = True
+        elif slug[len(prefix):].isdigit():
+            suffix = max(suffix, int(slug[len(prefix):]))
+    return base_taken, suffix
+
+
+def allocate_slug(queryset, title, max_length, exclude_pk=None):
+    """Подбирает свободный slug для заголовка: base, затем base-N.
+
+    N идёт за наибольшим занятым числовым суффиксом. Если с суффиксом slug
+    не помещается в max_length, основа укорачивается, а суффикс остаётся
+    обязательным.
+    """
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    base = slugify(title)[:max_length].strip('-') or FALLBACK_SLUG
+    suffixed = False
+    while True:
+        base_taken, suffix = find_taken(queryset, base)
+        if not base_taken and not suffixed:
+            return base
+        slug = f'{base}-{max(suffix, 1) + 1}'
+        if len(slug) <= max_length:
+            return slug
+        base = base[:-1].rstrip('-') or FALLBACK_SLUG
+        suffixed = True
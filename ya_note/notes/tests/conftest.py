@@ -1,15 +1,31 @@
 from http import HTTPStatus
 
+import pytest
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
-from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from django.test import Client, TestCase
 
 from notes.models import Note
+from yacommon.querybudget import is_transaction_control
+from yacommon.testdb import setup_test_databases
 
 User = get_user_model()
 
 
+@pytest.fixture(scope='session')
+def django_db_setup(django_test_environment, django_db_blocker):
+    """Тестовые базы — копии снимка после миграций (yacommon/testdb.py)."""
+    with django_db_blocker.unblock():
+        teardown = setup_test_databases()
+    yield
+    with django_db_blocker.unblock():
+        teardown()
+
+
 class BaseClass(TestCase):
 
     @classmethod
@@ -41,3 +57,23 @@ class BaseClass(TestCase):
         cls.http_found = HTTPStatus.FOUND
         cls.delete_url_redirect = f'{cls.url_login}?next={cls.url_delete}'
         cls.edit_url_redirect = f'{cls.url_login}?next={cls.url_edit}'
+
+    def assert_query_budget(self, client, url, method='get', data=None):
+        """Запрос к URL укладывается в бюджет из settings.QUERY_BUDGETS.
+
+        Возвращает число выполненных запросов, чтобы сравнивать его на
+        данных разного объёма.
+        """
+        view_name = resolve(url).view_name
+        budget = settings.QUERY_BUDGETS[view_name]
+        with CaptureQueriesContext(connection) as context:
+            getattr(client, method)(url, data)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not is_transaction_control(query['sql'])
+        ]
+        self.assertLessEqual(len(queries), budget, (
+            f'{method.upper()} {url} ({view_name}): {len(queries)} '
+            f'запросов при бюджете {budget}:\n' + '\n'.join(queries)
+        ))
+        return len(queries)
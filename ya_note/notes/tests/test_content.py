@@ -1,6 +1,13 @@
+from http import HTTPStatus
+
 from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
+from notes import search
 from notes.forms import NoteForm
+from notes.models import Note
 from notes.tests.conftest import BaseClass
 
 User = get_user_model()
@@ -33,3 +40,177 @@ class TestHomePage(BaseClass):
             # Проверяем истинность утверждения "заметка есть в списке":
             object_list = response.context['object_list']
             assert (self.note in object_list) is args
+
+
+@override_settings(NOTES_COUNT_ON_LIST_PAGE=3)
+class TestNotesListPages(BaseClass):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст',
+                 slug=f'n-{author.pk}-{index}', author=author)
+            for index in range(7)
+            for author in (cls.author, cls.reader)
+        )
+
+    def get_page(self, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        response = self.author_client.get(self.url_list, params)
+        self.assertEqual(response.status_code, self.http_ok)
+        return response.context['page'], response.context['object_list']
+
+    def test_pages_cover_author_notes_once(self):
+        """Страницы по курсору проходят все заметки автора по порядку."""
+        expected = list(
+            Note.objects.filter(author=self.author)
+            .order_by('id').values_list('id', flat=True)
+        )
+        seen, cursor = [], None
+        while True:
+            page, object_list = self.get_page(cursor)
+            self.assertLessEqual(len(object_list), 3)
+            seen.extend(note.id for note in object_list)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        page, object_list = self.get_page(page.previous_cursor)
+        self.assertEqual(
+            [note.id for note in object_list], expected[-5:-2]
+        )
+
+    def test_list_loads_rendered_fields_only(self):
+        """Текст заметок для списка не загружается."""
+        _, object_list = self.get_page()
+        for note in object_list:
+            self.assertEqual(note.get_deferred_fields(), {'text'})
+
+    def test_bad_cursor_is_not_found(self):
+        """Испорченный курсор даёт 404."""
+        response = self.author_client.get(self.url_list, {'cursor': 'xyz'})
+        self.assertEqual(response.status_code, self.http_not_found)
+
+
+class TestConditionalGet(BaseClass):
+
+    def validator_queries(self, url, etag):
+        """Запросы условного GET, кроме загрузки сессии и пользователя."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, [
+            query['sql'] for query in context.captured_queries
+            if 'django_session' not in query['sql']
+            and 'auth_user' not in query['sql']
+        ]
+
+    def test_not_modified_costs_one_query(self):
+        """Совпавший ETag даёт 304 одним запросом и без шаблонов."""
+        for url in (self.url_list, self.url_detail):
+            with self.subTest(url=url):
+                etag = self.author_client.get(url)['ETag']
+                response, queries = self.validator_queries(url, etag)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertLessEqual(len(queries), 1)
+                self.assertFalse(response.templates)
+
+    def test_note_change_changes_etag(self):
+        """Изменение заметки автора делает старый ETag недействительным."""
+        etag = self.author_client.get(self.url_list)['ETag']
+        Note.objects.create(title='Ещё одна', text='Текст', author=self.author)
+        response, _ = self.validator_queries(self.url_list, etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_user(self):
+        """Чужой ETag не даёт пользователю ответа 304."""
+        etag = self.author_client.get(self.url_list)['ETag']
+        response = self.reader_client.get(
+            self.url_list, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class TestNotesSearch(BaseClass):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Note.objects.bulk_create((
+            Note(title='Молоко и хлеб', text='Список покупок',
+                 slug='pokupki', author=cls.author),
+            Note(title='Рецепт', text='Купить молоко для блинов',
+                 slug='recept', author=cls.author),
+            Note(title='Молоко соседа', text='Чужая заметка',
+                 slug='chuzhaya', author=cls.reader),
+        ))
+
+    def found_slugs(self, query, client=None):
+        response = (client or self.author_client).get(
+            self.url_list, {'q': query}
+        )
+        return [note.slug for note in response.context['object_list']]
+
+    def test_search_is_scoped_by_author(self):
+        """Поиск находит только заметки пользователя, заголовок — выше."""
+        self.assertEqual(self.found_slugs('молоко'), ['pokupki', 'recept'])
+        other_client = Client()
+        other_client.force_login(self.reader)
+        self.assertEqual(
+            self.found_slugs('молоко', other_client), ['chuzhaya']
+        )
+
+    def test_search_ranks_old_notes_of_large_author(self):
+        """Старая заметка с совпадением в заголовке не теряется за новыми."""
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Молоко упомянуто вскользь',
+                 slug=f'zametka-{index}', author=self.author)
+            for index in range(600)
+        )
+        self.assertEqual(self.found_slugs('молоко')[0], 'pokupki')
+
+    def test_search_as_you_type(self):
+        """Последнее слово запроса ищется по префиксу."""
+        self.assertEqual(self.found_slugs('бли'), ['recept'])
+        self.assertEqual(self.found_slugs('молоко х'), ['pokupki'])
+        self.assertEqual(self.found_slugs('спис'), ['pokupki'])
+
+    def test_search_survives_fts_syntax(self):
+        """Синтаксис FTS5 во вводе не приводит к ошибке."""
+        for query in ('AND', '"(*', 'author_id:1', '-'):
+            with self.subTest(query=query):
+                response = self.author_client.get(self.url_list, {'q': query})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке заметки."""
+        Note.objects.filter(slug='recept').update(text='Сварить кашу')
+        self.assertEqual(self.found_slugs('блинов'), [])
+        self.assertEqual(self.found_slugs('каш'), ['recept'])
+
+
+class TestSearchSchema(TestCase):
+    databases = {'default', 'notes_0', 'notes_1'}
+
+    def test_migrations_leave_search_index_and_triggers(self):
+        """После migrate индекс и триггеры совпадают с notes/search.py.
+
+        DDL миграций 0003 и 0005 — замороженная копия, а перестройка
+        notes_note удаляет триггеры: расхождение ловится здесь, в default
+        и в каждом шарде.
+        """
+        expected = {
+            statement.replace(' IF NOT EXISTS', '')
+            for statement in (search.CREATE_TABLE, *search.CREATE_TRIGGERS)
+        }
+        for alias in sorted(self.databases):
+            with self.subTest(database=alias):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        "SELECT sql FROM sqlite_master "
+                        "WHERE type = 'trigger' AND tbl_name = 'notes_note' "
+                        "OR name = 'notes_search'"
+                    )
+                    schema = {sql for sql, in cursor.fetchall()}
+                self.assertEqual(schema, expected)
@@ -1,11 +1,31 @@
+import csv
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import sleep, time
+from unittest import mock
+
 from pytils.translit import slugify
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
 from django.urls import reverse
 
-from notes.forms import WARNING
-from notes.models import Note
+from notes.forms import WARNING, NoteForm
+from notes.management.commands.seed_notes import SlugSequence
+from notes.models import Note, NoteShard, NoteSlug
+from notes.shards import hashed_shard
+from yacommon.metrics import RESPONSES, Registry, registry
+from yacommon.replicas import current_pin
 from .conftest import BaseClass
 
 User = get_user_model()
@@ -122,3 +142,463 @@ class TestCommentCreation(BaseClass, TestCase):
         self.reader_client.post(self.url_edit)
         # Проверяем наличие записи
         assert Note.objects.count() == 1
+
+
+class TestSlugAllocation(BaseClass, TestCase):
+
+    def create(self, title, slug=''):
+        return self.author_client.post(self.url_add, data={
+            'title': title, 'text': 'Текст', 'slug': slug
+        })
+
+    def test_same_titles_get_numeric_suffixes(self):
+        """Одинаковые заголовки получают slug base, base-2, base-3."""
+        base = slugify('Название заметки')
+        for _ in range(3):
+            self.assertRedirects(
+                self.create('Название заметки'), self.url_success
+            )
+        assert set(
+            Note.objects.filter(title='Название заметки')
+            .values_list('slug', flat=True)
+        ) == {base, f'{base}-2', f'{base}-3'}
+
+    def test_suffix_follows_largest_number(self):
+        """Суффикс берётся за наибольшим числовым, прочие не мешают."""
+        Note.objects.create(title='Т', text='Т', slug='plan-7',
+                            author=self.author)
+        Note.objects.create(title='Т', text='Т', slug='plan-b',
+                            author=self.author)
+        Note.objects.create(title='Т', text='Т', slug='plan',
+                            author=self.author)
+        self.create('План')
+        assert Note.objects.filter(slug='plan-8').exists()
+
+    def test_suffix_fits_max_length(self):
+        """С суффиксом slug не длиннее поля: основа укорачивается."""
+        title = 'a' * 100
+        self.create(title)
+        self.create(title)
+        slugs = set(
+            Note.objects.filter(title=title).values_list('slug', flat=True)
+        )
+        assert slugs == {'a' * 100, 'a' * 98 + '-2'}
+
+    def test_allocation_costs_one_query(self):
+        """Свободный slug ищется одним запросом при любом числе совпадений."""
+        Note.objects.bulk_create(
+            Note(title='Т', text='Т', slug=f'same-{index}',
+                 author=self.author)
+            for index in range(2, 50)
+        )
+        Note.objects.create(title='Т', text='Т', slug='same',
+                            author=self.author)
+        note = Note(title='Same', text='Т', author=self.author)
+        with self.assertNumQueries(5):
+            # SAVEPOINT, поиск slug, INSERT, RELEASE SAVEPOINT и версия
+            # заметок автора из сигнала.
+            note.save()
+        assert note.slug == 'same-50'
+
+    def test_explicit_slug_race_is_form_error(self):
+        """Slug, занятый после проверки формы, — ошибка формы."""
+        with mock.patch.multiple(
+            NoteForm,
+            clean_slug=lambda form: form.cleaned_data['slug'],
+            validate_unique=lambda form: None,
+        ):
+            response = self.create('Заголовок', self.note.slug)
+        self.assertFormError(response, 'form', 'slug',
+                             errors=(self.note.slug + WARNING))
+        assert Note.objects.filter(slug=self.note.slug).count() == 1
+
+
+class TestConcurrentSlugs(TransactionTestCase):
+    THREADS = 8
+    NOTES_PER_THREAD = 5
+
+    def create_notes(self, author):
+        """Создаёт заметки с одинаковым заголовком из отдельного потока."""
+        try:
+            for _ in range(self.NOTES_PER_THREAD):
+                while True:
+                    try:
+                        Note.objects.create(title='Название заметки',
+                                            text='Текст', author=author)
+                        break
+                    except OperationalError:
+                        # Общая in-memory база SQLite блокирует таблицу
+                        # на время чужой записи.
+                        sleep(0.001)
+        finally:
+            connection.close()
+
+    def test_parallel_creates_get_unique_slugs(self):
+        """Параллельные создания не падают и получают разные slug."""
+        author = User.objects.create(username='Автор')
+        with ThreadPoolExecutor(self.THREADS) as executor:
+            futures = [
+                executor.submit(self.create_notes, author)
+                for _ in range(self.THREADS)
+            ]
+        for future in futures:
+            future.result()
+        total = self.THREADS * self.NOTES_PER_THREAD
+        base = slugify('Название заметки')
+        assert set(Note.objects.values_list('slug', flat=True)) == {
+            base, *(f'{base}-{number}' for number in range(2, total + 1))
+        }
+
+
+@override_settings(SQLITE_BUSY_BACKOFF=0)
+class TestBusyRetry(TransactionTestCase):
+
+    def test_note_saved_once_after_busy_retry(self):
+        """Заметка, упёршаяся в занятую базу, сохраняется повтором."""
+        author = User.objects.create(username='Автор')
+        client = Client()
+        client.force_login(author)
+        save = Note.save
+
+        def busy_once(note, *args, **kwargs):
+            save(note, *args, **kwargs)
+            if not busy_once.raised:
+                busy_once.raised = True
+                raise OperationalError('database is locked')
+
+        busy_once.raised = False
+        with mock.patch.object(
+            Note, 'save', autospec=True, side_effect=busy_once
+        ):
+            response = client.post(
+                reverse('notes:add'), {'title': 'Заметка', 'text': 'Текст'}
+            )
+        self.assertRedirects(response, reverse('notes:success'))
+        self.assertEqual(Note.objects.filter(author=author).count(), 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class TestReadYourWrites(TransactionTestCase):
+    # Реплика — отдельная тестовая база, отстающая до вызова replicate().
+    databases = {'default', 'replica'}
+    note = {'title': 'Свежая заметка', 'text': 'Текст', 'slug': 'fresh'}
+
+    def setUp(self):
+        self.author = User.objects.create(username='Автор')
+        self.client.force_login(self.author)
+        # Записи выше закрепили чтение в контексте теста.
+        token = current_pin.set(None)
+        self.addCleanup(current_pin.reset, token)
+        self.replicate()
+
+    @staticmethod
+    def replicate():
+        """Реплика догоняет основную базу: копия всех данных целиком."""
+        for alias in ('default', 'replica'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(
+            connections['replica'].connection
+        )
+
+    def test_author_sees_new_note_while_replica_lags(self):
+        """Сразу после создания заметка видна автору в списке."""
+        self.client.post(reverse('notes:add'), data=self.note)
+        response = self.client.get(reverse('notes:list'))
+        self.assertContains(response, self.note['title'])
+
+    def test_new_note_hidden_after_pin_expires(self):
+        """Без закрепления список читается с отстающей реплики."""
+        self.client.post(reverse('notes:add'), data=self.note)
+        self.client.cookies[settings.DATABASE_PIN_COOKIE] = str(
+            time() - 1
+        )
+        response = self.client.get(reverse('notes:list'))
+        self.assertNotContains(response, self.note['title'])
+        self.replicate()
+        response = self.client.get(reverse('notes:list'))
+        self.assertContains(response, self.note['title'])
+
+
+@override_settings(NOTES_SHARDS=['notes_0', 'notes_1'])
+class TestSharding(TransactionTestCase):
+    databases = {'default', 'notes_0', 'notes_1'}
+
+    def setUp(self):
+        # По автору на каждый шард.
+        authors, number = {}, 0
+        while len(authors) < 2:
+            number += 1
+            user = User.objects.create(username=f'Автор {number}')
+            authors.setdefault(hashed_shard(user.pk), user)
+        self.first, self.second = authors['notes_0'], authors['notes_1']
+
+    @staticmethod
+    def client_for(user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def add(self, user, **data):
+        return self.client_for(user).post(reverse('notes:add'), data={
+            'title': 'Заголовок', 'text': 'Текст шардированной заметки',
+            **data,
+        })
+
+    def shard_slugs(self, database):
+        return set(Note.objects.using(database).values_list('slug', flat=True))
+
+    def test_notes_live_in_author_shard(self):
+        """Заметка ложится в шард автора и видна ему оттуда."""
+        self.add(self.first, slug='first')
+        self.assertEqual(self.shard_slugs('notes_0'), {'first'})
+        self.assertEqual(self.shard_slugs('notes_1'), set())
+        self.assertEqual(self.shard_slugs('default'), set())
+        client = self.client_for(self.first)
+        self.assertContains(client.get(reverse('notes:list')), 'first')
+        self.assertContains(
+            client.get(reverse('notes:list'), {'q': 'шардированной'}),
+            'first'
+        )
+        response = client.get(reverse('notes:detail', args=('first',)))
+        self.assertEqual(response.status_code, 200)
+
+    def test_slug_unique_across_shards(self):
+        """Slug, занятый в одном шарде, занят и для авторов другого."""
+        self.add(self.first, slug='shared')
+        self.add(self.first)
+        response = self.add(self.second, slug='shared')
+        self.assertFormError(
+            response, 'form', 'slug', errors='shared' + WARNING
+        )
+        self.add(self.second)
+        self.assertEqual(self.shard_slugs('notes_1'), {'zagolovok-2'})
+        self.client_for(self.first).post(
+            reverse('notes:delete', args=('shared',))
+        )
+        self.add(self.second, slug='shared')
+        self.assertEqual(
+            set(NoteSlug.objects.values_list('slug', 'author_id')),
+            {
+                ('zagolovok', self.first.pk),
+                ('zagolovok-2', self.second.pk),
+                ('shared', self.second.pk),
+            }
+        )
+
+    def test_rebalance_moves_author(self):
+        """Перенос автора: заметки, реестр и назначение — в новом шарде."""
+        self.add(self.first, slug='one')
+        self.add(self.first, slug='two')
+        call_command(
+            'rebalance_notes', self.first.username, 'notes_1',
+            stdout=StringIO()
+        )
+        self.assertEqual(self.shard_slugs('notes_0'), set())
+        self.assertEqual(
+            dict(NoteSlug.objects.values_list('slug', 'note_id')),
+            dict(Note.objects.using('notes_1').values_list('slug', 'id'))
+        )
+        self.assertTrue(NoteShard.objects.filter(
+            author=self.first, database='notes_1'
+        ).exists())
+        client = self.client_for(self.first)
+        response = client.post(reverse('notes:edit', args=('one',)), {
+            'title': 'Изменённая', 'text': 'Текст', 'slug': 'one',
+        })
+        self.assertRedirects(response, reverse('notes:success'))
+        self.assertEqual(
+            Note.objects.using('notes_1').get(slug='one').title, 'Изменённая'
+        )
+        call_command(
+            'rebalance_notes', self.first.username, 'notes_0',
+            stdout=StringIO()
+        )
+        self.assertEqual(self.shard_slugs('notes_0'), {'one', 'two'})
+        self.assertFalse(NoteShard.objects.exists())
+
+    def test_shard_notes_moves_notes_from_default(self):
+        """shard_notes раскладывает заметки из default по шардам."""
+        with override_settings(NOTES_SHARDS=[]):
+            for author in (self.first, self.second):
+                Note.objects.create(
+                    title='Заметка', text='Текст', author=author,
+                    slug=f'note-{author.pk}'
+                )
+        call_command('shard_notes', stdout=StringIO())
+        self.assertEqual(self.shard_slugs('default'), set())
+        self.assertEqual(
+            self.shard_slugs('notes_0'), {f'note-{self.first.pk}'}
+        )
+        self.assertEqual(
+            self.shard_slugs('notes_1'), {f'note-{self.second.pk}'}
+        )
+        self.assertEqual(NoteSlug.objects.count(), 2)
+
+    def test_deleted_author_notes_leave_shard(self):
+        self.add(self.second, slug='gone')
+        self.second.delete()
+        self.assertEqual(self.shard_slugs('notes_1'), set())
+        self.assertFalse(NoteSlug.objects.exists())
+
+
+class TestSeedNotes(BaseClass, TestCase):
+
+    def test_seed_notes_continues_slug_numbering(self):
+        """seed_notes продолжает нумерацию slug, уже занятых в базе."""
+        Note.objects.create(title='Название заметки', text='Текст',
+                            author=self.author)
+        Note.objects.create(title='Название заметки', text='Текст',
+                            author=self.author)
+        call_command(
+            'seed_notes', users=3, notes=50, collisions=1.0, batch_size=7,
+            stdout=StringIO()
+        )
+        slugs = list(Note.objects.values_list('slug', flat=True))
+        self.assertEqual(len(slugs), len(set(slugs)))
+        self.assertEqual(Note.objects.count(), 53)
+        note = Note.objects.create(title='Название заметки', text='Текст',
+                                   author=self.author)
+        self.assertNotIn(note.slug, slugs)
+
+    def test_seed_notes_keeps_slug_state_per_batch(self):
+        """Номера slug хранятся только для основ текущей пачки."""
+        sizes = []
+        load = SlugSequence.load
+        existing = Note.objects.count()
+
+        def recording_load(sequence, bases):
+            load(sequence, bases)
+            sizes.append(len(sequence.last))
+
+        with mock.patch.object(SlugSequence, 'load', recording_load):
+            call_command(
+                'seed_notes', users=3, notes=60, collisions=0.5,
+                batch_size=7, stdout=StringIO()
+            )
+        self.assertEqual(len(sizes), 9)
+        self.assertLessEqual(max(sizes), 7)
+        slugs = list(Note.objects.values_list('slug', flat=True))
+        self.assertEqual(len(slugs), existing + 60)
+        self.assertEqual(len(slugs), len(set(slugs)))
+
+
+class TestMetrics(BaseClass, TestCase):
+
+    def setUp(self):
+        # Счётчики процесса общие для всех тестов.
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, self.http_ok)
+        return dict(
+            line.rsplit(' ', 1)
+            for line in response.content.decode().splitlines()
+            if not line.startswith('#')
+        )
+
+    def test_metrics_per_view(self):
+        self.author_client.get(self.url_list)
+        self.author_client.post(self.url_add, data={
+            'title': 'Новая заметка', 'text': 'Текст'
+        })
+        samples = self.scrape()
+        view = 'view="notes:list"'
+        self.assertEqual(samples[
+            f'django_http_request_duration_seconds_count{{{view},'
+            'method="GET"}'
+        ], '1')
+        self.assertEqual(
+            samples[f'django_template_render_seconds_count{{{view}}}'], '1'
+        )
+        self.assertEqual(samples[
+            'django_http_responses_total'
+            '{view="notes:add",method="POST",status="302"}'
+        ], '1')
+        self.assertGreater(
+            float(samples['django_db_queries_sum{view="notes:add"}']), 0
+        )
+
+    def test_metrics_of_other_processes_are_merged(self):
+        other = Registry()
+        other.observe([(RESPONSES, ('notes:list', 'GET', '200'), 1)] * 2)
+        with TemporaryDirectory() as directory, override_settings(
+            METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=0
+        ):
+            other.flush(directory)
+            self.author_client.get(self.url_list)
+            samples = self.scrape()
+        self.assertEqual(samples[
+            'django_http_responses_total'
+            '{view="notes:list",method="GET",status="200"}'
+        ], '3')
+
+
+class TestProfiling(BaseClass, TestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        profile_dir = override_settings(PROFILE_DIR=self.directory)
+        profile_dir.enable()
+        self.addCleanup(profile_dir.disable)
+
+    def test_staff_profiles_request_and_report(self):
+        self.author.is_staff = True
+        self.author.save()
+        response = self.author_client.get(self.url_list, {'profile': 1})
+        capture = json.loads(
+            (self.directory / f'{response["X-Profile"]}.json').read_text()
+        )
+        self.assertEqual(capture['view'], 'notes:list')
+        self.assertTrue((self.directory / capture['profile']).exists())
+        out = StringIO()
+        call_command('profile_report', view='notes:list', stdout=out)
+        self.assertIn('notes:list: снимков 1 (staff 1)', out.getvalue())
+        self.assertIn('notes_note', out.getvalue())
+
+    def test_reader_cannot_profile(self):
+        response = self.reader_client.get(self.url_list, {'profile': 1})
+        self.assertNotIn('X-Profile', response)
+        self.assertFalse(list(self.directory.iterdir()))
+
+
+class TestExport(BaseClass, TestCase):
+
+    def test_author_exports_only_own_notes(self):
+        Note.objects.create(title='Чужая', text='Текст', author=self.reader)
+        response = self.author_client.get(
+            reverse('notes:export'), {'format': 'csv', 'gzip': '1'}
+        )
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="notes.csv.gz"'
+        )
+        content = gzip.decompress(b''.join(response.streaming_content))
+        rows = list(csv.reader(StringIO(content.decode())))
+        self.assertEqual(rows, [
+            ['id', 'title', 'text', 'slug'],
+            [str(self.note.pk), self.note.title, self.note.text,
+             self.note.slug],
+        ])
+
+    def test_export_command_writes_ndjson(self):
+        with TemporaryDirectory() as directory:
+            output = Path(directory) / 'notes.ndjson'
+            call_command(
+                'export_notes', self.author.username, output=str(output),
+                chunk_size=1, stdout=StringIO()
+            )
+            rows = [
+                json.loads(line)
+                for line in output.read_text().splitlines()
+            ]
+        self.assertEqual([row['slug'] for row in rows], [self.note.slug])
+
+    def test_unknown_format_is_bad_request(self):
+        response = self.author_client.get(
+            reverse('notes:export'), {'format': 'xml'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
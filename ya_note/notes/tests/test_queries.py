@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+
+from notes.models import Note
+from notes.tests.conftest import BaseClass
+
+User = get_user_model()
+
+# Объём данных растёт, а число запросов к каждому URL должно оставаться
+# прежним.
+DATASET_SIZES = (1, 10, 100)
+
+
+class TestQueryBudgets(BaseClass):
+
+    def grow_dataset(self, size):
+        """Добавляет автору size заметок с одинаковым заголовком."""
+        created = Note.objects.count()
+        Note.objects.bulk_create(
+            Note(title='Название заметки', text='Текст',
+                 slug=f'note-{created + index}', author=self.author)
+            for index in range(size)
+        )
+
+    def test_query_count_does_not_grow(self):
+        """Число запросов укладывается в бюджет и не растёт с объёмом."""
+        cases = (
+            (self.client, self.url_home, 'get', None),
+            (self.author_client, self.url_home, 'get', None),
+            (self.author_client, self.url_add, 'get', None),
+            (self.author_client, self.url_add, 'post',
+             {'title': 'Название заметки', 'text': 'Текст'}),
+            (self.author_client, self.url_edit, 'get', None),
+            (self.author_client, self.url_edit, 'post',
+             {'title': 'Заголовок', 'text': 'Новый текст',
+              'slug': self.note.slug}),
+            (self.author_client, self.url_detail, 'get', None),
+            (self.author_client, self.url_delete, 'get', None),
+            (self.author_client, self.url_list, 'get', None),
+            (self.author_client, self.url_list, 'get', {'q': 'заметки'}),
+            (self.author_client, self.url_success, 'get', None),
+        )
+        for client, url, method, data in cases:
+            with self.subTest(url=url, method=method, data=data):
+                counts = []
+                for size in DATASET_SIZES:
+                    self.grow_dataset(size)
+                    counts.append(
+                        self.assert_query_budget(client, url, method, data)
+                    )
+                self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_delete_within_budget(self):
+        """Удаление заметки укладывается в бюджет."""
+        self.assert_query_budget(self.author_client, self.url_delete, 'post')
+        self.assertFalse(Note.objects.filter(pk=self.note.pk).exists())
@@ -1,9 +1,20 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.http import HttpResponseBadRequest
 from django.urls import reverse_lazy
+from django.utils.functional import cached_property
 from django.views import generic
+from yacommon.export import FORMATS, export_response
+from yacommon.pagination import KeysetPaginator
+from yacommon.sqlite3 import retry_on_busy
 
-from .forms import NoteForm
+from .cache import ConditionalGetMixin
+from .exports import NOTE_COLUMNS, note_rows
+from .forms import WARNING, NoteForm
 from .models import Note
+from .search import search_notes
+from .shards import author_notes, notes_db
 
 
 class Home(generic.TemplateView):
@@ -21,27 +32,44 @@ class NoteBase(LoginRequiredMixin):
     model = Note
     success_url = reverse_lazy('notes:success')
 
+    @cached_property
+    def notes_database(self):
+        """Алиас базы с заметками пользователя (см. notes/shards.py)."""
+        return notes_db(self.request.user.pk)
+
     def get_queryset(self):
         """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
+        return author_notes(self.request.user.pk, self.notes_database)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormBase(NoteBase):
+    """Сохранение формы заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """Slug, занятый параллельным запросом после проверки формы, —
+        ошибка формы, а не ошибка сервера.
+        """
+        try:
+            with transaction.atomic(using=self.notes_database):
+                return super().form_valid(form)
+        except IntegrityError:
+            form.add_error('slug', form.instance.slug + WARNING)
+            return self.form_invalid(form)
+
+
+class NoteCreate(NoteFormBase, generic.CreateView):
+    """Добавление заметки."""
+
+    @retry_on_busy(using=lambda view, form: view.notes_database)
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteFormBase, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -49,11 +77,57 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+class NotesList(NoteBase, ConditionalGetMixin, generic.ListView):
+    """Список всех заметок пользователя с навигацией по курсору."""
     template_name = 'notes/list.html'
+    ordering = ('author_id', 'id')
+    page = None
 
-
-class NoteDetail(NoteBase, generic.DetailView):
+    def get_queryset(self):
+        """С параметром q — поиск по заметкам пользователя.
+
+        Без него — одна страница по ключу (author_id, id) и только поля,
+        которые выводит шаблон.
+        """
+        query = self.request.GET.get('q')
+        if query:
+            return search_notes(
+                self.request.user, query, settings.NOTES_SEARCH_RESULTS,
+                self.notes_database
+            )
+        paginator = KeysetPaginator(
+            super().get_queryset().only('id', 'slug', 'title', 'author'),
+            self.get_ordering(),
+            settings.NOTES_COUNT_ON_LIST_PAGE
+        )
+        self.page = paginator.get_page(self.request.GET.get('cursor'))
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        context['page'] = self.page
+        return context
+
+
+class NoteDetail(NoteBase, ConditionalGetMixin, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class NoteExport(LoginRequiredMixin, generic.View):
+    """Потоковая выгрузка всех заметок пользователя.
+
+    Формат — ?format=ndjson (по умолчанию) или csv, ?gzip=1 сжимает файл.
+    """
+
+    def get(self, request):
+        fmt = request.GET.get('format', 'ndjson')
+        if fmt not in FORMATS:
+            return HttpResponseBadRequest(
+                f'Формат — один из: {", ".join(FORMATS)}.'
+            )
+        return export_response(
+            note_rows(request.user.pk), NOTE_COLUMNS, 'notes', fmt,
+            request.GET.get('gzip') == '1'
+        )
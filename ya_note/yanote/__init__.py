@@ -0,0 +1,12 @@
+"""Проект YaNote.
+
+Код, общий с YaNews, лежит в пакете yacommon в корне репозитория. Корень
+добавляется в путь импорта здесь: пакет проекта импортируется раньше
+настроек и любой точки входа (manage.py, wsgi, asgi, pytest).
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = str(Path(__file__).resolve().parent.parent.parent)
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
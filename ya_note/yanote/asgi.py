@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from yacommon.export import StreamingASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
 
-application = get_asgi_application()
+# Как get_asgi_application(), но тело потоковых ответов (выгрузок)
+# собирается в пуле потоков, а не в цикле событий.
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
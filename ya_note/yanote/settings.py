@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -18,15 +19,20 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'notes.apps.NotesConfig'
+    'notes.apps.NotesConfig',
+    'yacommon.apps.YacommonConfig',
 ]
 
 MIDDLEWARE = [
+    'yacommon.metrics.MetricsMiddleware',
+    'yacommon.querybudget.QueryBudgetMiddleware',
+    'yacommon.replicas.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'yacommon.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -54,11 +60,75 @@ WSGI_APPLICATION = 'yanote.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yacommon.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переживает запрос, а не открывается заново на каждый.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            # Сколько секунд ждать чужую запись до «database is locked».
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                # Читатели не ждут писателя, писатель — читателей.
+                'journal_mode': 'WAL',
+                # В WAL достаточно для целостности; теряются лишь последние
+                # транзакции при отключении питания.
+                'synchronous': 'NORMAL',
+                'cache_size': -20_000,  # КиБ, то есть около 20 МБ.
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
     }
 }
 
+# Реплика для чтения: локально — копия файла основной базы, см.
+# yacommon/replicas.py. Чтение уходит на реплики, только если их алиасы
+# перечислены в DATABASE_REPLICAS (переменная окружения, через запятую).
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': BASE_DIR / 'db.replica.sqlite3',
+}
+
+# Шарды заметок (notes/shards.py): локально — отдельные файлы SQLite, их
+# схему создаёт migrate --database notes_N. Заметки раскладываются по
+# шардам, только если их алиасы перечислены в NOTES_SHARDS (переменная
+# окружения, через запятую); порядок алиасов задаёт хэширование.
+for number in range(2):
+    DATABASES[f'notes_{number}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db.notes_{number}.sqlite3',
+    }
+
+NOTES_SHARDS = [
+    alias for alias in os.environ.get('NOTES_SHARDS', '').split(',')
+    if alias
+]
+
+DATABASE_ROUTERS = [
+    'notes.shards.NoteShardRouter',
+    'yacommon.replicas.PrimaryReplicaRouter',
+]
+DATABASE_REPLICAS = [
+    alias for alias in os.environ.get('DATABASE_REPLICAS', '').split(',')
+    if alias
+]
+# Сколько секунд после записи клиент читает из основной базы, и cookie,
+# в которой это хранится.
+DATABASE_PIN_SECONDS = 10
+DATABASE_PIN_COOKIE = 'pin_primary'
+
+# Повторы записи при занятой базе (retry_on_busy): сколько раз и с какой
+# первой паузой в секундах; пауза удваивается.
+SQLITE_BUSY_RETRIES = 3
+SQLITE_BUSY_BACKOFF = 0.05
+
+# Каталог снимков тестовых баз после миграций (yacommon/testdb.py). Пустая
+# переменная окружения — миграции в каждой сессии pytest, как в Django.
+TEST_DB_TEMPLATE_DIR = os.environ.get(
+    'TEST_DB_TEMPLATE_DIR', str(BASE_DIR / '.testdb')
+)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +157,43 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_LIST_PAGE = 50
+
+NOTES_SEARCH_RESULTS = 50
+
+# Наибольшее число SQL-запросов на запрос к URL, вместе с загрузкой сессии
+# и пользователя. Превышение пишет в лог yacommon.querybudget, а тесты
+# notes/tests/test_queries.py проверяют бюджеты на данных разного объёма.
+QUERY_BUDGETS = {
+    'notes:home': 2,
+    'notes:add': 6,
+    'notes:edit': 7,
+    'notes:detail': 4,
+    'notes:delete': 5,
+    'notes:list': 4,
+    'notes:success': 2,
+}
+
+# Отдавать ли число и время SQL-запросов в заголовке Server-Timing.
+QUERY_STATS_HEADER = DEBUG
+
+# Метрики Prometheus на /metrics (yacommon/metrics.py). Процессы
+# preforked-сервера сохраняют свои счётчики в общий каталог METRICS_DIR
+# не чаще раза в METRICS_FLUSH_INTERVAL секунд, и /metrics складывает их;
+# без каталога /metrics показывает только свой процесс.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Снимки профиля и SQL (yacommon/profiling.py): параметр профиля по
+# требованию сотрудника, доля профилируемых запросов, порог медленного
+# запроса в секундах (None — не ловить) и каталог, где хранятся
+# PROFILE_KEEP последних снимков. Сводка — manage.py profile_report.
+PROFILE_PARAM = 'profile'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SLOW_SECONDS = (
+    float(os.environ['PROFILE_SLOW_SECONDS'])
+    if os.environ.get('PROFILE_SLOW_SECONDS') else None
+)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles')
+PROFILE_KEEP = 200
@@ -0,0 +1,8 @@
+"""Код, общий для проектов ya_news и ya_note.
+
+Проекты подключают корень репозитория к пути импорта в своих пакетах
+yanews и yanote, так что модули отсюда импортируются как yacommon.*.
+Модули не знают, какой из проектов их запустил: всё своё проект задаёт
+настройками. Пакет подключён к обоим проектам и как приложение Django —
+ради общих команд manage.py (profile_report).
+"""
@@ -0,0 +1,72 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yacommon.profiling import (
+    hottest_functions, hottest_queries, load_captures,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка по снимкам ProfilingMiddleware: самые дорогие функции и '
+        'SQL-запросы по каждому имени URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=None,
+            help='Каталог снимков; по умолчанию settings.PROFILE_DIR.'
+        )
+        parser.add_argument('--view', help='Только это имя URL.')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--sort', choices=('tottime', 'cumtime'), default='tottime',
+            help='Порядок функций: собственное или полное время.'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.PROFILE_DIR
+        captures = load_captures(directory, options['view'])
+        if not captures:
+            raise CommandError(f'В {directory} нет снимков.')
+        limit = options['limit']
+        for view, items in sorted(captures.items()):
+            self.write_view(view, items, limit, options['sort'])
+
+    def write_view(self, view, items, limit, sort):
+        durations = [capture['ms'] for capture, _ in items]
+        reasons = ', '.join(
+            f'{reason} {count}' for reason, count in sorted(
+                Counter(capture['reason'] for capture, _ in items).items()
+            )
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{view}: снимков {len(items)} ({reasons}), '
+            f'среднее {sum(durations) / len(durations):.1f} мс, '
+            f'максимум {max(durations):.1f} мс'
+        ))
+        profiles = [
+            path.with_name(capture['profile']) for capture, path in items
+            if capture['profile']
+            and path.with_name(capture['profile']).exists()
+        ]
+        if profiles:
+            self.stdout.write(
+                f'  Функции по {sort}, мс (профилей: {len(profiles)}):'
+            )
+            for tottime, cumtime, calls, function in hottest_functions(
+                profiles, limit, sort
+            ):
+                self.stdout.write(
+                    f'  {tottime:9.2f} {cumtime:9.2f} {calls:7d}  {function}'
+                )
+        queries = hottest_queries([capture for capture, _ in items], limit)
+        if queries:
+            self.stdout.write('  SQL, всего мс и раз:')
+            for duration, count, sql, source in queries:
+                self.stdout.write(
+                    f'  {duration:9.2f} {count:7d}  {sql[:100]}\n'
+                    f'  {"":17}  из {source}'
+                )
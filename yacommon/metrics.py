@@ -0,0 +1,308 @@
+"""Метрики в формате Prometheus: время ответа, SQL, шаблоны, размер.
+
+MetricsMiddleware стоит в MIDDLEWARE первым и на каждый запрос
+записывает по имени URL гистограммы времени ответа, числа и времени
+SQL-запросов (их считает QueryBudgetMiddleware), времени рендера шаблона
+и размера ответа, а также счётчик ответов по кодам. Счётчики живут в
+памяти процесса; metrics_view отдаёт их на /metrics.
+
+Процессы preforked-сервера памяти не делят. С settings.METRICS_DIR
+каждый процесс не чаще раза в METRICS_FLUSH_INTERVAL секунд сохраняет
+свои счётчики в общий каталог, а /metrics складывает файлы всех
+процессов, включая завершившиеся: счётчики накопительные. Каталог
+очищают при перезапуске сервера:
+
+    rm -rf /tmp/metrics && mkdir /tmp/metrics
+    METRICS_DIR=/tmp/metrics gunicorn --workers 4 yanews.wsgi  # yanote.wsgi
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+
+# Метод из запроса — в метке как есть только из известных: иначе каждый
+# выдуманный метод заводил бы новые ряды.
+METHODS = frozenset(
+    ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+)
+UNRESOLVED = '<unresolved>'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric:
+    """Счётчик или гистограмма с рядами по значениям меток.
+
+    Ряд гистограммы — число наблюдений в каждом интервале (последний —
+    +Inf) и сумма значений; ряд счётчика — только сумма.
+    """
+
+    def __init__(self, name, documentation, labels, buckets=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.kind = 'counter' if buckets is None else 'histogram'
+        self.size = 1 if buckets is None else len(buckets) + 2
+
+    def observe(self, samples, labels, value):
+        values = samples.get(labels)
+        if values is None:
+            values = samples[labels] = [0] * self.size
+        if self.buckets is not None:
+            values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def expose(self, samples):
+        """Строки текстового формата Prometheus для рядов метрики."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for labels, values in sorted(samples.items()):
+            pairs = [
+                f'{name}="{escape(value)}"'
+                for name, value in zip(self.labels, labels)
+            ]
+            if self.buckets is None:
+                lines.append(
+                    f'{self.name}{{{",".join(pairs)}}} '
+                    f'{format_value(values[0])}'
+                )
+                continue
+            total = 0
+            for bound, count in zip((*self.buckets, '+Inf'), values):
+                total += count
+                le = ",".join((*pairs, f'le="{format_value(bound)}"'))
+                lines.append(f'{self.name}_bucket{{{le}}} {total}')
+            series = ",".join(pairs)
+            lines.append(
+                f'{self.name}_sum{{{series}}} {format_value(values[-1])}'
+            )
+            lines.append(f'{self.name}_count{{{series}}} {total}')
+        return lines
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def format_value(value):
+    if isinstance(value, str):
+        return value
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REQUEST_DURATION = Metric(
+    'django_http_request_duration_seconds',
+    'Время обработки запроса, секунды.', ('view', 'method'),
+    DURATION_BUCKETS,
+)
+RESPONSES = Metric(
+    'django_http_responses_total', 'Ответы по кодам.',
+    ('view', 'method', 'status'),
+)
+RESPONSE_SIZE = Metric(
+    'django_http_response_size_bytes',
+    'Размер тела ответа, байты; потоковые ответы не входят.', ('view',),
+    SIZE_BUCKETS,
+)
+DB_QUERIES = Metric(
+    'django_db_queries', 'SQL-запросов на запрос.', ('view',),
+    QUERY_BUCKETS,
+)
+DB_DURATION = Metric(
+    'django_db_query_duration_seconds',
+    'Суммарное время SQL-запросов на запрос, секунды.', ('view',),
+    DURATION_BUCKETS,
+)
+TEMPLATE_DURATION = Metric(
+    'django_template_render_seconds', 'Время рендера шаблона, секунды.',
+    ('view',), DURATION_BUCKETS,
+)
+METRICS = (
+    REQUEST_DURATION, RESPONSES, RESPONSE_SIZE, DB_QUERIES, DB_DURATION,
+    TEMPLATE_DURATION,
+)
+
+
+class Registry:
+    """Ряды метрик процесса и их файл в общем каталоге."""
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.reset()
+        # Дочерний процесс начинает с нуля и пишет в свой файл: иначе
+        # унаследованные ряды посчитались бы дважды.
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        self.samples = {metric.name: {} for metric in self.metrics}
+        self.reset_file()
+
+    def reset_file(self):
+        """Новый файл в каталоге: прежний остаётся за прошлым процессом."""
+        self.filename = f'{os.getpid()}-{uuid.uuid4().hex}.json'
+        self.flushed = time.monotonic()
+
+    def observe(self, observations):
+        """Записывает наблюдения (метрика, метки, значение) разом."""
+        with self.lock:
+            for metric, labels, value in observations:
+                metric.observe(self.samples[metric.name], labels, value)
+
+    def dump(self):
+        with self.lock:
+            return {
+                name: {
+                    json.dumps(labels): list(values)
+                    for labels, values in samples.items()
+                }
+                for name, samples in self.samples.items()
+            }
+
+    def flush(self, directory):
+        """Сохраняет ряды процесса в directory, заменяя файл целиком."""
+        self.flushed = time.monotonic()
+        data = json.dumps(self.dump())
+        handle, path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as file:
+            file.write(data)
+        os.replace(path, Path(directory, self.filename))
+
+    def maybe_flush(self):
+        directory = settings.METRICS_DIR
+        if (
+            directory
+            and time.monotonic() - self.flushed
+            >= settings.METRICS_FLUSH_INTERVAL
+        ):
+            self.flush(directory)
+
+    def collect(self, directory=None):
+        """Ряды процесса вместе с файлами других процессов из directory."""
+        dumps = [self.dump()]
+        for path in Path(directory).glob('*.json') if directory else ():
+            if path.name == self.filename:
+                continue
+            try:
+                dumps.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # Файл удалили при очистке каталога или он чужой.
+                continue
+        merged = {metric.name: {} for metric in self.metrics}
+        for metric in self.metrics:
+            samples = merged[metric.name]
+            for dump in dumps:
+                for key, values in dump.get(metric.name, {}).items():
+                    labels = tuple(json.loads(key))
+                    total = samples.setdefault(labels, [0] * metric.size)
+                    # После смены интервалов старые файлы не складываются.
+                    if len(values) == metric.size:
+                        for index, value in enumerate(values):
+                            total[index] += value
+        return merged
+
+    def expose(self, directory=None):
+        samples = self.collect(directory)
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose(samples[metric.name]))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def metrics_view(request):
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    return HttpResponse(
+        registry.expose(settings.METRICS_DIR), content_type=CONTENT_TYPE
+    )
+
+
+class MetricsMiddleware:
+    """Записывает метрики запроса в registry.
+
+    Стоит первым в MIDDLEWARE, чтобы время ответа включало остальные
+    middleware; число и время SQL-запросов берёт из request.query_stats,
+    которую оставляет QueryBudgetMiddleware. Рендер шаблона замеряется
+    от process_template_response этого middleware — оно вызывается
+    последним, прямо перед рендером. Страницы, которые отрисовали сами
+    представления (асинхронные) или взяли из кэша, рендерятся за ноль.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django опознаёт асинхронный экземпляр, как в MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, response, start)
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.template_render_time = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, start):
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        view = (match.view_name if match else None) or UNRESOLVED
+        method = request.method if request.method in METHODS else 'other'
+        labels = (view,)
+        observations = [
+            (REQUEST_DURATION, (view, method), duration),
+            (RESPONSES, (view, method, str(response.status_code)), 1),
+        ]
+        if not response.streaming:
+            observations.append(
+                (RESPONSE_SIZE, labels, len(response.content))
+            )
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            observations.append((DB_QUERIES, labels, stats.count))
+            observations.append((DB_DURATION, labels, stats.duration / 1000))
+        render_time = getattr(request, 'template_render_time', None)
+        if render_time is not None:
+            observations.append((TEMPLATE_DURATION, labels, render_time))
+        registry.observe(observations)
+        registry.maybe_flush()
+        return response
@@ -0,0 +1,126 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class KeysetPage:
+    """Страница, полученная по курсору."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """Постраничный вывод по курсору (keyset pagination).
+
+    Вместо OFFSET страница отбирается условием «строго после/до ключа
+    последней показанной записи», поэтому любая страница стоит столько же,
+    сколько первая, если по полям ordering есть составной индекс.
+    Последнее поле ordering должно быть уникальным (обычно id).
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        opts = queryset.model._meta
+        self.fields = [
+            opts.pk if name.lstrip('-') == 'pk'
+            else opts.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу после (или до) переданного курсора."""
+        direction, values = NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        ordering = self.ordering
+        if direction == PREVIOUS:
+            ordering = tuple(self._reverse(name) for name in ordering)
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+        object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if direction == PREVIOUS:
+            object_list.reverse()
+        has_next = has_more if direction == NEXT else values is not None
+        has_previous = values is not None if direction == NEXT else has_more
+        page = KeysetPage(object_list)
+        if object_list and has_next:
+            page.next_cursor = self.encode_cursor(NEXT, object_list[-1])
+        if object_list and has_previous:
+            page.previous_cursor = self.encode_cursor(
+                PREVIOUS, object_list[0]
+            )
+        return page
+
+    def encode_cursor(self, direction, obj):
+        """Упаковывает ключ записи в непрозрачный токен для URL."""
+        values = [field.value_to_string(obj) for field in self.fields]
+        raw = json.dumps([direction, values], separators=(',', ':'))
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Распаковывает токен; на испорченный курсор отвечаем 404."""
+        try:
+            raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(raw)
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self.fields):
+                raise ValueError(values)
+            return direction, [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (
+            binascii.Error, TypeError, ValueError, ValidationError
+        ) as error:
+            raise Http404('Некорректный курсор.') from error
+
+    @staticmethod
+    def _reverse(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def _after(self, ordering, values):
+        """Строит условие (a, b) > (x, y) с учётом направления сортировки.
+
+        Нестрогое ограничение по первому полю дублируется отдельно: без него
+        SQLite не может превратить OR-условие в диапазон по индексу.
+        """
+        condition = Q()
+        for index, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            step = Q(**{f'{name.lstrip("-")}__{lookup}': values[index]})
+            for previous, value in zip(ordering[:index], values):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
@@ -0,0 +1,267 @@
+"""Профилирование отдельных запросов и сводка по снимкам.
+
+ProfilingMiddleware снимает профиль cProfile и трассу SQL-запросов:
+- по требованию сотрудника (is_staff) — с параметром ?profile=1, имя
+  снимка приходит в заголовке X-Profile;
+- у доли settings.PROFILE_SAMPLE_RATE всех запросов.
+
+С settings.PROFILE_SLOW_SECONDS трасса SQL пишется у каждого запроса, а
+сохраняется у тех, что длились дольше порога. Профиль cProfile у такого
+снимка есть, только если запрос профилировался и так: профилировать всё
+подряд ради медленных слишком дорого.
+
+Снимок — файл <имя>.json с URL, временем и SQL-запросами (у каждого —
+кадры кода приложений и шаблоны, откуда он пришёл) и <имя>.prof для
+pstats. В settings.PROFILE_DIR хранятся PROFILE_KEEP последних снимков.
+Команда profile_report сводит их по именам URL.
+
+Под ASGI cProfile видел бы чужие корутины цикла событий, поэтому там
+снимки содержат только трассу SQL.
+"""
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.template.base import Template
+
+PACKAGE_DIR = str(Path(__file__).resolve().parent)
+STACK_DEPTH = 5
+# Template.render, а не _render: тестовое окружение подменяет _render.
+TEMPLATE_RENDER = Template.render.__code__
+REPEATED_PARAMS = re.compile(r'%s(, %s)+')
+SPACES = re.compile(r'\s+')
+
+
+def query_stack(root):
+    """Откуда пришёл SQL-запрос: кадры приложений под root и шаблоны.
+
+    Ближние к запросу кадры идут первыми; middleware проекта и код Django
+    пропускаются.
+    """
+    stack = []
+    frame = sys._getframe(1)
+    while frame is not None and len(stack) < STACK_DEPTH:
+        code = frame.f_code
+        filename = code.co_filename
+        if code is TEMPLATE_RENDER:
+            origin = frame.f_locals['self'].origin
+            stack.append(f'{origin.template_name or origin.name} (шаблон)')
+        elif filename.startswith(root) and not filename.startswith(
+            PACKAGE_DIR
+        ):
+            stack.append(
+                f'{filename[len(root):]}:{frame.f_lineno} {code.co_name}'
+            )
+        frame = frame.f_back
+    return stack
+
+
+class Capture:
+    """Снимок одного запроса: трасса SQL и, если есть, профиль."""
+
+    def __init__(self, request, reason, profile):
+        self.request = request
+        self.reason = reason
+        self.profiler = cProfile.Profile() if profile else None
+        self.queries = []
+        self.root = str(settings.BASE_DIR) + os.sep
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            stats.tracer = self.trace
+
+    def trace(self, sql, duration):
+        self.queries.append({
+            'sql': sql, 'ms': round(duration, 3),
+            'stack': query_stack(self.root),
+        })
+
+    def save(self, response, duration):
+        """Пишет снимок в PROFILE_DIR и возвращает его имя."""
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        match = self.request.resolver_match
+        view = match.view_name if match else None
+        name = '-'.join((
+            datetime.now().strftime('%Y%m%d-%H%M%S-%f'),
+            (view or 'unresolved').replace(':', '_'), uuid.uuid4().hex[:8],
+        ))
+        if self.profiler is not None:
+            self.profiler.dump_stats(directory / f'{name}.prof')
+        (directory / f'{name}.json').write_text(json.dumps({
+            'view': view,
+            'method': self.request.method,
+            'path': self.request.path,
+            'status': response.status_code,
+            'reason': self.reason,
+            'ms': round(duration * 1000, 3),
+            'profile': f'{name}.prof' if self.profiler else None,
+            'queries': self.queries,
+        }, ensure_ascii=False, indent=1))
+        rotate(directory, settings.PROFILE_KEEP)
+        return name
+
+
+def rotate(directory, keep):
+    """Удаляет снимки, кроме keep последних; имена начинаются со времени."""
+    captures = sorted(directory.glob('*.json'))
+    for path in captures[:max(len(captures) - keep, 0)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Снимает профили запросов по требованию, выборочно и медленных.
+
+    Стоит после AuthenticationMiddleware: профиль по требованию доступен
+    только сотрудникам. Пользователь загружается, лишь когда в запросе
+    есть параметр settings.PROFILE_PARAM.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django опознаёт асинхронный экземпляр, как в MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        wanted = self.wants_profile(request) and request.user.is_staff
+        capture = self.start(request, wanted, profile=True)
+        profiler = capture and capture.profiler
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler:
+                profiler.disable()
+        duration = time.perf_counter() - start
+        if self.should_save(capture, duration):
+            self.finish(capture, response, duration)
+        return response
+
+    async def __acall__(self, request):
+        wanted = self.wants_profile(request) and await sync_to_async(
+            lambda: request.user.is_staff
+        )()
+        capture = self.start(request, wanted, profile=False)
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        duration = time.perf_counter() - start
+        if self.should_save(capture, duration):
+            await sync_to_async(self.finish)(capture, response, duration)
+        return response
+
+    @staticmethod
+    def wants_profile(request):
+        param = settings.PROFILE_PARAM
+        return bool(param and request.GET.get(param))
+
+    @staticmethod
+    def start(request, wanted, profile):
+        """Снимок запроса, если его нужно профилировать или трассировать."""
+        rate = settings.PROFILE_SAMPLE_RATE
+        if wanted:
+            reason = 'staff'
+        elif rate and random.random() < rate:
+            reason = 'sample'
+        elif settings.PROFILE_SLOW_SECONDS is not None:
+            return Capture(request, None, profile=False)
+        else:
+            return None
+        return Capture(request, reason, profile)
+
+    @staticmethod
+    def should_save(capture, duration):
+        if capture is None:
+            return False
+        threshold = settings.PROFILE_SLOW_SECONDS
+        if capture.reason is None and threshold is not None:
+            capture.reason = 'slow' if duration >= threshold else None
+        return capture.reason is not None
+
+    @staticmethod
+    def finish(capture, response, duration):
+        name = capture.save(response, duration)
+        if capture.reason == 'staff':
+            response['X-Profile'] = name
+
+
+def normalize_sql(sql):
+    """SQL без различий в пробелах и длине списков IN (%s, %s, ...)."""
+    return REPEATED_PARAMS.sub('%s, ...', SPACES.sub(' ', sql).strip())
+
+
+def load_captures(directory, view=None):
+    """Снимки из directory по именам URL: {view: [(снимок, путь), ...]}."""
+    captures = defaultdict(list)
+    for path in sorted(Path(directory).glob('*.json')):
+        try:
+            capture = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        name = capture.get('view') or 'unresolved'
+        if view is None or name == view:
+            captures[name].append((capture, path))
+    return dict(captures)
+
+
+def short_path(filename):
+    """Путь функции без префикса site-packages или каталога проекта."""
+    for marker in ('site-packages' + os.sep, str(settings.BASE_DIR) + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename
+
+
+def hottest_functions(paths, limit, sort='tottime'):
+    """Самые дорогие функции по профилям: (tottime, cumtime, вызовы, имя).
+
+    Время — в миллисекундах, суммарно по всем профилям.
+    """
+    paths = [str(path) for path in paths]
+    if not paths:
+        return []
+    stats = pstats.Stats(*paths).stats
+    rows = [
+        (tottime * 1000, cumtime * 1000, calls,
+         f'{short_path(filename)}:{line}({function})')
+        for (filename, line, function), (_, calls, tottime, cumtime, _)
+        in stats.items()
+    ]
+    index = 0 if sort == 'tottime' else 1
+    return sorted(rows, key=lambda row: row[index], reverse=True)[:limit]
+
+
+def hottest_queries(captures, limit):
+    """Самые дорогие SQL-запросы: (всего мс, раз, SQL, частый источник)."""
+    total, count = Counter(), Counter()
+    sources = defaultdict(Counter)
+    for capture in captures:
+        for query in capture['queries']:
+            sql = normalize_sql(query['sql'])
+            total[sql] += query['ms']
+            count[sql] += 1
+            sources[sql][' <- '.join(query['stack'][:2]) or '?'] += 1
+    return [
+        (duration, count[sql], sql, sources[sql].most_common(1)[0][0])
+        for sql, duration in total.most_common(limit)
+    ]
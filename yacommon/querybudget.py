@@ -0,0 +1,139 @@
+"""Учёт SQL-запросов каждого представления и проверка бюджетов."""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Управление транзакциями не считается: под TestCase вместо BEGIN идут
+# SAVEPOINT, и бюджеты разошлись бы с боевыми.
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+
+def is_transaction_control(sql):
+    """Оператор управления транзакцией, а не запрос к данным."""
+    return sql.lstrip().upper().startswith(TRANSACTION_CONTROL)
+
+
+# Статистика текущего запроса. Контекст переходит в потоки sync_to_async,
+# так что запросы считаются, в каком бы потоке ни выполнялись.
+current_stats = ContextVar('query_stats', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """Обёртка соединений: передаёт запрос статистике текущего запроса."""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_counter(connection, **kwargs):
+    """Подключает count_queries к соединению, если его там ещё нет.
+
+    Обёртка ставится первой: connection.execute_wrapper() снимает
+    последнюю и не должна снять нашу.
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+connection_created.connect(install_counter)
+
+
+class QueryStats:
+    """Число SQL-запросов и их суммарное время в миллисекундах.
+
+    Экземпляр получает запросы через execute_wrappers соединений, поэтому
+    считает их и без DEBUG, в отличие от connection.queries.
+    Операторы управления транзакциями входят только во время. tracer,
+    если задан, получает SQL и время каждого запроса к данным.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.tracer = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.duration += duration
+            if not is_transaction_control(sql):
+                self.count += 1
+                if self.tracer is not None:
+                    self.tracer(sql, duration)
+
+
+class QueryBudgetMiddleware:
+    """Записывает число и время SQL-запросов каждого представления.
+
+    Бюджеты задаются в settings.QUERY_BUDGETS по имени URL; превышение
+    попадает в лог предупреждением. При QUERY_STATS_HEADER статистика
+    отдаётся в заголовке Server-Timing. Статистика остаётся в
+    request.query_stats для MetricsMiddleware. Под ASGI middleware
+    работает асинхронно и не заставляет выполнять цепочку в отдельном
+    потоке.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django опознаёт асинхронный экземпляр, как в MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        # Соединения, открытые до импорта модуля, сигнал уже пропустил.
+        for connection in connections.all():
+            install_counter(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = request.query_stats = QueryStats()
+        token = current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = request.query_stats = QueryStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        """Пишет статистику в лог и, если нужно, в Server-Timing."""
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                '%s: %d SQL-запросов при бюджете %d (%s)',
+                view_name, stats.count, budget, request.path
+            )
+        else:
+            logger.debug(
+                '%s: %d SQL-запросов, %.1f мс',
+                view_name, stats.count, stats.duration
+            )
+        if settings.QUERY_STATS_HEADER:
+            response['Server-Timing'] = (
+                f'db;dur={stats.duration:.1f};desc="{stats.count} queries"'
+            )
+        return response
@@ -0,0 +1,136 @@
+"""Чтение с реплик, запись в основную базу и чтение своих записей.
+
+PrimaryReplicaRouter пишет в default, а читает с одной из реплик из
+settings.DATABASE_REPLICAS; без реплик всё идёт в default. Реплики
+отстают, поэтому после записи чтение закрепляется за основной базой: до
+конца запроса — сразу, а PrimaryPinMiddleware продлевает закрепление на
+DATABASE_PIN_SECONDS секунд через cookie, и следующие запросы того же
+клиента видят его изменения.
+
+Локально реплику заменяет второй файл SQLite — копия основной базы,
+отстающая до следующего копирования:
+
+    sqlite3 db.sqlite3 '.backup db.replica.sqlite3'
+    DATABASE_REPLICAS=replica python manage.py runserver
+"""
+import asyncio
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class PrimaryPin:
+    """Закреплено ли чтение за основной базой и была ли запись."""
+
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+    def __bool__(self):
+        return self.pinned or self.wrote
+
+
+# Состояние текущего запроса. Объект общий для всех потоков sync_to_async
+# запроса, как QueryStats в querybudget.
+current_pin = ContextVar('primary_pin', default=None)
+
+
+def get_pin():
+    pin = current_pin.get()
+    if pin is None:
+        # Вне запроса (команды, оболочка) запись закрепляет чтение
+        # за основной базой до конца текущего контекста.
+        pin = PrimaryPin()
+        current_pin.set(pin)
+    return pin
+
+
+def pin_to_primary():
+    """До конца запроса чтение идёт из основной базы."""
+    get_pin().pinned = True
+
+
+class PrimaryReplicaRouter:
+    """Запись — в default, чтение — с реплики, если его не закрепили."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or current_pin.get()
+            # Внутри транзакции читаем то, что она уже записала.
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        get_pin().wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы: связи между ними допустимы.
+        return True
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет чтение за основной базой на время после записи.
+
+    Стоит до SessionMiddleware: сессия читается уже с учётом закрепления,
+    а её сохранение тоже считается записью.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django опознаёт асинхронный экземпляр, как в MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        pin = PrimaryPin(self.is_pinned(request))
+        token = current_pin.set(pin)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_pin.reset(token)
+        return self.extend(response, pin)
+
+    async def __acall__(self, request):
+        pin = PrimaryPin(self.is_pinned(request))
+        token = current_pin.set(pin)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_pin.reset(token)
+        return self.extend(response, pin)
+
+    @staticmethod
+    def is_pinned(request):
+        """Не истекло ли закрепление из cookie прошлой записи."""
+        try:
+            until = float(request.COOKIES[settings.DATABASE_PIN_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        return until > time.time()
+
+    @staticmethod
+    def extend(response, pin):
+        """После записи продлевает закрепление на DATABASE_PIN_SECONDS."""
+        seconds = settings.DATABASE_PIN_SECONDS
+        if pin.wrote and seconds and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.DATABASE_PIN_COOKIE, str(time.time() + seconds),
+                max_age=seconds, httponly=True, samesite='Lax'
+            )
+        return response
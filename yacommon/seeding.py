@@ -0,0 +1,107 @@
+"""Общая часть команд seed_news и seed_notes.
+
+Словарь псевдослов с частотами по Ципфу, вставка пачками с отчётом о
+скорости и пользователи-авторы. Одинаковый --seed на пустой базе даёт
+одинаковые данные: случайные числа берутся в одном и том же порядке.
+"""
+import random
+import time
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+SYLLABLES = (
+    'ка', 'ро', 'ми', 'ту', 'ле', 'но', 'ва', 'зу', 'пе', 'ши',
+    'да', 'ге', 'бо', 'лу', 'ри', 'ся', 'жо', 'хе', 'фа', 'чу',
+)
+
+
+def make_vocabulary(rng, size):
+    """Словарь псевдослов: по нему частоты слов распределяются по Ципфу."""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def zipf_cum_weights(size, exponent):
+    """Накопленные веса рангов 1..size для random.choices."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def batched(objects, size):
+    """Режет поток объектов на списки не длиннее size."""
+    objects = iter(objects)
+    batch = list(islice(objects, size))
+    while batch:
+        yield batch
+        batch = list(islice(objects, size))
+
+
+class SeedCommand(BaseCommand):
+    """Основа команд seed_*: словарь, пользователи и вставка пачками.
+
+    Наследник добавляет свои аргументы и заполняет данные в seed().
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--vocabulary', type=int, default=5_000)
+        parser.add_argument('--username-prefix', default='seed-user-')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.vocabulary = make_vocabulary(self.rng, options['vocabulary'])
+        self.word_weights = zipf_cum_weights(len(self.vocabulary), 1.0)
+        user_ids = self.seed_users(
+            options['users'], options['username_prefix']
+        )
+        self.seed(options, user_ids)
+
+    def seed(self, options, user_ids):
+        raise NotImplementedError
+
+    def words(self, count):
+        return ' '.join(self.rng.choices(
+            self.vocabulary, cum_weights=self.word_weights, k=count
+        ))
+
+    def create(self, model, objects):
+        """Вставляет объекты пачками и сообщает скорость вставки."""
+        start, created = time.perf_counter(), 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            created += len(batch)
+        duration = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{model.__name__}: {created} строк за '
+            f'{duration:.1f} с ({created / max(duration, 1e-9):.0f} строк/с)'
+        ))
+
+    def seed_users(self, count, prefix):
+        """Создаёт пользователей без пароля и возвращает их id."""
+        User = get_user_model()
+        password = make_password(None)
+        try:
+            self.create(User, (
+                User(username=f'{prefix}{index}', password=password)
+                for index in range(count)
+            ))
+        except IntegrityError as error:
+            raise CommandError(
+                f'Пользователи {prefix}* уже есть: задайте другой '
+                '--username-prefix.'
+            ) from error
+        return list(
+            User.objects.filter(username__startswith=prefix)
+            .order_by('id').values_list('id', flat=True)
+        )
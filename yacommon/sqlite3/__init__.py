@@ -0,0 +1,49 @@
+"""Бэкенд SQLite проектов (base.py) и повтор записей при занятой базе."""
+import random
+import time
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+
+def is_busy(error):
+    """Ошибка означает, что базу держит другой писатель."""
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def retry_on_busy(func=None, *, using=None):
+    """Повторяет запись с растущей паузой, пока база занята.
+
+    Каждая попытка — отдельная транзакция, так что повтор не застанет
+    половину прежней записи. Во внешней транзакции повторять нельзя:
+    ошибка уходит выше. Число повторов и первая пауза в секундах — в
+    settings.SQLITE_BUSY_RETRIES и settings.SQLITE_BUSY_BACKOFF.
+
+    using — алиас базы транзакции или функция от аргументов вызова,
+    которая его возвращает; по умолчанию default.
+    """
+    if func is None:
+        return partial(retry_on_busy, using=using)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        alias = using(*args, **kwargs) if callable(using) else using
+        retries = settings.SQLITE_BUSY_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                with transaction.atomic(using=alias):
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if (
+                    attempt == retries
+                    or not is_busy(error)
+                    or transaction.get_connection(alias).in_atomic_block
+                ):
+                    raise
+            time.sleep(
+                settings.SQLITE_BUSY_BACKOFF * 2 ** attempt
+                * random.uniform(0.5, 1.5)
+            )
+    return wrapper
@@ -0,0 +1,33 @@
+"""SQLite с настройкой соединений под конкурентную нагрузку.
+
+Кроме параметров sqlite3.connect, OPTIONS принимает:
+
+* pragmas — PRAGMA, которые выполняются в каждом новом соединении;
+* transaction_mode — режим BEGIN для atomic(). С IMMEDIATE транзакция
+  сразу берёт блокировку записи и ждёт её до timeout; с обычным BEGIN
+  читающая транзакция, которой понадобилось писать, тут же падает с
+  «database is locked», и ожидание не помогает.
+"""
+from django.db.backends.sqlite3 import base
+
+EXTRA_OPTIONS = ('pragmas', 'transaction_mode')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in EXTRA_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,153 @@
+"""Тестовые базы из закэшированного снимка SQLite вместо миграций.
+
+Миграции всех баз проекта применяются один раз: готовые файлы SQLite
+ложатся в каталог settings.TEST_DB_TEMPLATE_DIR под ключом — хэшем
+файлов миграций, версии Django и настроек баз. Пока миграции не
+меняются, каждая сессия pytest (и каждый воркер pytest-xdist) только
+копирует снимок API backup модуля sqlite3 в свою базу в памяти — как и
+раньше, file:memorydb_<алиас>?mode=memory&cache=shared, отдельную в
+каждом процессе. Изменённая миграция даёт новый ключ, и снимок
+строится заново; старые снимки удаляются.
+
+Пустой TEST_DB_TEMPLATE_DIR возвращает обычную настройку баз Django.
+Содержимое баз для serialized_rollback при копировании не сохраняется.
+"""
+import hashlib
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from importlib import import_module
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+
+try:
+    import fcntl
+except ImportError:  # Windows: воркеры могут собрать снимок одновременно.
+    fcntl = None
+
+
+def schema_files():
+    """Файлы, от которых зависит схема: миграции или модели приложений."""
+    for app_config in apps.get_app_configs():
+        try:
+            module = import_module(f'{app_config.name}.migrations')
+        except ImportError:
+            module = app_config.models_module
+            if module is not None:
+                yield Path(module.__file__)
+            continue
+        yield from sorted(Path(module.__file__).parent.glob('*.py'))
+
+
+def template_key():
+    """Хэш схемы всех баз: при любом её изменении снимок строится заново."""
+    digest = hashlib.sha256(django.get_version().encode())
+    digest.update(repr(settings.DATABASE_ROUTERS).encode())
+    for alias, database in sorted(settings.DATABASES.items()):
+        digest.update(f'{alias}:{database["ENGINE"]}'.encode())
+    for path in schema_files():
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+@contextmanager
+def locked(path):
+    """Один процесс строит снимок, остальные ждут и берут готовый."""
+    with open(path, 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def build_templates(directory, key):
+    """Применяет миграции к файлам снимка; возвращает алиас -> путь.
+
+    На время миграций все алиасы указывают на файлы снимка: сигналы
+    post_migrate одной базы не должны трогать рабочие файлы других.
+    """
+    templates = {
+        alias: directory / f'{key}.{alias}.sqlite3'
+        for alias in settings.DATABASES
+    }
+    if all(path.exists() for path in templates.values()):
+        return templates
+    for stale in directory.glob('*.sqlite3'):
+        if not stale.name.startswith(f'{key}.'):
+            stale.unlink(missing_ok=True)
+    partials = {
+        alias: str(path.with_suffix(f'.{os.getpid()}.tmp'))
+        for alias, path in templates.items()
+    }
+    originals = {
+        alias: {**connections[alias].settings_dict} for alias in templates
+    }
+    try:
+        for alias, partial in partials.items():
+            connection = connections[alias]
+            connection.close()
+            connection.settings_dict['NAME'] = partial
+            connection.settings_dict['TEST'] = {
+                **originals[alias]['TEST'], 'NAME': partial,
+            }
+        for alias in partials:
+            connections[alias].creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+    finally:
+        for alias, original in originals.items():
+            connections[alias].close()
+            connections[alias].settings_dict.update(original)
+    # Снимок появляется целиком или не появляется вовсе.
+    for alias, partial in partials.items():
+        os.replace(partial, templates[alias])
+    return templates
+
+
+def clone_templates(templates):
+    """Копирует снимки в базы в памяти; возвращает открытые соединения.
+
+    База в памяти с общим кэшем живёт, пока открыто хоть одно соединение
+    к ней, поэтому соединения-хранители закрываются только в конце сессии.
+    """
+    keepers = []
+    for alias, path in templates.items():
+        connection = connections[alias]
+        connection.close()
+        name = f'file:memorydb_{alias}?mode=memory&cache=shared'
+        keeper = sqlite3.connect(name, uri=True, check_same_thread=False)
+        with closing(sqlite3.connect(path)) as template:
+            template.backup(keeper)
+        keepers.append(keeper)
+        # settings.DATABASES[alias] — тот же словарь, что у соединения.
+        connection.settings_dict['NAME'] = name
+    return keepers
+
+
+def setup_test_databases(verbosity=0):
+    """Готовит тестовые базы; возвращает функцию, которая их убирает."""
+    if not settings.TEST_DB_TEMPLATE_DIR:
+        config = setup_databases(verbosity, interactive=False)
+        return lambda: teardown_databases(config, verbosity)
+    directory = Path(settings.TEST_DB_TEMPLATE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    with locked(directory / 'build.lock'):
+        templates = build_templates(directory, template_key())
+    names = {
+        alias: connections[alias].settings_dict['NAME']
+        for alias in templates
+    }
+    keepers = clone_templates(templates)
+
+    def teardown():
+        for alias, name in names.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+        for keeper in keepers:
+            keeper.close()
+    return teardown